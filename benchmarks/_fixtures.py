@@ -0,0 +1,105 @@
+"""
+Synthetic pdf_data_dicts for the benchmarks: one per renderer branch, with
+a main table of `rows` rows and `n_images` generated pictures.  Imported by
+the bench_suite child processes (the benchmarks directory is on their
+sys.path), so the fixtures are plain code rather than part of a script
+template.
+"""
+import copy
+import io
+import os
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from rfq_engine import SPEC_TEMPLATE  # noqa: E402
+
+BRANCHES = ("generic", "container", "carousel", "spec", "custom")
+
+
+def images(n, px, seed):
+    """n distinct JPEGs of px ('WxH') pixels, different for every seed."""
+    # Gradient and noise channels compress like a photo, not like a flat fill;
+    # built in 8-bit Pillow images so generating them adds little to the peak.
+    w, h = (int(v) for v in px.split("x"))
+    out = []
+    for i in range(n):
+        k = seed * 31 + i
+        gradient = Image.linear_gradient("L").resize((w, h))
+        noise = Image.effect_noise((w, h), 20 + k % 30)
+        img = Image.merge("RGB", [gradient, noise, gradient.rotate(90 + k % 180).resize((w, h))])
+        buf = io.BytesIO()
+        img.save(buf, "JPEG", quality=90)
+        out.append(buf.getvalue())
+    return out
+
+
+def spec_frame(name, rows):
+    """SPEC_TEMPLATE[name] repeated to `rows` rows, with every third row's answers left blank."""
+    template = pd.DataFrame(copy.deepcopy(SPEC_TEMPLATE[name])).astype(str)
+    df = pd.concat([template] * (-(-rows // len(template))), ignore_index=True).iloc[:rows]
+    for col in ("Requirement", "Status", "Vendor Scope (Yes/No)", "Customer Scope (Yes/No)"):
+        if col in df.columns:
+            df[col] = [f"Yes, {i}" if i % 3 else "" for i in range(len(df))]
+    return df.reset_index(drop=True)
+
+
+def fixture(branch, rows, n_images, px, seed):
+    """The pdf_data_dict for one benchmark case (see bench_suite's docstring for the branches)."""
+    imgs = images(n_images, px, seed)
+    d = {
+        "Type_of_items": "Bins", "Storage": "Material Storage", "company_name": "ACME Components",
+        "company_address": "Plot 4, MIDC, Pune", "footer_company_name": "Agilomatrix Private Ltd",
+        "footer_company_address": "Registered Office: Pune", "logo1_data": None,
+        "purpose": "Benchmark requirement background.\n\n" + "Scope and terms. " * 40,
+        "date_release": date(2026, 1, 1), "date_query": date(2026, 1, 5), "date_meet": None,
+        "date_quote": None, "date_selection": date(2026, 1, 20), "date_review": None,
+        "date_delivery": date(2026, 2, 20), "date_install": date(2026, 3, 1),
+        "spoc1_name": "A. Buyer", "spoc1_designation": "Purchase", "spoc1_phone": "+91 90000 00000",
+        "spoc1_email": "buyer@example.com", "submit_to_name": "Agilomatrix Pvt. Ltd.",
+        "submit_to_registered_office": "Pune", "delivery_company": "ACME",
+        "delivery_address": "Pune", "annexures": "Drawing\nLayout",
+        "model_detail_header": "Model", "image_workers": 1,
+        "rfq_category": "Warehouse Equipment", "layout_images": imgs[:4],
+    }
+    if branch == "generic":
+        d.update(rfq_category="Furniture", layout_images=[])
+        d["items_df"] = pd.DataFrame({
+            "Item Name": [f"Item {i}" for i in range(rows)],
+            "Description / Specification": ["steel rack, powder coated " * (i % 5) for i in range(rows)],
+            "Quantity": list(range(rows)), "Unit": ["Nos"] * rows, "Remarks": ["-"] * rows,
+        })
+    elif branch == "container":
+        d["wh_sub"] = "Storage Container"
+        d["storage_containers_df"] = pd.DataFrame({
+            "Description": [f"Bin {i}" for i in range(rows)], "OL (mm)": ["600"] * rows,
+            "OW (mm)": ["400"] * rows, "OH (mm)": ["300"] * rows, "Base Type": ["Flat"] * rows,
+            "Color": ["Blue"] * rows, "Weight Kg": ["2.5"] * rows, "Load capacity": ["30"] * rows,
+            "LID": ["No"] * rows, "Qty": [10] * rows,
+            "image_data_bytes": [imgs[i % len(imgs)] if imgs else None for i in range(rows)],
+        })
+        d["storage_containers_images"] = {}
+    elif branch == "carousel":
+        d["wh_sub"] = "Automated Storage System"
+        d["wh_items_df"] = pd.DataFrame([{"Item Name": "Vertical Carousel", "Quantity": 2, "Unit": "Nos",
+                                          "Description / Specification": "as per spec"}])
+        d["carousel_model_df"] = spec_frame("Model Details", rows)
+        d["key_features_df"] = spec_frame("Key Features", len(SPEC_TEMPLATE["Key Features"]))
+        d["inbuilt_features_df"] = spec_frame("Inbuilt features", len(SPEC_TEMPLATE["Inbuilt features"]))
+        d["installation_df"] = spec_frame("Installation Accountability",
+                                          len(SPEC_TEMPLATE["Installation Accountability"]))
+    elif branch == "spec":
+        d["wh_sub"] = "Storage System"
+        for name, template in SPEC_TEMPLATE.items():
+            d[f"spec_ss_{name}"] = spec_frame(name, rows if name == "Model Details" else len(template))
+    elif branch == "custom":
+        d.update(wh_sub="Dock Leveller", use_custom_spec=True)
+        d["custom_tables"] = [{"title": "Dock Leveller", "columns": ["Parameter", "Value", "Unit"],
+                               "df": pd.DataFrame({"Parameter": [f"Parameter {i}" for i in range(rows)],
+                                                   "Value": [i * 1.5 for i in range(rows)],
+                                                   "Unit": ["mm"] * rows})}]
+    return d
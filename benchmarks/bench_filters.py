@@ -0,0 +1,164 @@
+"""
+Spec-table filter micro-benchmark: the column-wise _filter_model_details /
+_filter_navy_df / custom-table row filter and _format_columns against the
+row-by-row versions they replaced, on 10k-row tables.  Also checks both produce identical
+frames, on the benchmark tables and on a batch of small random ones with
+None / NaN / 'nan' / numeric cells and missing columns.
+
+One known difference: a None cell that survives into _filter_model_details
+output was spelled 'None' or 'nan' depending on how iterrows() boxed that
+row (pandas 3 infers a string dtype for all-text rows).  The column-wise
+version always says 'None'.  Both read as blank to _clean(), so the PDF is
+unchanged; the check below folds the two spellings together.
+
+    python benchmarks/bench_filters.py [--rows 10000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rfq_engine import (  # noqa: E402
+    _clean, _filter_model_details, _filter_navy_df, _format_columns, nonblank_rows,
+)
+
+
+# ── Row-by-row reference implementations (pre-vectorisation) ─────────────
+
+def _is_blank(v):
+    return str(v).strip().lower() in ("", "nan", "none")
+
+
+def legacy_filter_model_details(df):
+    if df is None or df.empty:
+        return df
+    rows_list = []
+    current_sr = ""
+    current_cat = ""
+    for _, r in df.iterrows():
+        sr = str(r.get("Sr.no", "")).strip()
+        cat = str(r.get("Category", "")).strip()
+        req = str(r.get("Requirement", "")).strip()
+        desc = str(r.get("Description", "")).strip()
+        unit = str(r.get("UNIT", r.get("Unit", ""))).strip()
+        if sr != "" or cat != "":
+            current_sr = sr
+            current_cat = cat
+        rows_list.append({"sr": current_sr, "cat": current_cat, "desc": desc, "unit": unit, "req": req})
+    kept = [r for r in rows_list if not _is_blank(r["req"])]
+    if not kept:
+        return pd.DataFrame()
+    seen_groups = set()
+    result_rows = []
+    for r in kept:
+        group_key = (r["sr"], r["cat"])
+        first = group_key not in seen_groups
+        seen_groups.add(group_key)
+        result_rows.append({
+            "Sr.no": r["sr"] if first else "", "Category": r["cat"] if first else "",
+            "Description": r["desc"], "UNIT": r["unit"], "Requirement": r["req"],
+        })
+    return pd.DataFrame(result_rows)
+
+
+def legacy_filter_rows(df, cols):
+    if df is None or df.empty:
+        return df
+
+    def _has_value(row):
+        return any(not _is_blank(row.get(c, "")) for c in cols)
+
+    return df[df.apply(_has_value, axis=1)].reset_index(drop=True)
+
+
+def legacy_format_rows(df, cols):
+    return [[_clean(row.get(c, "")) for c in cols] for _, row in df.iterrows()]
+
+
+# ── Fixtures ─────────────────────────────────────────────────────────────
+
+_CELLS = ["", " ", "nan", "None", None, np.nan, "Yes", " 12 ", 3, 4.5, "x y", "NONE"]
+
+
+def spec_table(n, rng):
+    """A Model-Details-shaped table: group headers every few rows, mixed blanks."""
+    rows = []
+    for i in range(n):
+        head = rng.random() < 0.25
+        rows.append({
+            "Sr.no": str(i) if head else rng.choice(["", "", None]),
+            "Category": f"Cat {i % 37}" if head else "",
+            "Description": rng.choice(["Width", "Height", "", None, "Load"]),
+            "UNIT": rng.choice(["mm", "", "kg", np.nan]),
+            "Requirement": rng.choice(_CELLS),
+            "Status": rng.choice(_CELLS),
+            "Vendor Scope (Yes/No)": rng.choice(_CELLS),
+        })
+    return pd.DataFrame(rows)
+
+
+def _drop_random_columns(df, rng):
+    keep = [c for c in df.columns if rng.random() < 0.8]
+    return df[keep]
+
+
+def _same_model_details(got, want):
+    pd.testing.assert_frame_equal(got.replace("None", "nan"), want.replace("None", "nan"))
+
+
+def check_equivalence(rng, cases=300):
+    for _ in range(cases):
+        df = _drop_random_columns(spec_table(rng.randint(1, 25), rng), rng)
+        if "UNIT" in df.columns and rng.random() < 0.5:
+            df = df.rename(columns={"UNIT": "Unit"})
+        _same_model_details(_filter_model_details(df), legacy_filter_model_details(df))
+        cols = rng.sample(["Requirement", "Status", "Vendor Scope (Yes/No)", "Absent"], rng.randint(0, 3))
+        got = df[nonblank_rows(df, cols)].reset_index(drop=True)
+        pd.testing.assert_frame_equal(got, legacy_filter_rows(df, cols))
+        pd.testing.assert_frame_equal(_filter_navy_df(df, cols), legacy_filter_rows(df, cols))
+        cols = list(df.columns) + ["Absent"]
+        assert [list(r) for r in zip(*_format_columns(df, cols))] == legacy_format_rows(df, cols)
+
+
+def _best(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--rows", type=int, default=10_000)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args(argv)
+
+    rng = random.Random(7)
+    check_equivalence(rng)
+    df = spec_table(args.rows, rng)
+    _same_model_details(_filter_model_details(df), legacy_filter_model_details(df))
+    value_cols = ["Requirement", "Status", "Vendor Scope (Yes/No)"]
+
+    cases = [
+        ("_filter_model_details", lambda: legacy_filter_model_details(df), lambda: _filter_model_details(df)),
+        ("_filter_navy_df", lambda: legacy_filter_rows(df, value_cols), lambda: _filter_navy_df(df, value_cols)),
+        ("_format_columns", lambda: legacy_format_rows(df, list(df.columns)),
+         lambda: list(zip(*_format_columns(df, list(df.columns))))),
+    ]
+    print(f"{args.rows} rows, best of {args.repeat}; outputs identical")
+    for name, old, new in cases:
+        t_old, t_new = _best(old, args.repeat), _best(new, args.repeat)
+        print(f"  {name:<24} row-wise {t_old * 1000:8.1f} ms   column-wise {t_new * 1000:7.1f} ms   "
+              f"x{t_old / t_new:.0f}")
+
+
+if __name__ == "__main__":
+    main()
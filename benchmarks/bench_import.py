@@ -0,0 +1,62 @@
+"""
+Cold-import budget for the Streamlit-free PDF engine.
+
+Worker processes (image decode, batch rendering) import rfq_engine before
+doing anything else, so it must stay cheap: pandas, Pillow and fpdf2 are
+imported on first use, never at import time.  Each sample runs in a fresh
+interpreter.
+
+    python benchmarks/bench_import.py [--runs 7] [--budget-ms 60]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_BUDGET_MS = 60
+DEFERRED_MODULES = ("pandas", "numpy", "PIL", "fpdf", "fontTools", "streamlit", "tracemalloc")
+
+_PROBE = """
+import json, sys, time
+t = time.perf_counter()
+import rfq_engine
+dt = time.perf_counter() - t
+print(json.dumps({"ms": dt * 1000, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (DEFERRED_MODULES,)
+
+
+def _sample():
+    out = subprocess.run([sys.executable, "-c", _PROBE], cwd=ROOT, check=True,
+                         capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--runs", type=int, default=7)
+    ap.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    args = ap.parse_args(argv)
+
+    _sample()   # warm the .pyc cache so we time imports, not compilation
+    samples = [_sample() for _ in range(args.runs)]
+    median = statistics.median(s["ms"] for s in samples)
+    loaded = sorted({m for s in samples for m in s["loaded"]})
+
+    print(f"import rfq_engine: median {median:.1f} ms over {args.runs} runs "
+          f"(budget {args.budget_ms:.0f} ms)")
+    ok = True
+    if loaded:
+        print(f"FAIL: heavy modules imported eagerly: {', '.join(loaded)}")
+        ok = False
+    if median > args.budget_ms:
+        print("FAIL: over budget")
+        ok = False
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
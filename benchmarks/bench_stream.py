@@ -0,0 +1,90 @@
+"""
+Large-table render benchmark: rows per second and peak RSS for the generic
+items table and the Storage Container table (with images) as the row count
+grows.  Each size renders in a fresh subprocess straight to a file through
+write_rfq_pdf, so ru_maxrss is that one document's peak.
+
+    python benchmarks/bench_stream.py [--rows 1000 5000 10000 20000] [--images 8]
+
+Reference figure (1 CPU core, Python 3.11, fpdf2 2.8): the generic items
+table renders 10k rows at ~4,100 rows/s (2.4 s), 1,000 image rows of the
+container table at ~1,200 rows/s.  The render's RSS still grows with row
+count by the page content fpdf2 holds for output() (it fills in the {nb}
+page total at the end), ~6 MB per 10k item rows; the wrapped text,
+formatted cells and resampled images are bounded by TABLE_CHUNK_ROWS.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_CHILD = r"""
+import io, json, os, resource, sys, tempfile, time
+sys.path.insert(0, {root!r})
+import pandas as pd
+from PIL import Image
+from rfq_engine import write_rfq_pdf
+
+kind, n, n_images = {kind!r}, {rows}, {images}
+data = {{"rfq_category": "Furniture", "Type_of_items": "Bins", "Storage": "Material Storage",
+        "company_name": "ACME", "company_address": "Pune", "purpose": "Benchmark.",
+        "image_workers": 1}}
+if kind == "items":
+    data["items_df"] = pd.DataFrame({{
+        "Item Name": [f"Item {{i}}" for i in range(n)],
+        "Description / Specification": ["steel rack, powder coated " * (i % 5) for i in range(n)],
+        "Quantity": list(range(n)), "Unit": ["Nos"] * n, "Remarks": ["-"] * n,
+    }})
+else:
+    def _img(i):
+        b = io.BytesIO()
+        Image.new("RGB", (1600, 1200), (i * 37 % 255, 90, 40)).save(b, "JPEG")
+        return b.getvalue()
+    imgs = [_img(i) for i in range(n_images)]
+    data.update(rfq_category="Warehouse Equipment", wh_sub="Storage Container")
+    data["storage_containers_df"] = pd.DataFrame({{
+        "Description": [f"Bin {{i}}" for i in range(n)], "OL (mm)": ["600"] * n,
+        "OW (mm)": ["400"] * n, "OH (mm)": ["300"] * n, "Base Type": ["Flat"] * n,
+        "Color": ["Blue"] * n, "Weight Kg": ["2.5"] * n, "Load capacity": ["30"] * n,
+        "LID": ["No"] * n, "Qty": [10] * n,
+        "image_data_bytes": [imgs[i % n_images] for i in range(n)],
+    }})
+
+base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+with tempfile.TemporaryDirectory() as tmp:
+    t0 = time.perf_counter()
+    size = write_rfq_pdf(data, os.path.join(tmp, "out.pdf"))
+    wall = time.perf_counter() - t0
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{"seconds": wall, "bytes": size, "peak_mb": peak / 1024,
+                  "render_mb": (peak - base_rss) / 1024}}))
+"""
+
+
+def run(kind, rows, images):
+    code = _CHILD.format(root=ROOT, kind=kind, rows=rows, images=images)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--rows", type=int, nargs="+", default=[1000, 5000, 10000, 20000])
+    ap.add_argument("--container-rows", type=int, nargs="+", default=[100, 500, 1000])
+    ap.add_argument("--images", type=int, default=8, help="distinct container images")
+    args = ap.parse_args(argv)
+
+    print(f"{'table':10s} {'rows':>7s} {'seconds':>8s} {'rows/s':>8s} {'MB out':>7s} "
+          f"{'peak MB':>8s} {'render MB':>10s}")
+    for kind, sizes in (("items", args.rows), ("container", args.container_rows)):
+        for n in sizes:
+            r = run(kind, n, args.images)
+            print(f"{kind:10s} {n:7d} {r['seconds']:8.2f} {n / r['seconds']:8.0f} "
+                  f"{r['bytes'] / 1e6:7.2f} {r['peak_mb']:8.1f} {r['render_mb']:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
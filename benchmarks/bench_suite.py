@@ -0,0 +1,221 @@
+"""
+Benchmark suite for create_advanced_rfq_pdf: every branch of the renderer
+on synthetic pdf_data_dicts, swept over row counts and image counts /
+resolutions, reporting wall time, peak memory and output size, and
+comparing each case against a stored baseline.
+
+Branches:
+  generic      Furniture etc.: the generic items table
+  container    Storage Container table, one image per row, plus layout images
+  carousel     Automated Storage System: items list and the four spec tables
+  spec         Storage System / Material Handling / Dock Leveller (one code path)
+  custom       Create-my-own-table custom spec tables
+
+`rows` is the length of the branch's main table (Model Details for the
+spec branches).  `images` distinct pictures of `image-px` are cycled
+through the container rows and used as layout images (at most 4).
+
+Each case runs in a fresh subprocess.  The child first renders two small
+warm-up documents, a spec and a container one, so the imports, font
+loading and the image pipeline are paid before timing.  It then renders
+the case --repeat times with the section cache cleared and freshly
+generated image bytes, so every repeat lays out, compiles the cover and
+sign-off templates and decodes from scratch.  (Where decoding is isolated,
+the first repeat with more than one image also starts the decode workers;
+the median leaves that out.)
+Reported seconds are the median repeat; peak MB is ru_maxrss over the
+process, render MB its growth over the warmed-up baseline.
+
+    python benchmarks/bench_suite.py                       # compare with benchmarks/baseline.json
+    python benchmarks/bench_suite.py --save-baseline       # record a new baseline
+    python benchmarks/bench_suite.py --branches container --rows 10 1000 --images 0 8 \\
+        --image-px 1600x1200 4000x3000 --fail-over 0.15
+
+A case is flagged when its time (by more than NOISE_SECONDS), peak memory
+or size is more than --tolerance above the baseline; --fail-over makes that a non-zero exit for
+CI.  Times are compared relative to a short calibration workload timed on
+each run, so a baseline carries over to a faster or slower machine; the
+baseline also records the machine, CPU count and library versions, and a
+difference in those is reported.  Memory and sizes are compared as they are.
+The fixtures are in benchmarks/_fixtures.py.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "baseline.json")
+NOISE_SECONDS = 0.02     # time differences below this are never flagged
+
+BRANCHES = ("generic", "container", "carousel", "spec", "custom")     # as in _fixtures
+ROWS = (10, 1_000, 10_000)
+IMAGES = (0, 4)
+IMAGE_PX = ("1600x1200",)
+
+_CHILD = r"""
+import json, resource, statistics, sys, time
+sys.path.insert(0, sys.argv[1])
+from _fixtures import fixture
+from rfq_cache import SECTION_CACHE
+from rfq_engine import create_advanced_rfq_pdf
+
+case = json.loads(sys.argv[2])
+create_advanced_rfq_pdf(fixture("spec", 10, 1, "64x48", 1000))      # warm-up
+create_advanced_rfq_pdf(fixture("container", 10, 1, "64x48", 1001))
+base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+times = []
+for rep in range(case["repeat"]):
+    data = fixture(case["branch"], case["rows"], case["images"], case["image_px"], rep)
+    SECTION_CACHE.clear()
+    t0 = time.perf_counter()
+    size = len(create_advanced_rfq_pdf(data))
+    times.append(time.perf_counter() - t0)
+    del data
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"seconds": statistics.median(times), "bytes": size, "peak_mb": peak / 1024,
+                  "render_mb": (peak - base_rss) / 1024}))
+"""
+
+
+def calibrate(runs=5):
+    """
+    Median seconds of a fixed CPU-bound workload (Python loops, zlib, a
+    sort): the machine's speed, by which case times are divided before
+    they are compared with a baseline recorded elsewhere.
+    """
+    import statistics
+    import time
+    import zlib
+
+    data = bytes(range(256)) * 4096
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        total = 0
+        for i in range(300_000):
+            total += i % 7
+        zlib.compress(data, 6)
+        sorted(str(i) for i in range(100_000))
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times)
+
+
+def machine_info():
+    """What the numbers were measured on, stored with a baseline."""
+    import fpdf
+    import pandas
+    import PIL
+
+    info = {"python": platform.python_version(), "implementation": platform.python_implementation(),
+            "platform": platform.platform(), "machine": platform.machine(),
+            "cpu": platform.processor() or None, "cpus": os.cpu_count(),
+            "fpdf2": fpdf.FPDF_VERSION, "pandas": pandas.__version__, "pillow": PIL.__version__}
+    if hasattr(os, "sched_getaffinity"):
+        info["cpus_usable"] = len(os.sched_getaffinity(0))
+    try:
+        with open("/proc/cpuinfo") as f:
+            info["cpu"] = next(line.split(":", 1)[1].strip() for line in f if line.startswith("model name"))
+    except (OSError, StopIteration):
+        pass
+    try:
+        with open("/proc/meminfo") as f:
+            info["memory_mb"] = int(next(line.split()[1] for line in f if line.startswith("MemTotal"))) // 1024
+    except (OSError, StopIteration, ValueError):
+        pass
+    return info
+
+
+def case_id(case):
+    return f"{case['branch']}/rows={case['rows']}/images={case['images']}@{case['image_px']}"
+
+
+def run(case):
+    out = subprocess.run([sys.executable, "-c", _CHILD, os.path.join(ROOT, "benchmarks"), json.dumps(case)],
+                         capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(f"{case_id(case)} failed:\n{out.stderr.strip()}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def cases(args):
+    for branch, rows, images in itertools.product(args.branches, args.rows, args.images):
+        # Generic documents have no images; image resolution only matters with images.
+        if branch == "generic" and images:
+            continue
+        for px in (args.image_px if images else args.image_px[:1]):
+            yield {"branch": branch, "rows": rows, "images": images, "image_px": px, "repeat": args.repeat}
+
+
+def _delta(new, old):
+    return (new - old) / old if old else 0.0
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--branches", nargs="+", choices=BRANCHES, default=list(BRANCHES))
+    ap.add_argument("--rows", type=int, nargs="+", default=list(ROWS))
+    ap.add_argument("--images", type=int, nargs="+", default=list(IMAGES), help="distinct images per case")
+    ap.add_argument("--image-px", nargs="+", default=list(IMAGE_PX), help="image resolutions, WxH")
+    ap.add_argument("--repeat", type=int, default=3, help="renders per case; the median is reported")
+    ap.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON to compare with")
+    ap.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    ap.add_argument("--tolerance", type=float, default=0.10, help="relative slack before a case is flagged")
+    ap.add_argument("--fail-over", type=float, default=None,
+                    help="exit 1 if any case's time or peak memory regressed by more than this fraction")
+    args = ap.parse_args(argv)
+
+    baseline, base_meta = {}, {}
+    if not args.save_baseline and os.path.isfile(args.baseline):
+        with open(args.baseline) as f:
+            stored = json.load(f)
+        baseline, base_meta = stored["cases"], stored.get("meta", {})
+
+    meta = dict(machine_info(), repeat=args.repeat, calibration_seconds=calibrate())
+    # Times are compared as multiples of each machine's calibration time.
+    base_cal = base_meta.get("calibration_seconds")
+    scale = meta["calibration_seconds"] / base_cal if base_cal else 1.0
+    print(f"calibration {meta['calibration_seconds'] * 1000:.1f} ms on {meta['cpu'] or meta['machine']}, "
+          f"{meta.get('cpus_usable', meta['cpus'])} CPU(s)")
+    if baseline:
+        changed = [k for k in ("cpu", "cpus_usable", "python", "fpdf2", "pandas", "pillow")
+                   if k in base_meta and base_meta[k] != meta.get(k)]
+        print((f"baseline times scaled by {scale:.2f} (its calibration: {base_cal * 1000:.1f} ms)" if base_cal
+               else "baseline has no calibration: times compared as they are")
+              + (f"; differs in {', '.join(changed)}: compare with care" if changed else ""))
+
+    print(f"{'case':48s} {'seconds':>8s} {'peak MB':>8s} {'render MB':>10s} {'KB out':>9s}"
+          + ("   vs baseline (time / peak / size)" if baseline else ""))
+    results, worst = {}, 0.0
+    for case in cases(args):
+        cid = case_id(case)
+        r = results[cid] = run(case)
+        line = (f"{cid:48s} {r['seconds']:8.3f} {r['peak_mb']:8.1f} {r['render_mb']:10.1f} "
+                f"{r['bytes'] / 1024:9.1f}")
+        old = baseline.get(cid)
+        if old:
+            expected = old["seconds"] * scale
+            deltas = [_delta(r["seconds"], expected)] + [_delta(r[k], old[k]) for k in ("peak_mb", "bytes")]
+            if abs(r["seconds"] - expected) < NOISE_SECONDS:
+                deltas[0] = 0.0
+            flag = "  <-- regression" if max(deltas) > args.tolerance else ""
+            line += "   " + " / ".join(f"{d:+6.1%}" for d in deltas) + flag
+            worst = max(worst, deltas[0], deltas[1])
+        print(line, flush=True)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"meta": meta, "cases": results}, f, indent=1, sort_keys=True)
+            f.write("\n")
+        print(f"baseline written to {os.path.relpath(args.baseline, ROOT)}")
+    elif args.fail_over is not None and worst > args.fail_over:
+        print(f"FAIL: worst regression {worst:+.1%} exceeds {args.fail_over:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
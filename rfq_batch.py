@@ -0,0 +1,298 @@
+"""
+Headless batch renderer: turns a directory of JSON manifests, or a CSV of
+items grouped by RFQ, into PDFs without going through the Streamlit form.
+
+    python rfq_batch.py manifests/ -o out/
+    python rfq_batch.py --items-csv items.csv --defaults site.json -o out/
+
+A manifest is a JSON object with the same keys as pdf_data_dict in rfq.py
+(rfq_category, wh_sub, items_df, spec_ss_Model Details, ...):
+
+  - keys ending in _df or starting with spec_ hold a list of row objects
+  - date_* values are ISO dates ("2026-03-01") or null
+  - logo1_data, layout_images and the "image" field of container rows are
+    file paths, relative to the manifest
+  - custom_tables entries hold 'rows' (list of row objects) instead of 'df'
+
+With --items-csv every row carries an rfq_id column; each group becomes
+one RFQ whose item table is the group's rows, on top of --defaults.
+
+RFQs render in a process pool, one document per worker.  A manifest that
+fails to load or render is recorded in summary.json and the batch carries
+on; the exit status is 1 if anything failed.
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+from datetime import date
+
+BATCH_WORKERS = os.cpu_count() or 1
+
+_ITEM_TABLE_KEY = {
+    "Storage Container":        "storage_containers_df",
+    "Automated Storage System": "wh_items_df",
+}
+
+
+# ==============================================================
+# MANIFEST LOADING
+# ==============================================================
+
+def _read_file(path, base_dir):
+    """Image fields hold a path in the manifest; already-loaded bytes pass through."""
+    if isinstance(path, bytes):
+        return path
+    with open(os.path.join(base_dir, path), "rb") as f:
+        return f.read()
+
+
+def _is_table_key(key):
+    return key.endswith("_df") or key.startswith("spec_")
+
+
+def _table_frame(rows, columns=None):
+    import pandas as pd
+    if isinstance(rows, pd.DataFrame):
+        return rows
+    if isinstance(rows, dict):
+        return pd.DataFrame(rows, columns=columns)
+    return pd.DataFrame(list(rows or []), columns=columns)
+
+
+def _container_frame(rows, base_dir):
+    """Container rows may name their picture as 'image'; load it into image_data_bytes."""
+    if not isinstance(rows, list):
+        return _table_frame(rows)
+    rows = [dict(r) for r in rows or []]
+    for r in rows:
+        path = r.pop("image", None)
+        r["image_data_bytes"] = _read_file(path, base_dir) if path else None
+    return _table_frame(rows)
+
+
+def build_pdf_data(manifest, base_dir=".", defaults=None):
+    """
+    Map a decoded JSON manifest onto the pdf_data_dict the engine expects.
+    Values that are already converted (e.g. from build_pdf_data'd defaults)
+    are left alone.
+    """
+    data = dict(defaults or {})
+    data.update(manifest)
+    data.pop("rfq_id", None)
+
+    for key, val in list(data.items()):
+        if key.startswith("date_") and not isinstance(val, date):
+            data[key] = date.fromisoformat(val) if val else None
+        elif key == "storage_containers_df":
+            data[key] = _container_frame(val, base_dir)
+        elif _is_table_key(key):
+            data[key] = _table_frame(val)
+
+    if data.get("logo1_data"):
+        data["logo1_data"] = _read_file(data["logo1_data"], base_dir)
+    data["layout_images"] = [_read_file(p, base_dir) for p in data.get("layout_images") or []]
+    data["storage_containers_images"] = {
+        int(i): _read_file(p, base_dir)
+        for i, p in (data.get("storage_containers_images") or {}).items()
+    }
+    data["custom_tables"] = [
+        {"title": t.get("title", "Technical Specification"),
+         "columns": list(t.get("columns", [])),
+         "df": _table_frame(t.get("rows", t.get("df")), columns=t.get("columns"))}
+        for t in data.get("custom_tables") or []
+    ]
+    return data
+
+
+def _load_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def manifest_jobs(manifest_dir, defaults=None):
+    """One job per *.json file in manifest_dir, named after the file."""
+    jobs = []
+    for name in sorted(os.listdir(manifest_dir)):
+        if name.lower().endswith(".json"):
+            path = os.path.join(manifest_dir, name)
+            jobs.append({"rfq_id": os.path.splitext(name)[0], "path": path,
+                         "base_dir": manifest_dir, "defaults": defaults})
+    return jobs
+
+
+def csv_jobs(csv_path, defaults=None, table_key=None):
+    """One job per distinct rfq_id in the CSV, in first-seen order."""
+    defaults = defaults or {}
+    key = table_key or _ITEM_TABLE_KEY.get(defaults.get("wh_sub"), "items_df")
+    groups = {}
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            rfq_id = (row.pop("rfq_id", "") or "").strip()
+            groups.setdefault(rfq_id, []).append(row)
+    base_dir = os.path.dirname(os.path.abspath(csv_path))
+    return [{"rfq_id": rfq_id or "unnamed", "manifest": {key: rows},
+             "base_dir": base_dir, "defaults": defaults}
+            for rfq_id, rows in groups.items()]
+
+
+# ==============================================================
+# RENDERING
+# ==============================================================
+
+def _output_name(rfq_id):
+    return re.sub(r"[^\w.-]+", "_", str(rfq_id)).strip("._") or "rfq"
+
+
+def _warm_worker():
+    # Pay for the fpdf2 / pandas imports up front, not inside the first job's timing.
+    import pandas  # noqa: F401
+    import rfq_document  # noqa: F401
+
+
+def render_job(job, out_dir):
+    """
+    Load, render and write one RFQ.  Never raises: the returned record
+    carries either the output path or the error.
+    """
+    from rfq_engine import write_rfq_pdf
+
+    rec = {"rfq_id": job["rfq_id"], "source": job.get("path") or "csv", "ok": False}
+    t0 = time.perf_counter()
+    try:
+        manifest = job.get("manifest")
+        if manifest is None:
+            manifest = _load_json(job["path"])
+        if not isinstance(manifest, dict):
+            raise ValueError("manifest must be a JSON object")
+        data = build_pdf_data(manifest, job["base_dir"], job.get("defaults"))
+        # One document per worker process already fills the cores.
+        data.setdefault("image_workers", 1)
+
+        out_path = os.path.join(out_dir, _output_name(manifest.get("rfq_id", job["rfq_id"])) + ".pdf")
+        tmp_path = out_path + ".part"
+        try:
+            size = write_rfq_pdf(data, tmp_path)
+            os.replace(tmp_path, out_path)
+        finally:
+            # Only still there if the render or the rename failed.
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        rec.update(ok=True, output=out_path, bytes=size)
+    except Exception as e:
+        rec["error"] = f"{type(e).__name__}: {e}"
+    rec["seconds"] = round(time.perf_counter() - t0, 3)
+    return rec
+
+
+def _crashed(job, message):
+    return {"rfq_id": job["rfq_id"], "source": job.get("path") or "csv",
+            "ok": False, "error": message, "seconds": 0.0}
+
+
+def run_batch(jobs, out_dir, workers=BATCH_WORKERS):
+    """Render every job in a process pool and return the per-RFQ records in job order."""
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+
+    os.makedirs(out_dir, exist_ok=True)
+    workers = max(1, min(workers, len(jobs)))
+    if workers == 1:
+        return [render_job(job, out_dir) for job in jobs]
+
+    if hasattr(os, "fork"):
+        # Import once here; forked workers inherit the loaded modules.
+        ctx, init = multiprocessing.get_context("fork"), None
+        _warm_worker()
+    else:
+        ctx, init = None, _warm_worker
+
+    def _pool(n):
+        return ProcessPoolExecutor(max_workers=n, mp_context=ctx, initializer=init)
+
+    results = [None] * len(jobs)
+    crashed = []
+    with _pool(workers) as pool:
+        futures = [pool.submit(render_job, job, out_dir) for job in jobs]
+        for i, fut in enumerate(futures):
+            try:
+                results[i] = fut.result()
+            except BrokenProcessPool:
+                crashed.append(i)
+            except Exception as e:
+                results[i] = _crashed(jobs[i], f"{type(e).__name__}: {e}")
+    # A worker killed mid-render takes every in-flight job with it; retry
+    # those one at a time so only the manifest that actually crashes is lost.
+    for i in crashed:
+        with _pool(1) as pool:
+            try:
+                results[i] = pool.submit(render_job, jobs[i], out_dir).result()
+            except BrokenProcessPool:
+                results[i] = _crashed(jobs[i], "worker process died while rendering")
+            except Exception as e:
+                results[i] = _crashed(jobs[i], f"{type(e).__name__}: {e}")
+    return results
+
+
+# ==============================================================
+# CLI
+# ==============================================================
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Render RFQ PDFs from JSON manifests or an items CSV.")
+    ap.add_argument("manifest_dir", nargs="?", help="directory of *.json manifests")
+    ap.add_argument("--items-csv", help="CSV of items with an rfq_id column")
+    ap.add_argument("--defaults", help="JSON manifest applied under every RFQ")
+    ap.add_argument("--table-key", help="pdf_data_dict key the CSV rows fill (default: by wh_sub)")
+    ap.add_argument("-o", "--out-dir", default="rfq_out")
+    ap.add_argument("-j", "--workers", type=int, default=BATCH_WORKERS)
+    args = ap.parse_args(argv)
+
+    if bool(args.manifest_dir) == bool(args.items_csv):
+        ap.error("give either a manifest directory or --items-csv")
+
+    defaults = None
+    if args.defaults:
+        defaults = _load_json(args.defaults)
+        # Paths in the defaults file are relative to it, not to each manifest.
+        defaults = build_pdf_data(defaults, os.path.dirname(os.path.abspath(args.defaults)))
+
+    if args.items_csv:
+        jobs = csv_jobs(args.items_csv, defaults, args.table_key)
+    else:
+        jobs = manifest_jobs(args.manifest_dir, defaults)
+    if not jobs:
+        ap.error("no RFQs found")
+
+    t0 = time.perf_counter()
+    results = run_batch(jobs, args.out_dir, args.workers)
+    wall = time.perf_counter() - t0
+
+    failed = [r for r in results if not r["ok"]]
+    summary = {
+        "total": len(results),
+        "succeeded": len(results) - len(failed),
+        "failed": len(failed),
+        "workers": max(1, min(args.workers, len(jobs))),
+        "wall_seconds": round(wall, 3),
+        "rfqs_per_second": round(len(results) / wall, 2) if wall else None,
+        "results": results,
+    }
+    with open(os.path.join(args.out_dir, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+
+    print(f"{summary['succeeded']}/{summary['total']} RFQs rendered in {wall:.1f}s "
+          f"with {summary['workers']} workers -> {args.out_dir}")
+    for r in failed:
+        print(f"  FAILED {r['rfq_id']}: {r['error']}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
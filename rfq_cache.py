@@ -0,0 +1,478 @@
+"""
+Content-addressed cache of generated RFQ PDFs.
+
+pdf_cache_key() hashes a pdf_data_dict canonically (DataFrames by dtype
+and values, image bytes, dates, nested lists / dicts) together with the
+engine's own source and assets, so the same inputs rendered by the same
+code always map to the same key and any edit to either misses.  PDFCache
+keeps recent PDFs in an in-process LRU capped by total bytes, backed by a
+size-capped directory on disk that survives restarts.
+
+SectionCache sits one level down: it keeps laid-out tables keyed by
+section_key() of just that table's inputs, so a document that changed
+elsewhere re-uses them instead of filtering, formatting and measuring
+again.
+
+Like the rest of the engine this has no Streamlit dependency; pandas and
+numpy are only imported when a key is computed for a dict that holds a
+DataFrame.
+"""
+import hashlib
+import os
+import shutil
+import sys
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+
+PDF_CACHE_MEMORY_BYTES = 64 << 20     # in-process tier
+PDF_CACHE_DISK_BYTES = 512 << 20      # on-disk tier; 0 disables it
+PDF_CACHE_DIR = os.environ.get("RFQ_PDF_CACHE_DIR") or os.path.join(
+    os.path.expanduser("~"), ".cache", "rfq", "pdf")
+
+SECTION_CACHE_ENTRIES = 128           # laid-out sections kept in process
+SECTION_CACHE_BYTES = 64 << 20        # ... and their approximate total size
+SECTION_CACHE_MAX_ROWS = 2_000        # larger tables are streamed, not kept
+
+# pdf_data_dict keys that change how a document is rendered, not what it contains.
+_EXECUTION_KEYS = frozenset({"image_workers", "image_decode_isolation", "memory_budget_bytes"})
+
+_ENGINE_FILES = ("rfq_engine.py", "rfq_document.py", "rfq_tables.py", "rfq_text.py",
+                 "rfq_images.py", "rfq_templates.py", "rfq_fonts.py", "Image.png")
+
+
+# ==============================================================
+# CANONICAL HASHING
+# ==============================================================
+
+_engine_digest = None
+
+
+def _engine_version():
+    """Digest of the engine sources, the built-in logo, the Unicode font setup and the fpdf2 version."""
+    global _engine_digest
+    if _engine_digest is None:
+        import fpdf
+
+        import rfq_fonts
+
+        h = hashlib.blake2b(digest_size=16)
+        h.update(fpdf.FPDF_VERSION.encode())
+        for t in rfq_fonts.installed_typefaces():
+            h.update(f"{t}:{rfq_fonts._font_file(t, '')}".encode())
+        here = os.path.dirname(os.path.abspath(__file__))
+        for name in _ENGINE_FILES:
+            h.update(name.encode())
+            try:
+                with open(os.path.join(here, name), "rb") as f:
+                    h.update(f.read())
+            except OSError:
+                h.update(b"-")
+        _engine_digest = h.hexdigest()
+    return _engine_digest
+
+
+_BLOB_MIN = 4096     # bytes values at least this long are hashed once per key and fed as digests
+
+
+def _feed(h, v, blobs):
+    """
+    Write a type-tagged, order-stable encoding of v into hash h.  `blobs`
+    memoises large bytes by identity for one key, since the same image
+    object is usually repeated across rows and in storage_containers_images.
+    """
+    if v is None:
+        h.update(b"N;")
+    elif isinstance(v, bool):
+        h.update(b"B1;" if v else b"B0;")
+    elif isinstance(v, (bytes, bytearray, memoryview)):
+        h.update(b"Y%d:" % len(v))
+        if len(v) < _BLOB_MIN:
+            h.update(v)
+        else:
+            digest = blobs.get(id(v))
+            if digest is None:
+                digest = blobs[id(v)] = hashlib.blake2b(v, digest_size=20).digest()
+            h.update(digest)
+    elif isinstance(v, str):
+        b = v.encode("utf-8", "surrogatepass")
+        h.update(b"S%d:" % len(b))
+        h.update(b)
+    elif isinstance(v, int):
+        h.update(b"I%d;" % v)
+    elif isinstance(v, float):
+        h.update(b"F" + repr(v).encode() + b";")
+    elif isinstance(v, (date, datetime)):
+        h.update(type(v).__name__.encode() + v.isoformat().encode() + b";")
+    elif isinstance(v, dict):
+        h.update(b"D%d{" % len(v))
+        for k in sorted(v, key=repr):
+            _feed(h, k, blobs)
+            _feed(h, v[k], blobs)
+        h.update(b"}")
+    elif isinstance(v, (list, tuple)):
+        h.update(b"L%d[" % len(v))
+        for x in v:
+            _feed(h, x, blobs)
+        h.update(b"]")
+    elif type(v).__name__ == "DataFrame":
+        _feed_frame(h, v, blobs)
+    elif hasattr(v, "item") and getattr(v, "ndim", None) == 0:
+        _feed(h, v.item(), blobs)          # numpy scalar
+    else:
+        h.update(type(v).__name__.encode() + b"(" + repr(v).encode() + b");")
+
+
+def _feed_frame(h, df, blobs):
+    from pandas.util import hash_pandas_object
+
+    h.update(b"T%d,%d(" % df.shape)
+    _feed(h, [str(c) for c in df.columns], blobs)
+    h.update(hash_pandas_object(df.index).to_numpy().tobytes())
+    for i in range(df.shape[1]):
+        s = df.iloc[:, i]
+        h.update(str(s.dtype).encode() + b":")
+        if s.dtype == object:
+            types = {type(x) for x in s.to_numpy()}
+            # hash_pandas_object falls back to str() for mixed or non-text
+            # objects, which would make 1 and "1" (or image bytes and their
+            # repr) collide; hash those cell by cell instead.
+            if types - {str}:
+                _feed(h, s.tolist(), blobs)
+                continue
+        h.update(hash_pandas_object(s, index=False).to_numpy().tobytes())
+    h.update(b")")
+
+
+def section_key(name, inputs):
+    """Hex key for one section's inputs (any value _feed understands)."""
+    h = hashlib.blake2b(digest_size=20)
+    h.update(name.encode())
+    _feed(h, inputs, {})
+    return h.hexdigest()
+
+
+def pdf_cache_key(data):
+    """Hex key identifying the PDF create_advanced_rfq_pdf(data) produces."""
+    h = hashlib.blake2b(digest_size=20)
+    h.update(_engine_version().encode())
+    # `blobs` holds ids of objects that stay alive in `data` for the whole call.
+    _feed(h, {k: v for k, v in data.items() if k not in _EXECUTION_KEYS}, {})
+    return h.hexdigest()
+
+
+# ==============================================================
+# TWO-TIER CACHE
+# ==============================================================
+
+class PDFCache:
+    """
+    Byte-capped LRU of PDFs in memory in front of a byte-capped directory of
+    <key>.pdf files (least recently used evicted first, by mtime).  Each
+    entry keeps the PDF's page count beside it (a <key>.pages file on disk),
+    so a hit never has to parse the PDF.  The disk tier is best effort: I/O
+    errors count as misses and are otherwise ignored.
+    Safe to share between threads (Streamlit runs each session in its own).
+    """
+
+    def __init__(self, memory_bytes=PDF_CACHE_MEMORY_BYTES, disk_dir=PDF_CACHE_DIR,
+                 disk_bytes=PDF_CACHE_DISK_BYTES):
+        self._memory_bytes = memory_bytes
+        self._disk_dir = disk_dir if disk_bytes > 0 else None
+        self._disk_bytes = disk_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()    # key -> (pdf bytes, pages), oldest first
+        self._size = 0
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    # ── Memory tier ──────────────────────────────────────────────────────────
+    def _remember(self, key, pdf_bytes, pages):
+        if len(pdf_bytes) > self._memory_bytes or key in self._entries:
+            return
+        self._entries[key] = (pdf_bytes, pages)
+        self._size += len(pdf_bytes)
+        while self._size > self._memory_bytes:
+            _, (old, _) = self._entries.popitem(last=False)
+            self._size -= len(old)
+
+    # ── Disk tier ────────────────────────────────────────────────────────────
+    def _path(self, key):
+        return os.path.join(self._disk_dir, key + ".pdf")
+
+    @staticmethod
+    def _pages_path(path):
+        return path[:-len(".pdf")] + ".pages"
+
+    def _disk_pages(self, path):
+        try:
+            with open(self._pages_path(path)) as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def _disk_get(self, key):
+        if self._disk_dir is None:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                pdf_bytes = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        return pdf_bytes, self._disk_pages(path)
+
+    def _disk_copy(self, key, out):
+        if self._disk_dir is None:
+            return None
+        path = self._path(key)
+        try:
+            f = open(path, "rb")
+        except OSError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        # Once open, failures are the destination's and are raised.
+        with f:
+            if hasattr(out, "write"):
+                shutil.copyfileobj(f, out)
+            else:
+                with open(out, "wb") as dest:
+                    shutil.copyfileobj(f, dest)
+            return f.tell(), self._disk_pages(path)
+
+    def _disk_store(self, key, pages, write):
+        # write(tmp) fills the temporary file; the page count goes first so
+        # that a .pdf that exists has one.
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+        try:
+            os.makedirs(self._disk_dir, exist_ok=True)
+            if pages is not None:
+                with open(tmp, "w") as f:
+                    f.write(str(pages))
+                os.replace(tmp, self._pages_path(path))
+            write(tmp)
+            os.replace(tmp, path)
+            self._disk_evict()
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    def _disk_put(self, key, pdf_bytes, pages):
+        if self._disk_dir is None or len(pdf_bytes) > self._disk_bytes:
+            return
+        self._disk_store(key, pages, lambda tmp: _write(pdf_bytes, tmp))
+
+    def _disk_files(self):
+        files = []
+        with os.scandir(self._disk_dir) as it:
+            for e in it:
+                if e.name.endswith(".pdf"):
+                    try:
+                        st = e.stat()
+                    except OSError:
+                        continue
+                    files.append((st.st_mtime, st.st_size, e.path))
+        return files
+
+    def _disk_remove(self, path):
+        os.remove(path)
+        try:
+            os.remove(self._pages_path(path))
+        except OSError:
+            pass
+
+    def _disk_evict(self):
+        files = sorted(self._disk_files())
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self._disk_bytes:
+                break
+            try:
+                self._disk_remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    # ── Public API ───────────────────────────────────────────────────────────
+    def get(self, key):
+        """Cached (PDF bytes, page count) for key, or None.  The page count is None if unknown."""
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is not None:
+                self._entries.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return hit
+        hit = self._disk_get(key)
+        with self._lock:
+            if hit is None:
+                self._stats["misses"] += 1
+            else:
+                self._stats["disk_hits"] += 1
+                self._remember(key, *hit)
+        return hit
+
+    def put(self, key, pdf_bytes, pages=None):
+        with self._lock:
+            self._remember(key, pdf_bytes, pages)
+        self._disk_put(key, pdf_bytes, pages)
+
+    def copy_to(self, key, out):
+        """
+        Write the cached PDF for key to `out` (path or binary file) and
+        return (size, page count), or None on a miss.  A disk hit is copied
+        file to file and not loaded into the memory tier.
+        """
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is not None:
+                self._entries.move_to_end(key)
+                self._stats["memory_hits"] += 1
+        if hit is not None:
+            return _write(hit[0], out), hit[1]
+        hit = self._disk_copy(key, out)
+        with self._lock:
+            self._stats["misses" if hit is None else "disk_hits"] += 1
+        return hit
+
+    def put_file(self, key, path, pages=None):
+        """Add the PDF at `path` to the disk tier (only), copied file to file."""
+        if self._disk_dir is None:
+            return
+        try:
+            if os.path.getsize(path) > self._disk_bytes:
+                return
+        except OSError:
+            return
+        self._disk_store(key, pages, lambda tmp: shutil.copyfile(path, tmp))
+
+    def clear(self):
+        """Empty the memory tier and delete every cached file."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+        if self._disk_dir is not None and os.path.isdir(self._disk_dir):
+            for _, _, path in self._disk_files():
+                try:
+                    self._disk_remove(path)
+                except OSError:
+                    pass
+
+    def stats(self):
+        """Hit / miss counters and the current size of each tier."""
+        with self._lock:
+            out = dict(self._stats, memory_entries=len(self._entries), memory_bytes=self._size)
+        if self._disk_dir is not None and os.path.isdir(self._disk_dir):
+            try:
+                files = self._disk_files()
+            except OSError:
+                files = []
+            out.update(disk_entries=len(files), disk_bytes=sum(size for _, size, _ in files))
+        else:
+            out.update(disk_entries=0, disk_bytes=0)
+        lookups = out["memory_hits"] + out["disk_hits"] + out["misses"]
+        out["hit_rate"] = (out["memory_hits"] + out["disk_hits"]) / lookups if lookups else 0.0
+        return out
+
+
+def _write(pdf_bytes, out):
+    if hasattr(out, "write"):
+        out.write(pdf_bytes)
+    else:
+        with open(out, "wb") as f:
+            f.write(pdf_bytes)
+    return len(pdf_bytes)
+
+
+# ==============================================================
+# SECTION CACHE
+# ==============================================================
+
+def _footprint(value):
+    """
+    Approximate resident size of a cached section: every object reachable
+    through containers and instance attributes, each counted once.  Strings
+    shared with other caches are counted too, so it errs on the high side.
+    """
+    seen = set()
+    total = 0
+    stack = [value]
+    while stack:
+        v = stack.pop()
+        if id(v) in seen:
+            continue
+        seen.add(id(v))
+        total += sys.getsizeof(v)
+        if isinstance(v, (str, bytes, bytearray, int, float)):
+            continue
+        if isinstance(v, dict):
+            stack.extend(v.keys())
+            stack.extend(v.values())
+        elif isinstance(v, (list, tuple, set, frozenset)):
+            stack.extend(v)
+        elif hasattr(v, "__dict__"):
+            stack.append(vars(v))
+    return total
+
+
+class SectionCache:
+    """
+    LRU of laid-out document sections (filtered, formatted and measured
+    tables, wrapped text, page templates), keyed by a hash of just that
+    section's inputs.  A section is only re-laid out when its own inputs
+    change; its cached layout is drawn afresh into each document, so page
+    breaks and page numbers always come from the document being assembled.
+    Bounded both in entries and in approximate bytes; a section larger
+    than the whole byte budget is built but not kept.
+    """
+
+    def __init__(self, max_entries=SECTION_CACHE_ENTRIES, max_rows=SECTION_CACHE_MAX_ROWS,
+                 max_bytes=SECTION_CACHE_BYTES):
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()      # key -> (value, approximate bytes)
+        self._bytes = 0
+        self._stats = {"hits": 0, "misses": 0}
+
+    def get(self, name, inputs, build):
+        """The cached value for (name, inputs), or build() (cached for next time)."""
+        key = section_key(name, inputs)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return self._entries[key][0]
+            self._stats["misses"] += 1
+        value = build()
+        size = _footprint(value)
+        if size > self._max_bytes:
+            return value
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while len(self._entries) > self._max_entries or self._bytes > self._max_bytes:
+                self._bytes -= self._entries.popitem(last=False)[1][1]
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries), bytes=self._bytes)
+
+
+PDF_CACHE = PDFCache()
+SECTION_CACHE = SectionCache()
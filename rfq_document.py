@@ -0,0 +1,160 @@
+"""
+The FPDF subclass every RFQ is drawn on: page header with both logos,
+footer with company details and page numbers, and the navy section bar.
+Imported lazily by rfq_engine because fpdf2 is slow to import.
+"""
+from fpdf import FPDF
+
+import rfq_fonts
+from rfq_images import (
+    IMAGE_DECODE_ISOLATION, IMAGE_DOC_PIXEL_BUDGET, IMAGE_MAX_PIXELS, ImageRegistry, draw_image_placeholder,
+    output_settings,
+)
+from rfq_text import TEXT_MEASURER
+
+
+class RFQDocument(FPDF):
+    def __init__(self, data, logo2=None, *args, decoded_images=None, trace=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._data = data
+        self.trace = trace                   # rfq_trace.RenderTrace, or None when not instrumented
+        self._logo2 = logo2
+        settings = output_settings(data)
+        self.compress = settings["compress"]
+        self.draft = settings["draft"]       # images become placeholders, pages get a watermark
+        self._images = ImageRegistry(
+            self,
+            dpi=settings["image_dpi"],
+            quality=settings["image_jpeg_quality"],
+            max_pixels=data.get('image_max_pixels', IMAGE_MAX_PIXELS),
+            pixel_budget=data.get('image_pixel_budget', IMAGE_DOC_PIXEL_BUDGET),
+            isolate=data.get('image_decode_isolation', IMAGE_DECODE_ISOLATION),
+            decoded=decoded_images,
+        )
+        self._text = TEXT_MEASURER
+        self._font_mode = rfq_fonts.font_mode(data)
+        self._font_chars = rfq_fonts.document_chars(data) if self._font_mode != "core" else None
+        self._cmaps = {}                     # Unicode face added -> code points it has glyphs for
+        self.set_auto_page_break(auto=True, margin=38)
+
+    # ── Fonts ────────────────────────────────────────────────────────────────
+    # The engine draws everything in 'Arial'.  In a Unicode document that
+    # family is the embedded TrueType font, added style by style on first
+    # use from a subset holding this document's characters; otherwise fpdf2
+    # substitutes core Helvetica as before.
+    def set_font(self, family=None, style="", size=0):
+        if self._font_mode != "core" and family and family.lower() == "arial":
+            face, style = rfq_fonts.face(self._font_mode, getattr(style, "style", style))
+            if face not in self._cmaps:
+                path, self._cmaps[face] = rfq_fonts.subset_file(self._font_mode, face, self._font_chars)
+                self.add_font("arial", face, path)
+        super().set_font(family, style, size)
+
+    def normalize_text(self, text):
+        cmap = None
+        if self.is_ttf_font:
+            cmap = self._cmaps["".join(c for c in self.font_style if c in "BI")]
+        return super().normalize_text(rfq_fonts.normalize(text, cmap))
+
+    def header(self):
+        if self.page_no() == 1:
+            return
+
+        logo1_data = self._data.get('logo1_data')
+        logo2_data = self._logo2
+        logo1_w = self._data.get('logo1_w', 35)
+        logo1_h = self._data.get('logo1_h', 18)
+        logo2_w = 45
+        logo2_h = 20
+        header_h = max(logo1_h if logo1_data else 0, logo2_h if logo2_data else 0, 10)
+        logo_y = 6
+
+        if logo1_data:
+            self.place_logo(logo1_data, self.l_margin, logo_y + (header_h - logo1_h) / 2, logo1_w, logo1_h)
+        if logo2_data:
+            self.place_logo(logo2_data, self.w - self.r_margin - logo2_w,
+                            logo_y + (header_h - logo2_h) / 2, logo2_w, logo2_h)
+
+        title_text = 'Request for Quotation (RFQ)'
+        self.set_font('Arial', 'B', 11)
+        left_end = self.l_margin + (logo1_w + 4 if logo1_data else 0)
+        right_start = self.w - self.r_margin - (logo2_w + 4 if logo2_data else 0)
+        mid_w = right_start - left_end
+        if mid_w > 20:
+            title_h = 6
+            title_y = logo_y + (header_h - title_h) / 2
+            self.set_xy(left_end, title_y)
+            self.cell(mid_w, title_h, title_text, 0, 0, 'C')
+
+        self.set_y(logo_y + header_h + 3)
+        self.set_draw_color(180, 180, 180)
+        self.line(self.l_margin, self.get_y(), self.w - self.r_margin, self.get_y())
+        self.set_draw_color(0, 0, 0)
+        self.ln(3)
+
+    def footer(self):
+        self.set_y(-30)
+        self.set_draw_color(180, 180, 180)
+        self.line(self.l_margin, self.get_y(), self.w - self.r_margin, self.get_y())
+        self.set_draw_color(0, 0, 0)
+        self.ln(1)
+
+        self.set_font('Arial', 'B', 9)
+        self.set_text_color(80, 80, 80)
+        self.cell(0, 5, 'APL-Confidential', 0, 1, 'R')
+        self.ln(1)
+
+        fn = self._data.get('footer_company_name', 'Agilomatrix Private Ltd')
+        self.set_font('Arial', 'B', 13)
+        self.set_text_color(0, 0, 0)
+        self.cell(0, 6, fn, 0, 1, 'C')
+
+        fa = self._data.get('footer_company_address',
+                            'Registered Office: F1403, 7 Plumeria Drive, 7PD Street, Tathawade, Pune - 411033')
+        self.set_font('Arial', '', 8)
+        self.set_text_color(120, 120, 120)
+        self.cell(0, 5, fa, 0, 1, 'C')
+
+        self.set_font('Arial', '', 8)
+        self.cell(0, 5, f'Page {self.page_no()}/{{nb}}', 0, 0, 'C')
+        self.set_text_color(0, 0, 0)
+        if self.draft:
+            self._draft_watermark()
+
+    def _draft_watermark(self):
+        # Drawn with the footer, i.e. once the page's content is complete, so
+        # it lies over everything; translucent so that content stays legible.
+        cx, cy = self.w / 2, self.h / 2
+        with self.local_context(text_color=(200, 40, 40), fill_opacity=0.15):
+            self.set_font('Arial', 'B', 110)
+            with self.rotation(45, cx, cy):
+                self.text(cx - self.get_string_width('DRAFT') / 2, cy + 13, 'DRAFT')
+
+    def place_logo(self, logo_data, x, y, w, h):
+        """
+        Draw a logo stretched to w x h.  It is resampled for that slot like
+        any other image, so it counts against the pixel budget and is
+        decoded in isolation; a logo that cannot be drawn becomes a
+        placeholder box.
+        """
+        if not logo_data:
+            return
+        try:
+            self._images.place_prepared(logo_data, x, y, w, h, fit=False)
+        except Exception:
+            draw_image_placeholder(self, x, y, w, h, label="Logo unavailable")
+
+    def section_title(self, title):
+        self.set_font('Arial', 'B', 12)
+        self.set_fill_color(26, 58, 92)
+        self.set_text_color(255, 255, 255)
+        usable = self.w - self.l_margin - self.r_margin
+        sx = self.l_margin
+        sy = self.get_y()
+        sh = 9
+        self.rect(sx, sy, usable, sh, 'F')
+        self.set_xy(sx + 2, sy + 2)
+        self.multi_cell(usable - 4, 6, f'  {title}', border=0, align='L')
+        self.set_text_color(0, 0, 0)
+        self.set_y(sy + sh)
+        self.ln(3)
@@ -0,0 +1,135 @@
+"""
+Row state behind the app's st.data_editor tables.
+
+st.data_editor reports what the user changed as a delta against the frame
+it was handed, cumulative since then:
+
+    {"edited_rows": {position: {column: value}},
+     "added_rows": [{column: value}],
+     "deleted_rows": [position]}
+
+EditorTable applies such a delta in one batched pass: cell edits are
+grouped by column and set together, added rows are built into one frame
+and concatenated once, and deleted rows are dropped in one call, so the
+cost follows the size of the edit rather than edits x rows.
+
+Every row has a stable id, the frame's index.  Ids survive rows being
+added or deleted around them, so per-row state kept beside a table (the
+Storage Container images) is keyed by id, not by position.  Whenever rows
+are added or deleted the table is re-based: the current rows become the
+frame the widget is handed, new rows take fresh ids and the widget key
+moves on, so the editor restarts from an empty delta.  Cell edits alone
+leave the widget as it is.
+
+The widget's on_change only marks the table: it keeps a reference to the
+delta, bumps the table's version and sets its dirty flag.  The delta is
+applied once, the next time the rows are read (sync()), so whoever reads
+them, the next run of the page or the submit handler, gets the
+authoritative rows without comparing candidates.
+
+Like the engine modules this has no Streamlit dependency.
+"""
+import numpy as np
+import pandas as pd
+
+
+class EditorTable:
+    """The rows of one data editor, its delta applied, with stable row ids and a version."""
+
+    def __init__(self, df, key):
+        df = df.reset_index(drop=True)
+        self.key = key            # widget key, before the version it was re-based at
+        self.version = 0          # bumped by every change the widget reports
+        self.dirty = False        # a reported change is not in `data` yet
+        self.frozen = df          # what the widget is handed; index = row ids
+        self.data = df            # frozen with the widget's delta applied
+        self.next_id = len(df)
+        self._based_at = 0
+        self._pending = None
+
+    @property
+    def widget_key(self):
+        return f"{self.key}_v{self._based_at}"
+
+    def mark(self, delta):
+        """The widget's on_change: note its (cumulative) delta, to be applied by sync()."""
+        self._pending = delta if isinstance(delta, dict) else None
+        self.version += 1
+        self.dirty = True
+
+    def sync(self):
+        """
+        Bring `data` up to date with the last delta marked (re-basing if it
+        added or deleted rows); returns the ids of the rows it deleted.
+        """
+        if not self.dirty:
+            return []
+        delta, self._pending, self.dirty = self._pending, None, False
+        if delta is None:
+            return []
+        self.data, added, deleted = apply_delta(self.frozen, delta, self.next_id)
+        if added or deleted:
+            self.frozen = self.data
+            self.next_id += added
+            self._based_at = self.version
+        return deleted
+
+
+def apply_delta(frozen, delta, next_id):
+    """
+    (frame, rows added, ids deleted): `frozen` with one data-editor delta
+    applied in a single pass.  Added rows take ids from next_id on and
+    default missing cells to "".  Positions refer to frozen's rows, as
+    the editor reports them; out-of-range ones are ignored.
+    """
+    edited = delta.get("edited_rows") or {}
+    added = delta.get("added_rows") or []
+    deleted = delta.get("deleted_rows") or []
+    n = len(frozen)
+    # Copy-on-write: only the columns the edits touch are actually copied.
+    df = frozen.copy(deep=False) if edited else frozen
+
+    if edited:
+        by_col = {}
+        for pos, changes in edited.items():
+            pos = int(pos)
+            if pos < n:
+                for col, val in changes.items():
+                    cell = by_col.setdefault(col, ([], []))
+                    cell[0].append(pos)
+                    cell[1].append(val)
+        for col, (rows, vals) in by_col.items():
+            if col in df.columns:
+                _set_cells(df, col, rows, vals)
+
+    deleted_ids = []
+    if deleted:
+        positions = sorted({int(i) for i in deleted if int(i) < n})
+        deleted_ids = df.index[positions].tolist()
+        df = df.drop(index=deleted_ids)
+
+    if added:
+        rows = pd.DataFrame([{c: r.get(c, "") for c in df.columns} for r in added],
+                            columns=df.columns, index=range(next_id, next_id + len(added)))
+        df = pd.concat([df, rows]) if len(df) else rows
+
+    return df, len(added), deleted_ids
+
+
+def _set_cells(df, col, rows, vals):
+    """
+    Set column `col` at positions `rows` to `vals`.  The editor can put
+    values a column's dtype does not hold (a cleared cell in an int column,
+    text in a number column); the column is then rebuilt with the dtype
+    pandas infers for its new values: float for a cleared int cell, object
+    for text among numbers.
+    """
+    s = df[col]
+    if s.dtype.kind in "iuf":
+        vals = [np.nan if v is None else v for v in vals]
+    try:
+        df.iloc[rows, df.columns.get_loc(col)] = vals
+    except (TypeError, ValueError):
+        new = s.to_numpy(dtype=object, copy=True)
+        new[rows] = vals
+        df[col] = pd.Series(new, index=s.index, name=col).infer_objects()
@@ -0,0 +1,1294 @@
+"""
+RFQ PDF engine: the spec templates, text and table helpers, and the
+renderer that turns a pdf_data_dict into a PDF.  It has no Streamlit
+dependency; rfq.py is a thin UI over create_advanced_rfq_pdf(), and the
+same renderer can run in a worker process, a test or a batch job.
+
+Importing this module is cheap.  pandas is imported inside the helpers
+that need it, and fpdf2 (which pulls in Pillow, numpy and fontTools) only
+when the first document is rendered; benchmarks/bench_import.py checks
+the cold-import budget.
+"""
+import os
+import re
+from contextlib import nullcontext
+
+from rfq_images import IMAGE_WORKERS, DecodedImages, draw_image_placeholder, output_settings
+from rfq_cache import SECTION_CACHE
+from rfq_tables import CellStyle, Column, Table, TableLayout
+from rfq_templates import PageTemplate, Slot
+from rfq_trace import MEMORY_BUDGET_BYTES, MemoryMeter, RenderTrace, span, traced
+
+# -- Logo 2 — Agilomatrix logo loaded from fixed path "Image.png"
+_LOGO2_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Image.png")
+
+def _load_logo2_bytes():
+    try:
+        with open(_LOGO2_PATH, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+LOGO2_BYTES = _load_logo2_bytes()
+
+
+# --- SPEC TABLE DATA ---
+MODEL_DETAILS_ROWS = [
+    {"Sr.no": 1,  "Category": "Dimensions of VStore",        "Description": "Height (mm)",                       "UNIT": "mm",     "Requirement": ""},
+    {"Sr.no": "",  "Category": "",                  "Description": "Width (mm)",                        "UNIT": "mm",     "Requirement": ""},
+    {"Sr.no": "",  "Category": "",                  "Description": "Depth (mm)",                        "UNIT": "mm",     "Requirement": ""},
+    {"Sr.no": "",  "Category": "",                  "Description": "Floor area (m2)",                   "UNIT": "m2",     "Requirement": ""},
+    {"Sr.no": "",  "Category": "",                  "Description": "1st Access Point Height (mm)",      "UNIT": "mm",     "Requirement": ""},
+    {"Sr.no": "",  "Category": "",                  "Description": "2nd Access Point Height (mm)",      "UNIT": "mm",     "Requirement": ""},
+    {"Sr.no": "",  "Category": "",                  "Description": "3rd Access Point Height (mm)",      "UNIT": "mm",     "Requirement": ""},
+    {"Sr.no": "",  "Category": "",                  "Description": "4th Access Point Height (mm)",      "UNIT": "mm",     "Requirement": ""},
+    {"Sr.no": "",  "Category": "",                  "Description": "Dead weight of Machine (Kg)",       "UNIT": "Kg",     "Requirement": ""},
+    {"Sr.no": "",  "Category": "",                  "Description": "Total Weight of Tray (Kg)",         "UNIT": "Kg",     "Requirement": "MS Steel"},
+    {"Sr.no": "",  "Category": "",                  "Description": "Total Weight of Machine (Kg)",      "UNIT": "Kg",     "Requirement": "Powder Coated"},
+    {"Sr.no": "",  "Category": "",                  "Description": "Storage capacity (Kg)",             "UNIT": "Kg",     "Requirement": ""},
+    {"Sr.no": "",  "Category": "",                  "Description": "Total Machine carrying capacity",   "UNIT": "Kg",     "Requirement": ""},
+    {"Sr.no": "",  "Category": "",                  "Description": "Total full weight (Kg)",            "UNIT": "Kg",     "Requirement": ""},
+    {"Sr.no": 2,  "Category": "Floor Load",         "Description": "Total (Kgs/sqm)",                  "UNIT": "Kg/m2",  "Requirement": ""},
+    {"Sr.no": 3,  "Category": "Tray Details",       "Description": "Usable width (mm)",                "UNIT": "mm",     "Requirement": ""},
+    {"Sr.no": "",  "Category": "",                  "Description": "Usable depth (mm)",                "UNIT": "mm",     "Requirement": ""},
+    {"Sr.no": "",  "Category": "",                  "Description": "Empty Tray weight",                "UNIT": "Kg",     "Requirement": ""},
+    {"Sr.no": "",  "Category": "",                  "Description": "Area of each Trays (mm)",          "UNIT": "mm2",    "Requirement": ""},
+    {"Sr.no": "",  "Category": "",                  "Description": "Maximum Load capacity (Kg)",       "UNIT": "Kg",     "Requirement": ""},
+    {"Sr.no": "",  "Category": "",                  "Description": "Number of Trays (Nos.)",           "UNIT": "Nos",    "Requirement": ""},
+    {"Sr.no": "",  "Category": "",                  "Description": "Total area of all Trays (m2)",     "UNIT": "m2",     "Requirement": ""},
+    {"Sr.no": 4,  "Category": "Access time",        "Description": "Maximum (Sec.)",                   "UNIT": "Sec",    "Requirement": ""},
+    {"Sr.no": "",  "Category": "",                  "Description": "Average (Sec.)",                   "UNIT": "Sec",    "Requirement": ""},
+    {"Sr.no": 5,  "Category": "No Trays can Fetch", "Description": "No trays / Hour",                  "UNIT": "Nos/hr", "Requirement": ""},
+    {"Sr.no": 6,  "Category": "Power Supply",       "Description": "",                                 "UNIT": "",       "Requirement": ""},
+    {"Sr.no": 7,  "Category": "Maximum Power rating","Description": "",                                "UNIT": "kW",     "Requirement": ""},
+    {"Sr.no": 8,  "Category": "Control Panel",      "Description": "Standard control panel",          "UNIT": "",       "Requirement": ""},
+    {"Sr.no": 9,  "Category": "Height Optimisation","Description": "Provided for storage",             "UNIT": "",       "Requirement": ""},
+    {"Sr.no": 10, "Category": "Operator Panel",     "Description": "",                                 "UNIT": "",       "Requirement": ""},
+    {"Sr.no": 11, "Category": "Accessories",        "Description": "Emergency stop",                  "UNIT": "",       "Requirement": ""},
+    {"Sr.no": "",  "Category": "",                  "Description": "Accident protection light curtains","UNIT": "",      "Requirement": ""},
+    {"Sr.no": "",  "Category": "",                  "Description": "Lighting in the accessing area",   "UNIT": "",       "Requirement": ""},
+]
+
+KEY_FEATURES_ROWS = [
+    {"Sr.no": 1,  "Description": "Material Tracking",                               "Status": "", "Remarks": "All key features to be confirmed by vendor."},
+    {"Sr.no": 2,  "Description": "Tray Details",                                    "Status": "", "Remarks": ""},
+    {"Sr.no": 3,  "Description": "Inventory List",                                  "Status": "", "Remarks": ""},
+    {"Sr.no": 4,  "Description": "Tray Call History",                               "Status": "", "Remarks": ""},
+    {"Sr.no": 5,  "Description": "Alarm History",                                   "Status": "", "Remarks": ""},
+    {"Sr.no": 6,  "Description": "Item Code Search",                                "Status": "", "Remarks": ""},
+    {"Sr.no": 7,  "Description": "Bar Code Search",                                 "Status": "", "Remarks": ""},
+    {"Sr.no": 8,  "Description": "Pick from BOM",                                   "Status": "", "Remarks": ""},
+    {"Sr.no": 9,  "Description": "BOM Items List",                                  "Status": "", "Remarks": ""},
+    {"Sr.no": 10, "Description": "User Management, with backup and restore options","Status": "", "Remarks": ""},
+]
+
+INBUILT_FEATURES_ROWS = [
+    {"Sr.no": 1,  "Description": "Ergonomic tray positioning",                                     "Vendor Scope (Yes/No)": "", "Remarks": "All features to be included at vendor side."},
+    {"Sr.no": 2,  "Description": "Variable frequency drives",                                      "Vendor Scope (Yes/No)": "", "Remarks": ""},
+    {"Sr.no": 3,  "Description": "Tray uneven positioning sensor",                                 "Vendor Scope (Yes/No)": "", "Remarks": ""},
+    {"Sr.no": 4,  "Description": "Light barrier for sensing material and operator intervention",   "Vendor Scope (Yes/No)": "", "Remarks": ""},
+    {"Sr.no": 5,  "Description": "Operator Panel with IPC",                                        "Vendor Scope (Yes/No)": "", "Remarks": ""},
+    {"Sr.no": 6,  "Description": "Weight management system for sensing tray overload",             "Vendor Scope (Yes/No)": "", "Remarks": ""},
+    {"Sr.no": 7,  "Description": "Tray Block option for Multiple users",                           "Vendor Scope (Yes/No)": "", "Remarks": ""},
+    {"Sr.no": 8,  "Description": "Password authentication",                                        "Vendor Scope (Yes/No)": "", "Remarks": ""},
+    {"Sr.no": 9,  "Description": "Tray guide rail @ 50 pitch",                                    "Vendor Scope (Yes/No)": "", "Remarks": ""},
+    {"Sr.no": 10, "Description": "Total machine capacity 60 tone",                                 "Vendor Scope (Yes/No)": "", "Remarks": ""},
+    {"Sr.no": 11, "Description": "Expansion at later stage is possible",                           "Vendor Scope (Yes/No)": "", "Remarks": ""},
+    {"Sr.no": 12, "Description": "Inventory management software",                                  "Vendor Scope (Yes/No)": "", "Remarks": ""},
+]
+
+INSTALLATION_ROWS = [
+    {"Sr.no": 1,  "Category": "Inventory Management Suite (IPC)",                        "Vendor Scope (Yes/No)": "", "Customer Scope (Yes/No)": "", "Remarks": ""},
+    {"Sr.no": 2,  "Category": "Packing, Freight & Transit Insurance",                    "Vendor Scope (Yes/No)": "", "Customer Scope (Yes/No)": "", "Remarks": ""},
+    {"Sr.no": 3,  "Category": "Installation & Commissioning",                            "Vendor Scope (Yes/No)": "", "Customer Scope (Yes/No)": "", "Remarks": ""},
+    {"Sr.no": 4,  "Category": "Training",                                                "Vendor Scope (Yes/No)": "", "Customer Scope (Yes/No)": "", "Remarks": ""},
+    {"Sr.no": 5,  "Category": "Warranty Period",                                         "Vendor Scope (Yes/No)": "", "Customer Scope (Yes/No)": "", "Remarks": ""},
+    {"Sr.no": 6,  "Category": "Unloading of material",                                  "Vendor Scope (Yes/No)": "", "Customer Scope (Yes/No)": "", "Remarks": ""},
+    {"Sr.no": 7,  "Category": "Material handling during the installation",               "Vendor Scope (Yes/No)": "", "Customer Scope (Yes/No)": "", "Remarks": ""},
+    {"Sr.no": 8,  "Category": "Power cable cost main junction Box to Machine",           "Vendor Scope (Yes/No)": "", "Customer Scope (Yes/No)": "", "Remarks": ""},
+    {"Sr.no": 9,  "Category": "Biometric Access, Barcode Scanner",                      "Vendor Scope (Yes/No)": "", "Customer Scope (Yes/No)": "", "Remarks": ""},
+    {"Sr.no": 10, "Category": "MS Office",                                               "Vendor Scope (Yes/No)": "", "Customer Scope (Yes/No)": "", "Remarks": ""},
+    {"Sr.no": 11, "Category": "Software Customization",                                  "Vendor Scope (Yes/No)": "", "Customer Scope (Yes/No)": "", "Remarks": ""},
+    {"Sr.no": 12, "Category": "Machine Integration with ERP system (extra at Actual)",   "Vendor Scope (Yes/No)": "", "Customer Scope (Yes/No)": "", "Remarks": ""},
+    {"Sr.no": 13, "Category": "UPS and Stabilizer with accessories Installation",        "Vendor Scope (Yes/No)": "", "Customer Scope (Yes/No)": "", "Remarks": ""},
+    {"Sr.no": 14, "Category": "Equipment Movement & Installation location",              "Vendor Scope (Yes/No)": "", "Customer Scope (Yes/No)": "", "Remarks": ""},
+    {"Sr.no": 15, "Category": "PEB Cladding and Civil Floor for outside installation",   "Vendor Scope (Yes/No)": "", "Customer Scope (Yes/No)": "", "Remarks": ""},
+]
+
+SPEC_TEMPLATE = {
+    "Model Details": MODEL_DETAILS_ROWS,
+    "Key Features": KEY_FEATURES_ROWS,
+    "Inbuilt features": INBUILT_FEATURES_ROWS,
+    "Installation Accountability": INSTALLATION_ROWS,
+}
+
+ITEM_TABLE_HEADERS = [
+    "Sr.No", "Description", "OL (mm)", "OW (mm)", "OH (mm)",
+    "Base Type", "Color", "Weight Kg", "Load Capacity", "LID", "Qty",
+    "Conceptual Image"
+]
+ITEM_TABLE_COL_WIDTHS = [8, 34, 13, 13, 13, 17, 13, 15, 18, 11, 9, 26]
+CONTAINER_IMG_W, CONTAINER_IMG_H = 22, 21   # conceptual image size inside its cell (mm)
+
+
+# ==============================================================
+# TEXT CLEANING UTILITIES
+# ==============================================================
+
+def _safe_text(t):
+    # Characters the document's font cannot show are replaced by
+    # RFQDocument.normalize_text(), once the font is known.
+    if not t:
+        return ""
+    return str(t)
+
+
+def _normalize_paragraph(text):
+    if not text:
+        return ""
+    text = re.sub(r'[\t\r]+', ' ', text)
+    text = re.sub(r'([.!?])([A-Za-z(])', r'\1 \2', text)
+    text = re.sub(r'([,;:])([A-Za-z(])', r'\1 \2', text)
+    text = re.sub(r' {2,}', ' ', text)
+    return text.strip()
+
+
+def _prepare_purpose_text(raw_text):
+    if not raw_text:
+        return []
+    raw_paragraphs = re.split(r'\n\s*\n', raw_text)
+    result = []
+    for para in raw_paragraphs:
+        lines = [line.strip() for line in para.split('\n') if line.strip()]
+        joined = ' '.join(lines)
+        if joined:
+            cleaned = _normalize_paragraph(_safe_text(joined))
+            if cleaned:
+                result.append(cleaned)
+    return result
+
+
+def _clean(v):
+    if v is None or str(v).strip().lower() in ("nan", "none", ""):
+        return ""
+    try:
+        f = float(v)
+        return str(int(f)) if f == int(f) else str(f)
+    except Exception:
+        return str(v).strip()
+
+
+# ==============================================================
+# CELL FORMATTING
+# ==============================================================
+# _clean() applied a column at a time.  Numeric dtypes never see a string,
+# and in text columns only cells shaped like a number reach float(), so the
+# try/except no longer fires on every Description / Category cell.
+
+# Superset of the finite literals float() accepts once stripped.  Anything
+# else (words, 'inf', 'nan') comes back from _clean() as its stripped text.
+_NUMBER_RE = r'[+-]?(?:\d[\d_]*(?:\.[\d_]*)?|\.\d[\d_]*)(?:[eE][+-]?\d[\d_]*)?'
+
+
+def _format_floats(a):
+    import numpy as np
+    integral = np.isfinite(a) & (np.floor(a) == a)
+    return ["" if f != f else str(int(f)) if i else str(f)
+            for f, i in zip(a.tolist(), integral.tolist())]
+
+
+def _format_text(values):
+    import numpy as np
+    import pandas as pd
+    text = pd.Series(values.astype(str), dtype=object).str.strip()
+    out = text.mask(text.str.lower().isin(("nan", "none", "")), "")
+    # bools stringify as True/False but _clean() reads them as 1/0
+    numeric = (out.str.fullmatch(_NUMBER_RE) | out.isin(("True", "False"))).to_numpy(dtype=bool)
+    out = out.tolist()
+    for i in np.flatnonzero(numeric).tolist():
+        out[i] = _clean(values[i])
+    return out
+
+
+def _format_column(df, col):
+    """[_clean(v) for v in df[col]], computed per dtype; all '' if the column is absent."""
+    import numpy as np
+    if col not in df.columns:
+        return [""] * len(df)
+    s = df[col]
+    kind = s.dtype.kind if isinstance(s.dtype, np.dtype) else "O"
+    if kind == "b":
+        return ["1" if v else "0" for v in s.tolist()]
+    if kind in "iu":
+        return _format_floats(s.to_numpy(dtype=float))
+    if kind == "f":
+        return _format_floats(s.to_numpy())
+    return _format_text(s.to_numpy(dtype=object))
+
+
+def _format_columns(df, cols):
+    """Ready-to-draw string columns for `cols`; zip(*...) gives the rows."""
+    return [_format_column(df, c) for c in cols]
+
+
+# ==============================================================
+# SPEC FILTERING
+# ==============================================================
+
+def _text_col(df, col, default=""):
+    """df[col] as stripped strings (str() semantics, so None -> 'None'); `default` if absent."""
+    import pandas as pd
+    if col not in df.columns:
+        return pd.Series(default, index=df.index, dtype=object)
+    # numpy's object->str cast calls str() per cell; Series.astype(str) would keep NaN as NaN.
+    text = df[col].to_numpy(dtype=object).astype(str)
+    return pd.Series(text, index=df.index, dtype=object).str.strip()
+
+
+def _blank_mask(s):
+    """True where a stripped-string column reads '', 'nan' or 'none' (any case)."""
+    return s.str.lower().isin(("", "nan", "none"))
+
+
+def nonblank_rows(df, cols):
+    """Boolean mask of rows with at least one non-blank value in `cols`; missing columns count as blank."""
+    import pandas as pd
+    mask = pd.Series(False, index=df.index)
+    for c in cols:
+        if c in df.columns:
+            mask |= ~_blank_mask(_text_col(df, c))
+    return mask
+
+
+def _filter_model_details(df):
+    """
+    FIX: Only keep rows that have a non-empty Requirement value.
+    For groups (rows sharing a Sr.no / Category header), we carry the Sr.no
+    and Category forward ONLY onto the first kept row in each group, so the
+    PDF still shows the group label — but empty-requirement rows are dropped.
+    """
+    import pandas as pd
+
+    if df is None or df.empty:
+        return df
+
+    # ── Step 1: group membership — a new group starts on any non-empty
+    #            Sr.no or Category, and carries forward until the next ──────
+    sr  = _text_col(df, "Sr.no")
+    cat = _text_col(df, "Category")
+    starts = (sr != "") | (cat != "")
+    unit = _text_col(df, "UNIT") if "UNIT" in df.columns else _text_col(df, "Unit")
+    flat = pd.DataFrame({
+        "sr":   sr.where(starts).ffill().fillna(""),
+        "cat":  cat.where(starts).ffill().fillna(""),
+        "desc": _text_col(df, "Description"),
+        "unit": unit,
+        "req":  _text_col(df, "Requirement"),
+    })
+
+    # ── Step 2: keep only rows where Requirement is filled ───────────────────
+    kept = flat[~_blank_mask(flat["req"])]
+
+    if kept.empty:
+        return pd.DataFrame()   # nothing to show
+
+    # ── Step 3: for each group that has kept rows, show Sr.no & Category only
+    #            on the FIRST kept row of that group ──────────────────────────
+    repeat = kept.duplicated(["sr", "cat"]).to_numpy()
+    return pd.DataFrame({
+        "Sr.no":       kept["sr"].mask(repeat, "").tolist(),
+        "Category":    kept["cat"].mask(repeat, "").tolist(),
+        "Description": kept["desc"].tolist(),
+        "UNIT":        kept["unit"].tolist(),
+        "Requirement": kept["req"].tolist(),
+    })
+
+
+def _filter_navy_df(df, value_cols):
+    if df is None or df.empty:
+        return df
+    return df[nonblank_rows(df, value_cols)].reset_index(drop=True)
+
+
+# ==============================================================
+# TABLE LAYOUTS
+# ==============================================================
+
+# Item and container tables are formatted, measured and (for containers)
+# image-prepared this many rows at a time, so a 20k-row list never holds
+# more than one slice of wrapped text or resampled images.
+TABLE_CHUNK_ROWS = 500
+
+
+def _row_chunks(df, size=TABLE_CHUNK_ROWS):
+    """(offset, slice) pairs covering df in order."""
+    for start in range(0, len(df), size):
+        yield start, df.iloc[start:start + size]
+
+
+def _draw_lines(pdf, w, h, lines, align='L'):
+    """Draw lines wrapped by pdf._text.lines(pdf, text, w) as pdf.multi_cell(w, h, text) draws text."""
+    last = len(lines) - 1
+    for i, line in enumerate(lines):
+        pdf.cell(w, h, line, 0, align=align, new_x="RIGHT" if i == last else "LEFT", new_y="NEXT")
+
+
+def _kept(layout, keep):
+    """Freeze a lazily measured layout when it is going into the section cache."""
+    return layout.frozen() if keep else layout
+
+
+_MODEL_DETAILS_TABLE = Table(
+    [Column("Sr.no", 10, align="C", valign="middle", span=True),
+     Column("Category", 42, span=True),
+     Column("Description", 72),
+     Column("UNIT", 22, align="C", valign="middle"),
+     Column("Requirement", 44, align="C", fill=(255, 255, 204))],
+    header=CellStyle(9, "B", min_h=14, pad=6, valign="middle"),
+    body=CellStyle(9),
+)
+
+_CONTAINER_TABLE = Table(
+    [Column(h, w, align="C",
+            image=(CONTAINER_IMG_W, CONTAINER_IMG_H) if h == "Conceptual Image" else None)
+     for h, w in zip(ITEM_TABLE_HEADERS, ITEM_TABLE_COL_WIDTHS)],
+    header=CellStyle(10, "B", line_h=4, min_h=14, pad=4, top=2, inset=0),
+    body=CellStyle(10, line_h=6, min_h=30, pad=4, valign="middle"),
+)
+
+_GENERIC_ITEMS_TABLE = Table(
+    [Column("Sr.No", 12),
+     Column("Item Name", 40),
+     Column("Description / Specification", 70),
+     Column("Quantity", 18, align="C"),
+     Column("Unit", 18, align="C"),
+     Column("Remarks", 32, align="C")],
+    header=CellStyle(11, "B", line_h=6, min_h=9, pad=3),
+    body=CellStyle(9),
+)
+
+
+# ==============================================================
+# PDF GENERATION
+# ==============================================================
+
+def _layout_image_slot(n, usable_w):
+    """(w, h) in mm of each slot on the LAYOUT page when it shows n images."""
+    if n == 1:
+        img_w = usable_w * 0.75
+        return img_w, img_w * 0.65
+    img_w = (usable_w - 6) / 2
+    return img_w, img_w * (0.7 if n == 2 else 0.65)
+
+
+def _collect_image_jobs(data, usable_w):
+    """
+    List the layout images create_advanced_rfq_pdf will place, as
+    (img_bytes, w_mm, h_mm, fit) jobs for ImageRegistry.preload.  Mirrors the
+    category branching of the builder.  Container images are prepared
+    slice by slice in render_container_table instead, so they are never
+    all decoded at once.
+    """
+    rfq_category = data.get('rfq_category', 'General')
+    if not data.get('use_custom_spec', False) and rfq_category != "Warehouse Equipment":
+        return []
+
+    layout_images = data.get('layout_images', [])
+    if not layout_images:
+        return []
+    img_w, img_h = _layout_image_slot(len(layout_images), usable_w)
+    return [(b, img_w, img_h, True) for b in layout_images]
+
+
+# (image dpi, JPEG quality) steps the max_output_bytes search walks down,
+# best first.  Only those below the output profile's own dpi are tried.
+OUTPUT_QUALITY_STEPS = [(300, 92), (220, 88), (150, 85), (120, 80), (100, 72), (85, 62), (72, 50)]
+
+
+class RFQRenderer:
+    """
+    Draws RFQ documents.  The renderer holds no per-document state (that
+    lives on the RFQDocument), so one instance can render any number of
+    pdf_data_dicts, one after another.
+
+    Tables are laid out (filtered, formatted, wrapped and sized) through a
+    SectionCache keyed by each table's own inputs, and only drawn into the
+    document; editing one milestone date re-draws the model-details table
+    from its cached layout instead of re-building it.  Page breaks and page
+    numbers are decided while drawing, so they stay correct whatever moved
+    ahead of a section.
+    """
+
+    def __init__(self, sections=None):
+        self._sections = sections
+
+    def _section(self, pdf, name, inputs, rows, build):
+        """
+        build(keep) through the section cache.  A section with more than
+        max_rows rows is built with keep=False (measured lazily, as it is
+        streamed out) and not cached.  Layouts depend on the font metrics,
+        so the document's font is part of the key.
+        """
+        cache = self._sections
+        if cache is None or rows > cache.max_rows:
+            return build(False)
+        return cache.get(name, (pdf._font_mode, inputs), lambda: build(True))
+
+    def render(self, data, out=None, trace=None):
+        """
+        Build the PDF for one pdf_data_dict and return its bytes, or, given
+        `out` (a path or binary file), write it there and return the size.
+        With a 'max_output_bytes' budget the images are rendered at the best
+        quality step that keeps the file within it (see render_within).
+        A RenderTrace passed as `trace` records the render section by section.
+        """
+        return self.render_counted(data, out, trace)[0]
+
+    def render_counted(self, data, out=None, trace=None):
+        """(what render() returns, the document's page count)."""
+        budget = data.get('max_output_bytes')
+        if budget:
+            buf, pages = self.render_within(data, budget, trace)
+        else:
+            pdf = self._build(data, trace=trace)
+            buf, pages = self._output(pdf), pdf.pages_count
+        if trace is not None:
+            trace.finish(pages, len(buf))
+        if out is None:
+            return bytes(buf), pages
+        return _write_output(buf, out), pages
+
+    def _build(self, data, decoded_images=None, trace=None):
+        from rfq_document import RFQDocument
+
+        pdf = RFQDocument(data, LOGO2_BYTES, 'P', 'mm', 'A4', decoded_images=decoded_images, trace=trace)
+        pdf.alias_nb_pages()
+        if not pdf.draft:
+            with span(pdf, "image preload"):
+                pdf._images.preload(_collect_image_jobs(data, pdf.w - pdf.l_margin - pdf.r_margin),
+                                    workers=data.get('image_workers', IMAGE_WORKERS))
+
+        self.create_cover_page(pdf)
+        pdf.add_page()
+        self.render_requirement_background(pdf)
+        self.render_technical_specification(pdf)
+        self.render_quotation_submission(pdf)
+        self.render_timelines(pdf)
+        self.render_spoc(pdf)
+        self.render_sign_off(pdf)
+        return pdf
+
+    @staticmethod
+    def _output(pdf):
+        with span(pdf, "output") as rec:
+            if pdf.trace is not None:
+                # output() assembles the whole file in memory at once, between
+                # two samples; check a generous estimate of it beforehand.
+                pdf.trace.hold_native(_output_estimate(pdf), "output")
+            buf = pdf.output()
+            if rec is not None:
+                rec["bytes"] = len(buf)
+                pdf.trace.hold_native(0, "output")      # the buffer is resident by now
+        return buf
+
+    def render_within(self, data, budget, trace=None):
+        """
+        PDF bytes, and their page count, at the highest image quality whose
+        file is at most `budget` bytes: the profile's own settings if they
+        fit, else a binary search over the lower OUTPUT_QUALITY_STEPS.
+        Every attempt shares one DecodedImages store, so each upload is
+        decoded once and the attempts only resample and re-encode.  If even
+        the lowest step is over budget, that (smallest) file is returned;
+        callers compare its size.
+        """
+        settings = output_settings(data)
+        dpi, quality = settings["image_dpi"], settings["image_jpeg_quality"]
+        steps = [(dpi, quality)] + [(d, min(q, quality)) for d, q in OUTPUT_QUALITY_STEPS if d < dpi]
+        decoded = DecodedImages(dpi)
+        attempts = {}
+
+        def _attempt(i):
+            if i not in attempts:
+                d, q = steps[i]
+                step_data = dict(data, image_dpi=d, image_jpeg_quality=q)
+                with (trace.span(None, f"size search: {d} dpi, quality {q}") if trace else nullcontext()):
+                    pdf = self._build(step_data, decoded, trace)
+                    attempts[i] = (bytes(self._output(pdf)), pdf.pages_count)
+            return len(attempts[i][0])
+
+        last = len(steps) - 1
+        if _attempt(0) <= budget or last == 0:
+            return attempts[0]
+        if _attempt(last) > budget:
+            return attempts[last]
+        lo, hi = 1, last        # steps[hi] fits
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if _attempt(mid) <= budget:
+                hi = mid
+            else:
+                lo = mid + 1
+        return attempts[hi]
+
+    # ── 1. REQUIREMENT BACKGROUND ─────────────────────────────────────────────
+    @traced("requirement background")
+    def render_requirement_background(self, pdf):
+        data = pdf._data
+        pdf.section_title('REQUIREMENT BACKGROUND')
+        pdf.set_font('Arial', '', 11)
+        usable_w = pdf.w - pdf.l_margin - pdf.r_margin
+
+        raw_purpose = data.get('purpose', '')
+
+        def _wrap(keep):
+            paragraphs = _prepare_purpose_text(raw_purpose)
+            if paragraphs:
+                return [pdf._text.lines(pdf, p, usable_w) for p in paragraphs], True
+            return [pdf._text.lines(pdf, _safe_text(raw_purpose), usable_w)], False
+
+        # Wrapped once per text; each document only draws the lines.
+        paragraphs, spaced = self._section(pdf, "requirement_background", (raw_purpose, usable_w), 0, _wrap)
+        for lines in paragraphs:
+            if spaced and pdf.get_y() + 12 > pdf.page_break_trigger:
+                pdf.add_page()
+            pdf.set_x(pdf.l_margin)
+            _draw_lines(pdf, usable_w, 7, lines)
+            if spaced:
+                pdf.ln(3)
+        pdf.ln(5)
+
+    # ── 2. TECHNICAL SPECIFICATION ────────────────────────────────────────────
+    @traced("technical specification")
+    def render_technical_specification(self, pdf):
+        data = pdf._data
+        pdf.section_title('TECHNICAL SPECIFICATION')
+        rfq_category   = data.get('rfq_category', 'General')
+        wh_sub         = data.get('wh_sub', '')
+        use_custom_spec = data.get('use_custom_spec', False)
+
+        # ── Custom table path (overrides standard spec tables) ───────────────
+        if use_custom_spec:
+            self.render_custom_spec_table(pdf, data.get('custom_tables', []))
+            self.render_layout_images(pdf, data.get('layout_images', []))
+
+        elif rfq_category == "Warehouse Equipment":
+            if wh_sub == "Storage Container":
+                self.render_container_table(pdf, data.get('storage_containers_df'),
+                                            data.get('storage_containers_images', {}))
+                self.render_layout_images(pdf, data.get('layout_images', []))
+
+            elif wh_sub == "Automated Storage System":
+                wh_items = data.get('wh_items_df')
+                if wh_items is not None and not wh_items.empty:
+                    import pandas as pd
+                    valid_items = wh_items[wh_items.get("Item Name", pd.Series(dtype=str)).astype(str).str.strip() != ""]
+                    if not valid_items.empty:
+                        pdf.set_font('Arial', 'B', 10)
+                        pdf.cell(0, 7, 'Items Required:', 0, 1)
+                        pdf.set_font('Arial', '', 10)
+                        item_cols = _format_columns(valid_items, ['Item Name', 'Quantity', 'Unit',
+                                                                  'Description / Specification'])
+                        for name, qty, unit, desc in zip(*item_cols):
+                            item_line = f"  - {name}   Qty: {qty} {unit}"
+                            if desc:
+                                item_line += f"   -   {desc}"
+                            pdf.cell(0, 6, item_line, 0, 1)
+                        pdf.ln(4)
+
+                self.render_model_details(pdf, data.get('carousel_model_df'), subtitle=data.get('model_detail_header', ''))
+                self.render_navy_section(pdf, "Key Features", data.get('key_features_df'),
+                                         ["Sr.no", "Description", "Status", "Remarks"], [10, 102, 38, 40])
+                self.render_navy_section(pdf, "Inbuilt features", data.get('inbuilt_features_df'),
+                                         ["Sr.no", "Description", "Vendor Scope (Yes/No)", "Remarks"], [10, 102, 38, 40])
+                self.render_navy_section(pdf, "Installation Accountability", data.get('installation_df'),
+                                         ["Sr.no", "Category", "Vendor Scope (Yes/No)", "Customer Scope (Yes/No)", "Remarks"],
+                                         [10, 67, 36, 36, 41])
+                self.render_layout_images(pdf, data.get('layout_images', []))
+
+            else:
+                pfx = {'Storage System': 'ss', 'Material Handling': 'mh', 'Dock Leveller': 'dl'}.get(wh_sub, 'ss')
+                self.render_model_details(pdf, data.get(f'spec_{pfx}_Model Details'),
+                                          subtitle=data.get('model_detail_header', ''))
+                self.render_navy_section(pdf, "Key Features", data.get(f'spec_{pfx}_Key Features'),
+                                         ["Sr.no", "Description", "Status", "Remarks"], [10, 102, 38, 40])
+                self.render_navy_section(pdf, "Inbuilt features", data.get(f'spec_{pfx}_Inbuilt features'),
+                                         ["Sr.no", "Description", "Vendor Scope (Yes/No)", "Remarks"], [10, 102, 38, 40])
+                self.render_navy_section(pdf, "Installation Accountability",
+                                         data.get(f'spec_{pfx}_Installation Accountability'),
+                                         ["Sr.no", "Category", "Vendor Scope (Yes/No)", "Customer Scope (Yes/No)", "Remarks"],
+                                         [10, 67, 36, 36, 41])
+                self.render_layout_images(pdf, data.get('layout_images', []))
+        else:
+            self.render_generic_items(pdf, data.get('items_df'))
+
+    # ── 3. QUOTATION SUBMISSION & DELIVERY ────────────────────────────────────
+    @traced("quotation submission")
+    def render_quotation_submission(self, pdf):
+        data = pdf._data
+        usable_w = pdf.w - pdf.l_margin - pdf.r_margin
+        if pdf.get_y() + 40 > pdf.page_break_trigger:
+            pdf.add_page()
+        pdf.section_title('QUOTATION SUBMISSION & DELIVERY')
+        pdf.set_font('Arial', 'B', 11)
+        pdf.cell(0, 7, f"Quotation to be submit to: {data.get('submit_to_name', '')}", 0, 1)
+        if data.get('submit_to_registered_office'):
+            pdf.set_font('Arial', '', 10)
+            pdf.cell(0, 6, data.get('submit_to_registered_office', ''), 0, 1)
+        pdf.ln(3)
+        pdf.set_font('Arial', 'B', 11)
+        pdf.cell(0, 7, 'Delivery Location:', 0, 1)
+        pdf.set_font('Arial', '', 11)
+        del_company = _safe_text(data.get('delivery_company', ''))
+        del_gstin   = _safe_text(data.get('delivery_gstin', ''))
+        del_address = _normalize_paragraph(_safe_text(data.get('delivery_address', '')))
+        if del_company:
+            pdf.set_font('Arial', 'B', 11)
+            pdf.set_x(pdf.l_margin)
+            pdf.multi_cell(usable_w, 7, del_company, border=0, align='L')
+        if del_gstin:
+            pdf.set_font('Arial', '', 11)
+            pdf.set_x(pdf.l_margin)
+            pdf.multi_cell(usable_w, 7, f'GSTIN No: {del_gstin}', border=0, align='L')
+        if del_address:
+            pdf.set_font('Arial', '', 11)
+            pdf.set_x(pdf.l_margin)
+            pdf.multi_cell(usable_w, 7, f'Address: {del_address}', border=0, align='L')
+
+        annexures = data.get('annexures', '').strip()
+        if annexures:
+            pdf.ln(5)
+            pdf.section_title('ANNEXURES')
+            pdf.set_font('Arial', '', 11)
+            for line in annexures.split('\n'):
+                if line.strip():
+                    pdf.cell(0, 7, f'  - {_safe_text(line.strip())}', 0, 1)
+        pdf.ln(5)
+
+    # ── 4. TIMELINES ──────────────────────────────────────────────────────────
+    @traced("timelines")
+    def render_timelines(self, pdf):
+        data = pdf._data
+        if pdf.get_y() + 60 > pdf.page_break_trigger:
+            pdf.add_page()
+        pdf.section_title('TIMELINES')
+        milestones = [
+            ('RFQ to Vendor',                      data.get('date_release')),
+            ('1st Level Discussion',               data.get('date_query')),
+            ('Techno Commercial Offer',            data.get('date_meet')),
+            ('2nd Level Discussion on Proposal',   data.get('date_quote')),
+            ('Final Techno Commercial Offer',      data.get('date_selection')),
+            ('PO to Vendor',                       data.get('date_review')),
+            ('Delivery at Site',                   data.get('date_delivery')),
+            ('Installation at Site',               data.get('date_install')),
+        ]
+        pdf.set_fill_color(220, 230, 241)
+        pdf.set_font('Arial', 'B', 11)
+        pdf.cell(90, 9, 'Milestone', 1, 0, 'C', fill=True)
+        pdf.cell(100, 9, 'Date', 1, 1, 'C', fill=True)
+        pdf.set_font('Arial', '', 11)
+        for m, d in milestones:
+            date_str = d.strftime('%B %d, %Y') if d else 'TBD'
+            pdf.cell(90, 8, m, 1, 0, 'L')
+            pdf.cell(100, 8, date_str, 1, 1, 'L')
+        pdf.ln(5)
+
+    # ── 5. SPOC ───────────────────────────────────────────────────────────────
+    @traced("spoc")
+    def render_spoc(self, pdf):
+        data = pdf._data
+        usable_w = pdf.w - pdf.l_margin - pdf.r_margin
+        if pdf.get_y() + 50 > pdf.page_break_trigger:
+            pdf.add_page()
+        pdf.section_title('SINGLE POINT OF CONTACT')
+        pdf.ln(4)
+        col_w = usable_w / 2
+        lbl_w = 28
+        has_spoc2 = bool(data.get('spoc2_name', '').strip())
+
+        hy = pdf.get_y()
+        pdf.set_xy(pdf.l_margin, hy)
+        pdf.set_font('Arial', 'BU', 12)
+        pdf.cell(col_w, 8, 'Primary Contact', 0, 0, 'L')
+        if has_spoc2:
+            pdf.set_xy(pdf.l_margin + col_w, hy)
+            pdf.cell(col_w, 8, 'Secondary Contact', 0, 0, 'L')
+        pdf.ln(11)
+
+        spoc_rows = [
+            ('Name:',     'spoc1_name',  'spoc2_name'),
+            ('Phone No:', 'spoc1_phone', 'spoc2_phone'),
+            ('Email ID:', 'spoc1_email', 'spoc2_email'),
+        ]
+        for label, k1, k2 in spoc_rows:
+            ry = pdf.get_y()
+            pdf.set_xy(pdf.l_margin, ry)
+            pdf.set_font('Arial', 'B', 11)
+            pdf.cell(lbl_w, 8, label, 0, 0, 'L')
+            pdf.set_font('Arial', '', 11)
+            pdf.cell(col_w - lbl_w, 8, _safe_text(data.get(k1, '')), 0, 0, 'L')
+            if has_spoc2:
+                pdf.set_xy(pdf.l_margin + col_w, ry)
+                pdf.set_font('Arial', 'B', 11)
+                pdf.cell(lbl_w, 8, label, 0, 0, 'L')
+                pdf.set_font('Arial', '', 11)
+                pdf.cell(col_w - lbl_w, 8, _safe_text(data.get(k2, '')), 0, 0, 'L')
+            pdf.ln(9)
+        pdf.ln(5)
+
+    # ── LAST PAGE: SIGN-OFF ───────────────────────────────────────────────────
+    @traced("sign-off")
+    def render_sign_off(self, pdf):
+        pdf.add_page()
+        self._static_page(pdf, "sign_off_page", self._draw_sign_off, {}, start_y=round(pdf.get_y(), 3))
+
+    def _draw_sign_off(self, pdf, slot):
+        page_w = pdf.w - pdf.l_margin - pdf.r_margin
+
+        def _field_line(label, line_w=110):
+            pdf.set_font('Arial', '', 10)
+            lbl_w2 = pdf.get_string_width(label + '  ')
+            pdf.cell(lbl_w2, 7, label, 0, 0, 'L')
+            x1 = pdf.get_x()
+            y1 = pdf.get_y() + 6.2
+            pdf.line(x1, y1, x1 + line_w, y1)
+            pdf.ln(8)
+
+        pdf.ln(4)
+        pdf.set_font('Arial', 'B', 11)
+        pdf.set_fill_color(240, 244, 248)
+        pdf.set_draw_color(180, 180, 180)
+        pdf.cell(page_w, 8, '  Buyer Information', border='B', ln=1, align='L', fill=True)
+        pdf.set_draw_color(0, 0, 0)
+        pdf.ln(4)
+        _field_line('Company Name:         ')
+        _field_line('Contact Information:  ')
+        _field_line('Date of Issue:        ')
+        _field_line('RFQ Reference Number:')
+        pdf.ln(6)
+
+        pdf.set_font('Arial', 'B', 11)
+        pdf.set_fill_color(240, 244, 248)
+        pdf.set_draw_color(180, 180, 180)
+        pdf.cell(page_w, 8, '  Supplier Information', border='B', ln=1, align='L', fill=True)
+        pdf.set_draw_color(0, 0, 0)
+        pdf.ln(4)
+        _field_line('Supplier Name:   ')
+        _field_line('Contact Person:  ')
+        _field_line('Contact Details: ')
+        pdf.ln(6)
+
+        pdf.set_font('Arial', 'BI', 12)
+        pdf.set_text_color(26, 58, 92)
+        pdf.cell(0, 8, 'Terms and Conditions', 0, 1, 'L')
+        pdf.set_text_color(0, 0, 0)
+        terms = [
+            'Prices quoted should include all applicable taxes and duties.',
+            'Delivery timeline must be clearly mentioned.',
+            'Payment terms to be agreed upon before order confirmation.',
+            'This RFQ does not constitute a commitment to purchase.',
+            'The company reserves the right to accept or reject any quotation.',
+        ]
+        pdf.set_font('Arial', '', 10)
+        num_col_w = 8
+        txt_col_w = page_w - num_col_w
+        for idx, term in enumerate(terms, 1):
+            row_y = pdf.get_y()
+            pdf.set_xy(pdf.l_margin, row_y)
+            pdf.cell(num_col_w, 6, f'{idx}.', 0, 0, 'L')
+            pdf.set_xy(pdf.l_margin + num_col_w, row_y)
+            pdf.multi_cell(txt_col_w, 6, _safe_text(term), 0, 'L')
+            pdf.ln(1)
+        pdf.ln(10)
+
+        _field_line('Authorized Signatory: ')
+        _field_line('Designation:          ')
+        _field_line('Date:                 ')
+
+    # ── COVER PAGE ────────────────────────────────────────────────────────────
+    @traced("cover page")
+    def create_cover_page(self, pdf):
+        data = pdf._data
+        pdf.add_page()
+        values = {k: data.get(k, '') for k in ('Type_of_items', 'Storage', 'company_name', 'company_address')}
+        values.update(logo1=data.get('logo1_data'), logo2=pdf._logo2)
+        # Everything else on the page depends only on the logo 1 slot size.
+        self._static_page(pdf, "cover_page", self._draw_cover, values,
+                          layout=(data.get('logo1_w', 35), data.get('logo1_h', 18)))
+
+    def _draw_cover(self, pdf, slot):
+        data = pdf._data
+        logo2_w = 45
+        logo2_h = 20
+        pdf.place_logo(slot('logo1'), pdf.l_margin, 12,
+                       data.get('logo1_w', 35), data.get('logo1_h', 18))
+        pdf.place_logo(slot('logo2'), pdf.w - pdf.r_margin - logo2_w, 12, logo2_w, logo2_h)
+
+        pdf.set_y(35)
+        pdf.set_font('Arial', 'B', 14)
+        pdf.set_text_color(200, 0, 0)
+        pdf.cell(0, 8, 'CONFIDENTIAL', 0, 1, 'L')
+        pdf.set_text_color(0, 0, 0)
+        pdf.ln(8)
+
+        pdf.set_font('Arial', 'B', 28)
+        pdf.cell(0, 14, 'Request for Quotation', 0, 1, 'C')
+        pdf.ln(4)
+        pdf.set_font('Arial', 'I', 16)
+        pdf.cell(0, 8, 'for', 0, 1, 'C')
+        pdf.ln(4)
+        pdf.set_font('Arial', 'B', 20)
+        pdf.cell(0, 10, slot('Type_of_items'), 0, 1, 'C')
+        pdf.ln(6)
+        pdf.set_font('Arial', '', 16)
+        pdf.cell(0, 8, 'At', 0, 1, 'C')
+        pdf.ln(4)
+        pdf.set_font('Arial', 'B', 20)
+        pdf.cell(0, 10, slot('Storage'), 0, 1, 'C')
+        pdf.ln(8)
+        pdf.set_font('Arial', 'B', 22)
+        pdf.cell(0, 10, slot('company_name'), 0, 1, 'C')
+        pdf.ln(2)
+        pdf.set_font('Arial', '', 14)
+        pdf.cell(0, 8, slot('company_address'), 0, 1, 'C')
+
+    def _static_page(self, pdf, name, draw, values, layout=None, start_y=None):
+        """
+        draw(pdf, slot) through a PageTemplate in the section cache: the
+        page is recorded once per (layout, start_y, font) and stamped with
+        this document's `values`.  Uncached, or if the page would not fit,
+        it is drawn directly.
+        """
+        def _compile(keep):
+            if not keep:
+                return None
+            scratch = type(pdf)(pdf._data, pdf._logo2, 'P', 'mm', 'A4')
+            return PageTemplate.compile(lambda rec: draw(rec, Slot), scratch, start_y)
+
+        template = self._section(pdf, name, (layout, start_y), 0, _compile)
+        if template is None:
+            draw(pdf, values.__getitem__)
+        else:
+            template.stamp(pdf, values)
+
+    # ── MODEL DETAILS TABLE ───────────────────────────────────────────────────
+    @traced("model details")
+    def render_model_details(self, pdf, df, subtitle=""):
+        if df is None or df.empty:
+            return
+        layout = self._section(pdf, "model_details", df, len(df),
+                               lambda keep: self._model_details_layout(pdf, df))
+        if layout is None:
+            return
+
+        total_w = sum(c.width for c in _MODEL_DETAILS_TABLE.columns)
+
+        pdf.set_font('Arial', 'B', 12)
+        pdf.set_fill_color(26, 58, 92)
+        pdf.set_text_color(255, 255, 255)
+        hdr_x = pdf.l_margin
+        hdr_y = pdf.get_y()
+        hdr_h = 9
+        pdf.rect(hdr_x, hdr_y, total_w, hdr_h, 'F')
+        pdf.set_xy(hdr_x + 2, hdr_y + 2)
+        pdf.multi_cell(total_w - 4, 6, '  Model Details', border=0, align='L')
+        pdf.set_text_color(0, 0, 0)
+        pdf.set_y(hdr_y + hdr_h)
+
+        if subtitle:
+            pdf.set_font('Arial', 'B', 9)
+            pdf.set_fill_color(240, 240, 240)
+            pdf.cell(total_w, 7, subtitle, border=1, ln=1, align='C', fill=True)
+
+        _MODEL_DETAILS_TABLE.draw(pdf, layout)
+        pdf.ln(5)
+
+    def _model_details_layout(self, pdf, df):
+        df = _filter_model_details(df)
+        if df is None or df.empty:
+            return None
+
+        # After _filter_model_details, the DataFrame is already flat:
+        # Sr.no & Category are set only on the first row of each group.
+        # Each labelled row opens a group the Sr.no / Category cells span.
+        unit_col = "UNIT" if "UNIT" in df.columns else "Unit"
+        columns = _format_columns(df, ["Sr.no", "Category", "Description", unit_col, "Requirement"])
+        groups = []
+        for sr, cat in zip(columns[0], columns[1]):
+            if not groups or sr != "" or cat != "":
+                groups.append(1)
+            else:
+                groups[-1] += 1
+        return _MODEL_DETAILS_TABLE.layout(pdf, [(columns, groups)], remember=True).frozen()
+
+    # ── CUSTOM SPEC TABLE ─────────────────────────────────────────────────────
+    @traced("custom tables")
+    def render_custom_spec_table(self, pdf, custom_tables):
+        """
+        Renders one or more user-defined spec tables in the PDF.
+
+        custom_tables: list of dicts, each with:
+            {
+              'title':   str,           # dark navy header text
+              'columns': [str, ...],    # user-defined column names (2-5)
+              'df':      pd.DataFrame,  # rows; columns match 'columns' list
+            }
+        """
+        if not custom_tables:
+            return
+
+        for tbl in custom_tables:
+            title    = _safe_text(tbl.get('title', 'Technical Specification'))
+            user_cols = tbl.get('columns', [])
+            df        = tbl.get('df')
+
+            if not user_cols or df is None or df.empty:
+                continue
+
+            built = self._section(pdf, "custom_table", (user_cols, df), len(df),
+                                  lambda keep: self._custom_table_layout(pdf, user_cols, df))
+            if built is None:
+                continue
+            table, layout = built
+            total_w = sum(c.width for c in table.columns)
+
+            # ── Title bar ────────────────────────────────────────────────────
+            if pdf.get_y() + 30 > pdf.page_break_trigger:
+                pdf.add_page()
+
+            pdf.set_fill_color(26, 58, 92)
+            pdf.set_text_color(255, 255, 255)
+            pdf.set_font('Arial', 'B', 11)
+            ty = pdf.get_y()
+            pdf.rect(pdf.l_margin, ty, total_w, 9, 'F')
+            pdf.set_xy(pdf.l_margin + 3, ty + 1.5)
+            pdf.cell(total_w - 6, 6, f'  {title}', border=0)
+            pdf.set_text_color(0, 0, 0)
+            pdf.set_y(ty + 9)
+            pdf.ln(1)
+
+            # ── Column headers + data rows ───────────────────────────────────
+            table.draw(pdf, layout)
+
+            pdf.ln(5)
+
+    def _custom_table_layout(self, pdf, user_cols, df):
+        USABLE_W   = 190   # A4 usable width in mm (10mm margins each side)
+        SR_W       = 10    # fixed Sr.No column width
+        header_fill = (220, 230, 241)
+        rh_min      = 8
+
+        # Drop rows where ALL user columns are blank
+        df = df[nonblank_rows(df, user_cols)].reset_index(drop=True)
+        if df.empty:
+            return None
+
+        n_user   = len(user_cols)
+
+        # Distribute remaining width evenly across user columns
+        remaining = USABLE_W - SR_W
+        # First user col gets slightly more (it's usually the label column)
+        if n_user == 1:
+            col_widths = [remaining]
+        elif n_user == 2:
+            col_widths = [round(remaining * 0.45), round(remaining * 0.55)]
+        elif n_user == 3:
+            col_widths = [round(remaining * 0.38), round(remaining * 0.32), round(remaining * 0.30)]
+        elif n_user == 4:
+            col_widths = [round(remaining * 0.32), round(remaining * 0.25), round(remaining * 0.23), round(remaining * 0.20)]
+        else:  # 5
+            col_widths = [round(remaining * 0.28), round(remaining * 0.20), round(remaining * 0.20), round(remaining * 0.17), round(remaining * 0.15)]
+        # Fix rounding so total = remaining
+        col_widths[-1] += remaining - sum(col_widths)
+
+        table = Table(
+            [Column('Sr.No', SR_W, align='C')]
+            + [Column(_safe_text(c), w) for c, w in zip(user_cols, col_widths)],
+            header=CellStyle(9, 'B', min_h=12, pad=4, top=2),
+            body=CellStyle(9, min_h=rh_min),
+            header_fill=header_fill,
+        )
+        columns = [[str(i + 1) for i in range(len(df))]] + _format_columns(df, user_cols)
+        return table, table.layout(pdf, [(columns, None)], remember=True).frozen()
+
+    # ── NAVY SECTION TABLE ────────────────────────────────────────────────────
+    @traced("table", label_arg=0)
+    def render_navy_section(self, pdf, title, df, cols, widths):
+        if df is None or df.empty:
+            return
+        built = self._section(pdf, "navy_section", (cols, widths, df), len(df),
+                              lambda keep: self._navy_layout(pdf, df, cols, widths))
+        if built is None:
+            return
+        table, layout = built
+
+        total_w = sum(widths)
+
+        if pdf.get_y() + 35 > pdf.page_break_trigger:
+            pdf.add_page()
+
+        pdf.set_fill_color(26, 58, 92)
+        pdf.set_text_color(255, 255, 255)
+        pdf.set_font('Arial', 'B', 11)
+        ty = pdf.get_y()
+        pdf.rect(pdf.l_margin, ty, total_w, 9, 'F')
+        pdf.set_xy(pdf.l_margin + 3, ty + 1.5)
+        pdf.cell(total_w - 6, 6, f'  {title}', border=0)
+        pdf.set_text_color(0, 0, 0)
+        pdf.set_y(ty + 9)
+        pdf.ln(1)
+
+        table.draw(pdf, layout)
+
+        pdf.ln(4)
+
+    def _navy_layout(self, pdf, df, cols, widths):
+        value_cols = [c for c in cols if c not in ("Sr.no", "Category", "Description", "Remarks")]
+        df = _filter_navy_df(df, value_cols)
+        if df is None or df.empty:
+            return None
+
+        col_vals = _format_columns(df, cols)
+        remark_text = next((v for v in col_vals[-1] if v), "")
+        table = Table(
+            [Column(c.strip(), w, align='L' if i <= 1 else 'C') for i, (c, w) in enumerate(zip(cols, widths))],
+            header=CellStyle(9, 'B', min_h=14, pad=6, valign='middle'),
+            body=CellStyle(9),
+        )
+        # Remarks are shown once, on the first row
+        col_vals[-1] = [remark_text] + [""] * (len(df) - 1)
+        return table, table.layout(pdf, [(col_vals, None)], remember=True).frozen()
+
+    # ── STORAGE CONTAINER TABLE ───────────────────────────────────────────────
+    @traced("container table")
+    def render_container_table(self, pdf, df, images_dict=None):
+        if df is None or df.empty:
+            _CONTAINER_TABLE.render(pdf, [[] for _ in _CONTAINER_TABLE.columns])
+        else:
+            layout = self._section(
+                pdf, "container_table", (df, images_dict), len(df),
+                lambda keep: _kept(_CONTAINER_TABLE.layout(
+                    pdf, self._container_chunks(df)), keep))
+            # Images are looked up and prepared slice by slice, just before each is drawn.
+            _CONTAINER_TABLE.draw(pdf, TableLayout(layout.head_lines, layout.head_h,
+                                                   self._with_images(pdf, layout.pieces, df, images_dict)))
+        pdf.ln(6)
+
+    def _container_chunks(self, df):
+        """
+        Container table pieces.  The last column holds each row's position
+        in df rather than its image, so a cached layout keeps no image bytes;
+        _with_images() swaps the images in from the document's own df.
+        """
+        cols = ["Description", "OL (mm)", "OW (mm)", "OH (mm)", "Base Type",
+                "Color", "Weight Kg", "Load capacity", "LID", "Qty"]
+        for start, part in _row_chunks(df):
+            yield ([[str(idx + 1) for idx in part.index]]
+                   + _format_columns(part, cols)
+                   + [list(range(start, start + len(part)))]), None
+
+    def _with_images(self, pdf, pieces, df, images_dict):
+        workers = pdf._data.get('image_workers', IMAGE_WORKERS)
+        column = df["image_data_bytes"] if "image_data_bytes" in df.columns else None
+        for piece in pieces:
+            if piece is not None:
+                data, *rest = piece
+                rows = data[-1]
+                images = column.iloc[rows].tolist() if column is not None else [None] * len(rows)
+                if images_dict:
+                    images = [img if isinstance(img, bytes) else images_dict.get(idx)
+                              for idx, img in zip(df.index[rows], images)]
+                piece = (data[:-1] + [images], *rest)
+                if not pdf.draft:
+                    pdf._images.preload([(b, CONTAINER_IMG_W, CONTAINER_IMG_H, False) for b in images],
+                                        workers=workers)
+            yield piece
+
+    # ── GENERIC ITEMS TABLE ───────────────────────────────────────────────────
+    @traced("items table")
+    def render_generic_items(self, pdf, df):
+        if df is None or df.empty:
+            return
+        cols = [c.label for c in _GENERIC_ITEMS_TABLE.columns[1:]]
+        layout = self._section(pdf, "generic_items", df, len(df), lambda keep: _kept(
+            _GENERIC_ITEMS_TABLE.layout(pdf, (
+                ([[str(start + i + 1) for i in range(len(part))]] + _format_columns(part, cols), None)
+                for start, part in _row_chunks(df)
+            )), keep))
+        _GENERIC_ITEMS_TABLE.draw(pdf, layout)
+        pdf.ln(5)
+
+    # ── LAYOUT IMAGES ─────────────────────────────────────────────────────────
+    @traced("layout images")
+    def render_layout_images(self, pdf, layout_images):
+        if not layout_images:
+            return
+        pdf.add_page()
+        pdf.set_fill_color(26, 58, 92)
+        pdf.set_text_color(255, 255, 255)
+        pdf.set_font('Arial', 'B', 12)
+        pdf.cell(0, 10, '  LAYOUT', border=0, ln=1, align='L', fill=True)
+        pdf.set_text_color(0, 0, 0)
+        pdf.ln(6)
+
+        usable_w = pdf.w - pdf.l_margin - pdf.r_margin
+        n = len(layout_images)
+        img_w, img_h = _layout_image_slot(n, usable_w)
+
+        if n == 1:
+            img_x = pdf.l_margin + (usable_w - img_w) / 2
+            self._place_image(pdf, layout_images[0], img_x, pdf.get_y(), img_w, img_h)
+            pdf.set_y(pdf.get_y() + img_h + 4)
+        elif n == 2:
+            y = pdf.get_y()
+            self._place_image(pdf, layout_images[0], pdf.l_margin, y, img_w, img_h)
+            self._place_image(pdf, layout_images[1], pdf.l_margin + img_w + 6, y, img_w, img_h)
+            pdf.set_y(y + img_h + 4)
+        else:
+            for i in range(0, n, 2):
+                y = pdf.get_y()
+                if y + img_h > pdf.page_break_trigger:
+                    pdf.add_page()
+                    y = pdf.get_y()
+                self._place_image(pdf, layout_images[i], pdf.l_margin, y, img_w, img_h)
+                if i + 1 < n:
+                    self._place_image(pdf, layout_images[i + 1], pdf.l_margin + img_w + 6, y, img_w, img_h)
+                pdf.set_y(y + img_h + 6)
+        pdf.ln(4)
+
+    def _place_image(self, pdf, img_bytes, x, y, w, h):
+        if not isinstance(img_bytes, bytes):
+            return
+        if pdf.draft:
+            draw_image_placeholder(pdf, x, y, w, h, label="Layout image")
+            return
+        try:
+            img_bytes = pdf._images.prepared(img_bytes, w, h)
+            iw, ih = pdf._images.size_px(img_bytes)
+            ratio = min(w / iw, h / ih)
+            draw_w, draw_h = iw * ratio, ih * ratio
+            cx = x + (w - draw_w) / 2
+            cy = y + (h - draw_h) / 2
+            pdf._images.place(img_bytes, cx, cy, draw_w, draw_h)
+            pdf.rect(x, y, w, h)
+        except Exception:
+            draw_image_placeholder(pdf, x, y, w, h)
+
+
+def _output_estimate(pdf):
+    """
+    Upper bound of what output() allocates: every page's content stream and
+    every embedded image copied into the file buffer, and the compressed
+    copies it builds first.
+    """
+    content = sum(len(page.contents) for page in pdf.pages.values())
+    return 2 * (content + pdf._images.embedded_bytes)
+
+
+def _write_output(buf, out):
+    # fpdf2 keeps the finished file in one bytearray; hand that buffer to
+    # the destination directly rather than copying it into bytes first.
+    if hasattr(out, "write"):
+        out.write(buf)
+    else:
+        with open(out, "wb") as f:
+            f.write(buf)
+    return len(buf)
+
+
+_RENDERER = RFQRenderer(SECTION_CACHE)
+
+
+def create_advanced_rfq_pdf(data, cache=None, draft=False, trace=False, memory=False):
+    """
+    Render one pdf_data_dict to PDF bytes.  Given a cache (e.g.
+    rfq_cache.PDF_CACHE), a dict whose content was rendered before is served
+    from it instead, and (pdf_bytes, from_cache) is returned, from_cache
+    saying whether this call was a hit.  draft=True renders the quick 'draft' output profile
+    (placeholder images, DRAFT watermark) for previews while editing; it
+    stamps the same cached cover and sign-off templates and table layouts
+    as a full render.
+    trace=True appends a RenderTrace to the result, with per-section
+    timings and counters of the render; memory=True adds memory accounting
+    and allocation sites to it (and implies trace; it slows the render down
+    several times).  A 'memory_budget_bytes' key (default
+    rfq_trace.MEMORY_BUDGET_BYTES) makes a render that would need more
+    memory stop with MemoryBudgetExceeded.
+    """
+    data, tr = _prepare(data, draft, trace, memory)
+    try:
+        pdf_bytes, from_cache = _render_cached(data, cache, tr)
+    finally:
+        if tr is not None:
+            tr.close()
+    return _result(pdf_bytes, from_cache if cache is not None else None, tr if trace or memory else None)
+
+
+def _result(out, from_cache, tr):
+    """out, with from_cache (when a cache was given) and the trace (when asked for) after it."""
+    extra = tuple(v for v in (from_cache, tr) if v is not None)
+    return (out,) + extra if extra else out
+
+
+def _prepare(data, draft, trace, memory):
+    """The pdf_data_dict to render and its RenderTrace (None when neither asked for nor budgeted)."""
+    if draft:
+        data = dict(data, output_profile="draft", max_output_bytes=None)
+    budget = data.get('memory_budget_bytes', MEMORY_BUDGET_BYTES)
+    if memory or budget:
+        return data, RenderTrace(MemoryMeter(budget, allocations=memory))
+    return data, RenderTrace() if trace else None
+
+
+def _render_cached(data, cache, tr):
+    if cache is None:
+        return _RENDERER.render(data, trace=tr), False
+    from rfq_cache import pdf_cache_key
+
+    with (tr.span(None, "PDF cache lookup") if tr else nullcontext()):
+        key = pdf_cache_key(data)
+        hit = cache.get(key)
+    if hit is None:
+        pdf_bytes, pages = _RENDERER.render_counted(data, trace=tr)
+        cache.put(key, pdf_bytes, pages)
+        return pdf_bytes, False
+    pdf_bytes, pages = hit
+    if tr is not None:
+        tr.finish(pages or 0, len(pdf_bytes))
+    return pdf_bytes, True
+
+
+def write_rfq_pdf(data, out, cache=None, draft=False, trace=False, memory=False):
+    """
+    Render one pdf_data_dict straight to `out` (path or binary file) and
+    return the byte count, followed by from_cache and the RenderTrace as
+    create_advanced_rfq_pdf returns them; the options are the same.  The finished file
+    goes to `out` without a bytes copy of it being made or kept: a cache
+    hit is copied from the cache, and a new render written to a path is
+    added to the cache's disk tier only.
+    """
+    data, tr = _prepare(data, draft, trace, memory)
+    try:
+        size, from_cache = _write_cached(data, out, cache, tr)
+    finally:
+        if tr is not None:
+            tr.close()
+    return _result(size, from_cache if cache is not None else None, tr if trace or memory else None)
+
+
+def _write_cached(data, out, cache, tr):
+    if cache is None:
+        return _RENDERER.render(data, out, trace=tr), False
+    from rfq_cache import pdf_cache_key
+
+    with (tr.span(None, "PDF cache lookup") if tr else nullcontext()):
+        key = pdf_cache_key(data)
+        hit = cache.copy_to(key, out)
+    if hit is None:
+        size, pages = _RENDERER.render_counted(data, out, trace=tr)
+        if not hasattr(out, "write"):
+            cache.put_file(key, out, pages)
+        return size, False
+    size, pages = hit
+    if tr is not None:
+        tr.finish(pages or 0, size)
+    return size, True
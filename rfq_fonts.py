@@ -0,0 +1,316 @@
+"""
+Unicode text for the RFQ PDF engine.
+
+A document whose text is all latin-1 is drawn in the PDF core font
+(Helvetica, nothing embedded), exactly as before.  As soon as any text in
+the pdf_data_dict falls outside latin-1 (a rupee sign, a Devanagari
+supplier name, an emoji marker from a column label) the whole document is
+drawn in a TrueType font instead, of which fpdf2 embeds only the glyphs the
+document uses.  Without the TrueType files the engine falls back to the core
+font, with unsupported characters shown as '?', and logs a warning.
+
+The fonts are not bundled: they are the system packages listed in
+packages.txt (DejaVu Sans for Latin, Greek, Cyrillic and the rupee sign;
+GNU FreeSans, which adds Devanagari), looked up in UNICODE_FONT_DIRS.
+Files dropped into a fonts/ directory next to this module, or into
+RFQ_FONT_DIR, are found first.  Each document is drawn in the first
+installed typeface that has every character it uses.
+
+Fonts are registered with fpdf2's public add_font().  Parsing a whole
+TrueType file for every document, and subsetting all of it again on
+output, would cost more than the rest of a render, so each document adds
+a small font file holding latin-1 plus just the other characters its text
+uses.  These subset files are made once per (face, character set) with
+fontTools and kept in FONT_CACHE_DIR, most recently used first.
+
+fpdf2 / fontTools are imported on first use, like the rest of the engine.
+"""
+import functools
+import hashlib
+import logging
+import os
+import threading
+
+log = logging.getLogger(__name__)
+
+PDF_FONT = "auto"       # "auto": Unicode font only when the text needs it; "unicode"; "core"
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+# Searched in order: RFQ_FONT_DIR (os.pathsep-separated), ./fonts, then where
+# Debian/Ubuntu, Fedora, Arch, macOS and Windows install these fonts.
+UNICODE_FONT_DIRS = [d for d in (os.environ.get("RFQ_FONT_DIR") or "").split(os.pathsep) if d] + [
+    os.path.join(_HERE, "fonts"),
+    "/usr/share/fonts/truetype/dejavu",
+    "/usr/share/fonts/truetype/freefont",
+    "/usr/share/fonts/dejavu-sans-fonts",
+    "/usr/share/fonts/gnu-free",
+    "/usr/share/fonts/TTF",
+    "/usr/local/share/fonts",
+    os.path.expanduser("~/.local/share/fonts"),
+    "/Library/Fonts",
+    os.path.expanduser("~/Library/Fonts"),
+    os.path.join(os.environ.get("WINDIR") or r"C:\Windows", "Fonts"),
+]
+# Typeface -> fpdf2 style -> candidate files, first found wins.  Faces not
+# installed fall back to the upright one of the same weight.  Typefaces are
+# tried in this order.
+UNICODE_FONT_FILES = {
+    "dejavu": {
+        "": ("DejaVuSans.ttf",),
+        "B": ("DejaVuSans-Bold.ttf", "DejaVuSans.ttf"),
+        "I": ("DejaVuSans-Oblique.ttf", "DejaVuSans.ttf"),
+        "BI": ("DejaVuSans-BoldOblique.ttf", "DejaVuSans-Bold.ttf", "DejaVuSans.ttf"),
+    },
+    "freesans": {
+        "": ("FreeSans.ttf",),
+        "B": ("FreeSansBold.ttf", "FreeSans.ttf"),
+        "I": ("FreeSansOblique.ttf", "FreeSans.ttf"),
+        "BI": ("FreeSansBoldOblique.ttf", "FreeSansBold.ttf", "FreeSans.ttf"),
+    },
+}
+
+FONT_SUBSET_CACHE_ENTRIES = 64      # subset files kept in FONT_CACHE_DIR
+FONT_CACHE_DIR = os.environ.get("RFQ_FONT_CACHE_DIR") or os.path.join(
+    os.path.expanduser("~"), ".cache", "rfq", "fonts")
+
+# Every Unicode document's fonts hold these: the latin-1 text the engine
+# draws itself, and the U+FFFD shown for characters a font lacks.
+_BASE_CHARS = frozenset(map(chr, range(0x20, 0x7F))) | frozenset(map(chr, range(0xA0, 0x100))) | {"\ufffd"}
+
+# Tables fpdf2's output step drops from embedded subsets; dropped from the
+# subset files as well, since nothing reads them.
+_DROP_TABLES = ["FFTM", "GDEF", "GPOS", "GSUB", "MATH", "hdmx", "meta", "sbix", "CBDT",
+                "CBLC", "EBDT", "EBLC", "EBSC", "SVG ", "CPAL", "COLR"]
+
+# Emoji presentation selectors have no glyph of their own; the base character
+# they follow (e.g. the pencil in 'Status ✏️') is still shown.
+_INVISIBLE = dict.fromkeys((0xFE0E, 0xFE0F))
+
+
+@functools.lru_cache(maxsize=None)
+def _font_file(typeface, style):
+    faces = UNICODE_FONT_FILES[typeface]
+    for name in faces.get(style, faces[""]):
+        for d in UNICODE_FONT_DIRS:
+            path = os.path.join(d, name)
+            if os.path.isfile(path):
+                return path
+    return None
+
+
+def installed_typefaces():
+    """The typefaces whose upright face is installed, in preference order."""
+    return [t for t in UNICODE_FONT_FILES if _font_file(t, "") is not None]
+
+
+def unicode_fonts_available():
+    return bool(installed_typefaces())
+
+
+# ==============================================================
+# CHOOSING THE FONT
+# ==============================================================
+
+def needs_unicode(value):
+    """True if any text in value (a pdf_data_dict or anything inside one) is not latin-1."""
+    if isinstance(value, str):
+        if value.isascii():
+            return False
+        try:
+            value.encode("latin-1")
+        except UnicodeEncodeError:
+            return True
+        return False
+    if isinstance(value, dict):
+        return any(needs_unicode(k) or needs_unicode(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return any(needs_unicode(v) for v in value)
+    if type(value).__name__ == "DataFrame":
+        if needs_unicode([str(c) for c in value.columns]):
+            return True
+        for i in range(value.shape[1]):
+            s = value.iloc[:, i]
+            if getattr(s.dtype, "kind", "") == "O":
+                # One join keeps a 10k-row column to a single isascii() check.
+                if needs_unicode("".join(x for x in s.to_numpy() if isinstance(x, str))):
+                    return True
+    return False
+
+
+def _unicode_chars(value, out):
+    """Add the characters of value (as walked by needs_unicode) that are not latin-1 to `out`."""
+    if isinstance(value, str):
+        if not value.isascii():
+            out.update(c for c in value if ord(c) > 0xFF and ord(c) not in _INVISIBLE)
+    elif isinstance(value, dict):
+        for k, v in value.items():
+            _unicode_chars(k, out)
+            _unicode_chars(v, out)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            _unicode_chars(v, out)
+    elif type(value).__name__ == "DataFrame":
+        _unicode_chars([str(c) for c in value.columns], out)
+        for i in range(value.shape[1]):
+            s = value.iloc[:, i]
+            if getattr(s.dtype, "kind", "") == "O":
+                _unicode_chars("".join(x for x in s.to_numpy() if isinstance(x, str)), out)
+    return out
+
+
+_warned = set()
+
+
+def _warn_once(key, msg, *args):
+    with _lock:
+        if key in _warned:
+            return
+        _warned.add(key)
+    log.warning(msg, *args)
+
+
+def font_mode(data):
+    """
+    'core', or the typeface (a UNICODE_FONT_FILES key) a document for this
+    pdf_data_dict is drawn in: the first installed one with a glyph for
+    every character the document uses, else the one missing the fewest.
+    """
+    mode = data.get('pdf_font', PDF_FONT)
+    if mode == "core" or (mode != "unicode" and not needs_unicode(data)):
+        return "core"
+    typefaces = installed_typefaces()
+    if not typefaces:
+        _warn_once("none", "No Unicode font found in %s; text outside latin-1 is drawn as '?'. "
+                           "Install the fonts in packages.txt or set RFQ_FONT_DIR.",
+                   os.pathsep.join(UNICODE_FONT_DIRS))
+        return "core"
+    if len(typefaces) == 1:
+        return typefaces[0]
+    chars = _unicode_chars(data, set())
+    missing = {}
+    for t in typefaces:
+        cmap = _cmap(_font_file(t, ""))
+        missing[t] = {c for c in chars if ord(c) not in cmap}
+        if not missing[t]:
+            return t
+    best = min(typefaces, key=lambda t: len(missing[t]))
+    _warn_once(frozenset(missing[best]), "No installed Unicode font has glyphs for %r; they are drawn as U+FFFD.",
+               "".join(sorted(missing[best])))
+    return best
+
+
+def document_chars(data):
+    """The characters the Unicode fonts of a document for this pdf_data_dict hold."""
+    return _BASE_CHARS | _unicode_chars(data, set())
+
+
+def normalize(text, cmap):
+    """
+    text as a font with the code points `cmap` can show it (see
+    RFQDocument.normalize_text): for an embedded font, characters it has no
+    glyph for become U+FFFD (measured and drawn as such, instead of silently
+    dropped by fpdf2); for a core font (None), anything outside latin-1
+    becomes '?'.
+    """
+    if cmap is None:
+        return text.encode("latin-1", errors="replace").decode("latin-1")
+    if text.isascii():
+        return text
+    text = text.translate(_INVISIBLE)
+    if all(ord(c) in cmap or c < " " for c in text):     # line breaks are not glyphs
+        return text
+    return "".join(c if ord(c) in cmap or c < " " else "\ufffd" for c in text)
+
+
+# ==============================================================
+# SUBSET FONT FILES
+# ==============================================================
+
+_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def _cmap(path):
+    """The code points the font file at `path` has glyphs for."""
+    from fontTools import ttLib
+
+    with ttLib.TTFont(path, lazy=True) as font:
+        return frozenset(font["cmap"].getBestCmap())
+
+
+def face(typeface, style):
+    """
+    (face, style): the font file style ('', 'B', 'I' or 'BI') an fpdf2
+    `style` is drawn with in `typeface`, and the style to select it with.
+    Without an italic file the upright face is used and 'I' is dropped from
+    the style, so one face is never embedded twice.
+    """
+    style = style.upper()
+    f = "".join(sorted(c for c in style if c in "BI"))
+    if "I" in f and _font_file(typeface, f) == _font_file(typeface, f.replace("I", "")):
+        f, style = f.replace("I", ""), style.replace("I", "")
+    return f, style
+
+
+def subset_file(typeface, face, chars):
+    """
+    (path, cmap) of a TrueType file with just the glyphs of `chars` from the
+    typeface's face, for pdf.add_font(), and the code points it covers.
+    Made on first use; if FONT_CACHE_DIR cannot be written, the full font
+    file is returned instead.
+    """
+    src = _font_file(typeface, face)
+    cmap = _cmap(src) & frozenset(map(ord, chars))
+    h = hashlib.sha1(f"{src}:{os.path.getmtime(src)}:".encode())
+    h.update("".join(sorted(chars)).encode("utf-8", "surrogatepass"))
+    path = os.path.join(FONT_CACHE_DIR, h.hexdigest() + os.path.splitext(src)[1])
+    try:
+        os.utime(path)                  # most recently used; evicted last
+        return path, cmap
+    except OSError:
+        pass
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+    try:
+        os.makedirs(FONT_CACHE_DIR, exist_ok=True)
+        _subset(src, cmap, tmp)
+        os.replace(tmp, path)
+    except OSError as e:
+        _warn_once(("cache", FONT_CACHE_DIR), "Cannot write font subsets to %s (%s); embedding whole fonts.",
+                   FONT_CACHE_DIR, e)
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        return src, _cmap(src)
+    _evict()
+    return path, cmap
+
+
+def _subset(src, unicodes, out):
+    from fontTools import subset as ftsubset, ttLib
+
+    # fpdf2's own subsetting options, but dropping TrueType hinting, which
+    # PDF viewers rasterise without and which is a large share of a subset.
+    options = ftsubset.Options(notdef_outline=True, recommended_glyphs=True, hinting=False)
+    options.drop_tables += _DROP_TABLES
+    subsetter = ftsubset.Subsetter(options)
+    subsetter.populate(unicodes=unicodes)
+    with ttLib.TTFont(src, recalcTimestamp=False) as font:
+        subsetter.subset(font)
+        font.save(out)
+
+
+def _evict():
+    files = []
+    with _lock, os.scandir(FONT_CACHE_DIR) as it:
+        for e in it:
+            if not e.name.endswith(".part"):
+                try:
+                    files.append((e.stat().st_mtime, e.path))
+                except OSError:
+                    continue
+        for _, path in sorted(files)[:max(0, len(files) - FONT_SUBSET_CACHE_ENTRIES)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
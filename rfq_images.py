@@ -0,0 +1,710 @@
+"""
+Image pipeline for the RFQ PDF engine: the output profiles that set image
+resolution and quality, downscaling uploads to their placed size, bounded
+(draft-mode, budgeted, optionally subprocess-isolated) decoding, and the
+per-document ImageRegistry that embeds each distinct image once.
+
+Pillow and fpdf2 are imported on first use so that importing this module,
+e.g. in a decode worker or a batch parent process, stays cheap.
+"""
+import atexit
+import hashlib
+import io
+import os
+import sys
+import threading
+import types
+from collections import OrderedDict
+try:
+    import resource
+except ImportError:         # not available on Windows; decoding then stays in-process
+    resource = None
+
+
+# ==============================================================
+# IMAGE PREPARATION
+# ==============================================================
+
+IMAGE_TARGET_DPI = 150      # resolution layout / container images are resampled to
+IMAGE_JPEG_QUALITY = 85
+IMAGE_WORKERS = min(4, os.cpu_count() or 1)   # 0 or 1 prepares images serially
+
+# Decode limits.  Pixel counts are of the decoded (post-draft) image, so a huge
+# JPEG bound for a small cell is cheap and allowed; a huge PNG is not.
+IMAGE_MAX_PIXELS = 40_000_000           # per image
+IMAGE_DOC_PIXEL_BUDGET = 200_000_000    # all images decoded for one document
+IMAGE_DECODE_ISOLATION = resource is not None    # decode in rlimited worker processes
+IMAGE_INLINE_DECODE_PIXELS = 4_000_000     # a lone image this small is decoded in-process even so
+IMAGE_DECODE_CPU_SECONDS = 10           # per image, inside the subprocess
+IMAGE_DECODE_MAX_BYTES = 1 << 30        # extra address space a decode worker may map
+
+# Resampled images kept across documents, so re-generating an RFQ whose
+# pictures did not change skips decoding them again.
+IMAGE_PREPARED_CACHE_BYTES = 64 << 20
+IMAGE_DECODED_CACHE_BYTES = 256 << 20     # per DecodedImages store
+
+
+class ImageDecodeError(ValueError):
+    """An uploaded image was rejected or could not be decoded."""
+
+
+# ==============================================================
+# OUTPUT PROFILES
+# ==============================================================
+
+# What the PDF is for decides how much image detail it carries.  'screen' is
+# what the engine has always produced.  Explicit image_dpi /
+# image_jpeg_quality / pdf_compress keys in a pdf_data_dict override the
+# profile's values.  'draft' is for quick previews while editing: images are
+# drawn as placeholder boxes, nothing is compressed and every page carries a
+# DRAFT watermark.
+OUTPUT_PROFILES = {
+    "print": {"compress": True, "image_dpi": 300, "image_jpeg_quality": 92},
+    "screen": {"compress": True, "image_dpi": IMAGE_TARGET_DPI, "image_jpeg_quality": IMAGE_JPEG_QUALITY},
+    "email": {"compress": True, "image_dpi": 100, "image_jpeg_quality": 70},
+    "draft": {"compress": False, "image_dpi": IMAGE_TARGET_DPI, "image_jpeg_quality": IMAGE_JPEG_QUALITY,
+              "draft": True},
+}
+OUTPUT_PROFILE = "screen"
+
+
+def output_settings(data):
+    """The compress / image_dpi / image_jpeg_quality / draft settings a pdf_data_dict renders with."""
+    name = data.get('output_profile') or OUTPUT_PROFILE
+    if name not in OUTPUT_PROFILES:
+        raise ValueError(f"unknown output profile {name!r}; expected one of {', '.join(OUTPUT_PROFILES)}")
+    profile = OUTPUT_PROFILES[name]
+    return {
+        "compress": data.get('pdf_compress', profile["compress"]),
+        "image_dpi": data.get('image_dpi', profile["image_dpi"]),
+        "image_jpeg_quality": data.get('image_jpeg_quality', profile["image_jpeg_quality"]),
+        "draft": profile.get("draft", False),
+    }
+
+
+def _target_px(w_mm, h_mm, dpi):
+    return max(1, round(w_mm / 25.4 * dpi)), max(1, round(h_mm / 25.4 * dpi))
+
+
+def _slot_size(orig_size, w_mm, h_mm, fit, dpi):
+    """Pixel size an orig_size image should have in a w_mm x h_mm slot at dpi."""
+    iw, ih = orig_size
+    tw, th = _target_px(w_mm, h_mm, dpi)
+    if fit:
+        scale = min(1.0, tw / iw, th / ih)
+        return max(1, round(iw * scale)), max(1, round(ih * scale))
+    return min(iw, tw), min(ih, th)
+
+
+def _open_for_slot(img_bytes, w_mm, h_mm, fit, dpi):
+    """
+    Open an image lazily (header only) and work out the pixel size it should
+    have in a w_mm x h_mm slot.  JPEGs are switched to reduced-scale (draft)
+    decoding, so img.size afterwards is what a load() will actually decode.
+    Returns (img, original_size, new_size).
+    """
+    from PIL import Image
+
+    img = Image.open(io.BytesIO(img_bytes))
+    new_size = _slot_size(img.size, w_mm, h_mm, fit, dpi)
+    orig_size = img.size
+    if img.format == "JPEG" and new_size != orig_size:
+        img.draft(img.mode, new_size)
+    return img, orig_size, new_size
+
+
+def _decoded_pixels(img_bytes, w_mm, h_mm, fit=True, dpi=IMAGE_TARGET_DPI, passthrough=True):
+    """Pixels prepare_image (decode_image, with passthrough=False) will decode for this slot."""
+    img, orig_size, new_size = _open_for_slot(img_bytes, w_mm, h_mm, fit, dpi)
+    if passthrough and img.format == "JPEG" and new_size == orig_size:
+        return 0
+    return img.size[0] * img.size[1]
+
+
+def decode_image(img_bytes, w_mm, h_mm, fit=True, dpi=IMAGE_TARGET_DPI, max_pixels=IMAGE_MAX_PIXELS):
+    """
+    Decode an image for a w_mm x h_mm slot at `dpi` (JPEGs at reduced scale
+    where that still covers the slot), in a mode the encoders accept.
+    Returns (img, original_size, source_format) for encode_image(); raises
+    ImageDecodeError if decoding would exceed max_pixels.
+    """
+    img, orig_size, _ = _open_for_slot(img_bytes, w_mm, h_mm, fit, dpi)
+    src_format = img.format
+    if img.size[0] * img.size[1] > max_pixels:
+        raise ImageDecodeError(f"{img.size[0]}x{img.size[1]} image exceeds the {max_pixels:,} pixel limit")
+    has_alpha = img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info
+    if img.mode not in ("RGB", "L", "CMYK", "RGBA", "LA"):
+        img = img.convert("RGBA" if has_alpha else "RGB")
+    img.load()
+    return img, orig_size, src_format
+
+
+def encode_image(decoded, img_bytes, w_mm, h_mm, fit=True, dpi=IMAGE_TARGET_DPI, quality=IMAGE_JPEG_QUALITY):
+    """
+    Resample a decode_image() result for the slot at `dpi` (at most the dpi
+    it was decoded at) and encode it in the cheapest suitable format.
+    """
+    from PIL import Image
+
+    img, orig_size, src_format = decoded
+    new_size = _slot_size(orig_size, w_mm, h_mm, fit, dpi)
+    downscale = new_size != orig_size
+    if not downscale and src_format == "JPEG":
+        return img_bytes
+
+    has_alpha = img.mode in ("RGBA", "LA") or "transparency" in img.info
+    if img.size != new_size:
+        img = img.resize(new_size, Image.Resampling.LANCZOS)
+
+    def _encode(fmt, **kw):
+        buf = io.BytesIO()
+        img.save(buf, fmt, **kw)
+        return buf.getvalue()
+
+    if has_alpha:
+        candidates = [_encode("PNG")]
+    elif src_format == "JPEG":
+        candidates = [_encode("JPEG", quality=quality)]
+    else:
+        # Lossless sources may be line drawings (PNG wins) or photos (JPEG wins)
+        candidates = [_encode("PNG"), _encode("JPEG", quality=quality)]
+    if not downscale:
+        candidates.append(img_bytes)
+    return min(candidates, key=len)
+
+
+def prepare_image(img_bytes, w_mm, h_mm, fit=True, dpi=IMAGE_TARGET_DPI, quality=IMAGE_JPEG_QUALITY,
+                  max_pixels=IMAGE_MAX_PIXELS):
+    """
+    Downscale an image to `dpi` at its placed size (w_mm x h_mm) and re-encode
+    it in the cheapest suitable format.  With fit=True the image keeps its
+    aspect ratio inside the box; otherwise each axis is capped independently
+    (the image is stretched to the box when drawn anyway).  Images are never
+    upscaled, and a JPEG that already fits is passed through untouched.
+    Raises ImageDecodeError if decoding would exceed max_pixels.
+    """
+    if _decoded_pixels(img_bytes, w_mm, h_mm, fit, dpi) == 0:
+        return img_bytes
+    return encode_image(decode_image(img_bytes, w_mm, h_mm, fit, dpi, max_pixels),
+                        img_bytes, w_mm, h_mm, fit, dpi, quality)
+
+
+# ── Isolated decoding ─────────────────────────────────────────────────────────
+# One pool of decode workers per process, started on first use and shut
+# down at exit.  Workers come from a forkserver (spawn where there is none),
+# never from fork(): the app is multi-threaded, and a fork taken while
+# another thread holds a lock would deadlock the child.
+
+_decode_pool = None
+_decode_pool_lock = threading.Lock()
+
+
+def _limit_decode_worker(max_bytes):
+    # Cap the worker's address space relative to what it maps once started
+    # (the interpreter and Pillow), so max_bytes is what decoding may add.
+    try:
+        with open("/proc/self/statm") as f:
+            base = int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return
+    resource.setrlimit(resource.RLIMIT_AS, (base + max_bytes, resource.RLIM_INFINITY))
+
+
+def _run_limited(fn, args, cpu_seconds):
+    # RLIMIT_CPU counts the whole process lifetime, so each job moves the
+    # soft limit to "CPU used so far + cpu_seconds"; SIGXCPU kills the worker.
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = int(usage.ru_utime + usage.ru_stime) + cpu_seconds
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, resource.getrlimit(resource.RLIMIT_CPU)[1]))
+    return fn(*args)
+
+
+def _new_decode_pool(workers, max_bytes):
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context("forkserver")
+        ctx.set_forkserver_preload(["rfq_images", "PIL.Image"])
+    else:
+        ctx = multiprocessing.get_context("spawn")
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                               initializer=_limit_decode_worker, initargs=(max_bytes,))
+    # A starting worker re-runs the parent's __main__ script, which under
+    # Streamlit is the app itself.  Start every worker now (each submit
+    # starts one while none is idle) in front of an empty __main__.
+    main = sys.modules["__main__"]
+    sys.modules["__main__"] = types.ModuleType("__main__")
+    try:
+        for _ in range(workers):
+            pool.submit(int)
+    finally:
+        sys.modules["__main__"] = main
+    return pool
+
+
+def _get_decode_pool(max_bytes):
+    global _decode_pool
+    with _decode_pool_lock:
+        if _decode_pool is None:
+            _decode_pool = _new_decode_pool(max(1, IMAGE_WORKERS), max_bytes)
+        return _decode_pool
+
+
+def _discard_decode_pool(pool):
+    """Drop `pool`, broken by a killed worker, so the next caller starts a fresh one."""
+    global _decode_pool
+    with _decode_pool_lock:
+        if _decode_pool is pool:
+            _decode_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+@atexit.register
+def shutdown_decode_pool():
+    """Stop the decode workers, if any were started; the next isolated decode starts new ones."""
+    global _decode_pool
+    with _decode_pool_lock:
+        pool, _decode_pool = _decode_pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _run_isolated(jobs, fn=prepare_image, cpu_seconds=IMAGE_DECODE_CPU_SECONDS,
+                  max_bytes=IMAGE_DECODE_MAX_BYTES):
+    """
+    Run fn(*args) (prepare_image, decode_image or make_thumbnail) for each
+    job on the resource-limited decode workers.  Returns a list aligned
+    with `jobs` holding the results or the exceptions raised.
+    """
+    from concurrent.futures.process import BrokenProcessPool
+
+    results = [None] * len(jobs)
+    crashed = []
+    pool = _get_decode_pool(max_bytes)
+    futures = []
+    try:
+        for args in jobs:
+            futures.append(pool.submit(_run_limited, fn, args, cpu_seconds))
+    except BrokenProcessPool:
+        crashed = list(range(len(futures), len(jobs)))
+    for i, fut in enumerate(futures):
+        try:
+            results[i] = fut.result()
+        except BrokenProcessPool:
+            crashed.append(i)
+        except Exception as e:
+            results[i] = e
+    if not crashed:
+        return results
+    # A killed worker breaks the shared pool and fails every job in flight,
+    # this render's and any other's.  Rerun this render's one per private
+    # one-worker pool, so only the offending image is lost.
+    _discard_decode_pool(pool)
+    for i in sorted(crashed):
+        with _new_decode_pool(1, max_bytes) as retry:
+            try:
+                results[i] = retry.submit(_run_limited, fn, jobs[i], cpu_seconds).result()
+            except BrokenProcessPool:
+                results[i] = ImageDecodeError("image decoder exceeded its CPU or memory limit")
+            except Exception as e:
+                results[i] = e
+    return results
+
+
+# ==============================================================
+# PREPARED IMAGE CACHE
+# ==============================================================
+
+class _PreparedCache:
+    """Process-wide LRU of prepared / parsed images, capped by total bytes."""
+
+    def __init__(self, max_bytes):
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._size = 0
+
+    def get(self, key):
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is None:
+                return None
+            self._entries.move_to_end(key)
+            return hit[0]
+
+    def put(self, key, out, size=None):
+        size = len(out) if size is None else size
+        with self._lock:
+            if size > self._max_bytes or key in self._entries:
+                return
+            self._entries[key] = (out, size)
+            self._size += size
+            while self._size > self._max_bytes:
+                _, (_, old) = self._entries.popitem(last=False)
+                self._size -= old
+
+
+_PREPARED = _PreparedCache(IMAGE_PREPARED_CACHE_BYTES)
+
+
+class DecodedImages:
+    """
+    Decoded source images shared by several renders of the same document at
+    different image settings (rfq_engine's size-budget search).  Each image
+    is decoded once, at `dpi` (the highest any render uses), and the renders
+    only resample and re-encode it.  Capped by decoded bytes.
+    """
+
+    def __init__(self, dpi, max_bytes=IMAGE_DECODED_CACHE_BYTES):
+        self.dpi = dpi
+        self.failed = {}    # key -> ImageDecodeError, so a bad upload is not retried either
+        self._cache = _PreparedCache(max_bytes)
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def put(self, key, decoded):
+        img = decoded[0]
+        self._cache.put(key, decoded, size=img.size[0] * img.size[1] * len(img.getbands()))
+
+
+def _encode_stored(store, key, img_bytes, w_mm, h_mm, fit, dpi, quality):
+    decoded = store.get(key)
+    if decoded is None:         # evicted since it was decoded
+        return prepare_image(img_bytes, w_mm, h_mm, fit, dpi, quality)
+    return encode_image(decoded, img_bytes, w_mm, h_mm, fit, dpi, quality)
+
+
+# ==============================================================
+# PREVIEW THUMBNAILS
+# ==============================================================
+
+# Small previews the app shows instead of the uploads themselves, so a rerun
+# sends the browser a few KB per image rather than the full file.  The
+# uploads stay server-side for the PDF.
+THUMBNAIL_CACHE_BYTES = 32 << 20
+THUMBNAIL_JPEG_QUALITY = 80
+
+
+def _thumbnail_pixels(img_bytes, px):
+    """Pixels make_thumbnail() will decode, read from the header alone."""
+    from PIL import Image
+
+    try:
+        img = Image.open(io.BytesIO(img_bytes))
+        if img.format == "JPEG":
+            img.draft("RGB", (px, px))
+    except Exception as e:
+        raise ImageDecodeError(f"cannot preview image: {e}") from e
+    return img.size[0] * img.size[1]
+
+
+def make_thumbnail(img_bytes, px, max_pixels=IMAGE_MAX_PIXELS):
+    """
+    A preview of an image at most px pixels on its longer side, turned
+    upright by its EXIF orientation as a browser would show it: PNG if it
+    has transparency, else JPEG.  Raises ImageDecodeError if the image
+    cannot be decoded or would exceed max_pixels.
+    """
+    from PIL import Image, ImageOps
+
+    try:
+        img = Image.open(io.BytesIO(img_bytes))
+        if img.format == "JPEG":
+            img.draft("RGB", (px, px))
+        if img.size[0] * img.size[1] > max_pixels:
+            raise ImageDecodeError(f"{img.size[0]}x{img.size[1]} image exceeds the {max_pixels:,} pixel limit")
+        img = ImageOps.exif_transpose(img)
+        has_alpha = img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info
+        if img.mode not in ("RGB", "L", "RGBA", "LA"):
+            img = img.convert("RGBA" if has_alpha else "RGB")
+        img.thumbnail((px, px), Image.Resampling.LANCZOS)
+        buf = io.BytesIO()
+        if has_alpha:
+            img.save(buf, "PNG")
+        else:
+            img.save(buf, "JPEG", quality=THUMBNAIL_JPEG_QUALITY)
+        return buf.getvalue()
+    except ImageDecodeError:
+        raise
+    except Exception as e:
+        raise ImageDecodeError(f"cannot preview image: {e}") from e
+
+
+class ThumbnailCache:
+    """
+    Previews by content hash and size, made once each and kept in an LRU
+    capped by bytes.  Images that cannot be previewed are remembered too,
+    so they are not retried on every rerun.  Process-wide, so sessions
+    showing the same upload share its preview.
+    """
+
+    def __init__(self, max_bytes=THUMBNAIL_CACHE_BYTES, isolate=IMAGE_DECODE_ISOLATION):
+        self._cache = _PreparedCache(max_bytes)
+        self._isolate = isolate and IMAGE_DECODE_ISOLATION
+
+    def get(self, img_bytes, px):
+        """Preview bytes for img_bytes at most px pixels across, or None if it cannot be previewed."""
+        key = (hashlib.sha1(img_bytes).digest(), px)
+        thumb = self._cache.get(key)
+        if thumb is None:
+            try:
+                thumb = self._make(img_bytes, px)
+            except ImageDecodeError:
+                thumb = b""
+            self._cache.put(key, thumb, size=max(len(thumb), 64))
+        return thumb or None
+
+    def _make(self, img_bytes, px):
+        # Uploads are decoded on the rlimited workers like the PDF's images,
+        # except one small enough that preload() would decode it here too.
+        if not self._isolate or _thumbnail_pixels(img_bytes, px) <= IMAGE_INLINE_DECODE_PIXELS:
+            return make_thumbnail(img_bytes, px)
+        out, = _run_isolated([(img_bytes, px)], fn=make_thumbnail)
+        if isinstance(out, ImageDecodeError):
+            raise out
+        if isinstance(out, Exception):
+            raise ImageDecodeError(f"cannot preview image: {out}")
+        return out
+
+
+THUMBNAILS = ThumbnailCache()
+
+
+# ==============================================================
+# IMAGE REGISTRY
+# ==============================================================
+
+class ImageRegistry:
+    """
+    Per-document image store.  Each distinct image is hashed once, handed to
+    fpdf2 as an in-memory buffer on first use, and referenced by name on every
+    later placement, so a logo or drawing is embedded once per PDF no matter
+    how many pages it appears on.  Nothing touches the filesystem.
+
+    Prepared (resampled) variants are decoded under the per-image and
+    per-document pixel budgets; an image that fails or is refused raises
+    ImageDecodeError from prepared() and is never retried in-process.
+    """
+
+    def __init__(self, pdf, dpi=IMAGE_TARGET_DPI, quality=IMAGE_JPEG_QUALITY,
+                 max_pixels=IMAGE_MAX_PIXELS, pixel_budget=IMAGE_DOC_PIXEL_BUDGET,
+                 isolate=IMAGE_DECODE_ISOLATION, decoded=None):
+        self._pdf = pdf
+        self._decoded = decoded
+        self._dpi = dpi
+        self._quality = quality
+        self._max_pixels = max_pixels
+        self._pixel_budget = pixel_budget
+        self._isolate = isolate and IMAGE_DECODE_ISOLATION
+        self._pixels_used = 0
+        self._last_pixels = 0
+        self._digests = {}   # id(bytes) -> (bytes, digest); the bytes ref keeps the id valid
+        self._names = {}     # digest -> fpdf2 image-cache name
+        self._sizes = {}     # digest -> (w, h) in pixels, as fpdf2 parsed it
+        self.embedded_bytes = 0  # encoded image data fpdf2 holds for output()
+        self._prepared = {}  # (digest, w_mm, h_mm, fit) -> downscaled bytes
+        self._failed = {}    # (digest, w_mm, h_mm, fit) -> ImageDecodeError
+        self._placed = {}    # (digest, w_mm, h_mm, fit) -> fpdf2 name of the prepared variant
+
+    def _digest(self, img_bytes):
+        hit = self._digests.get(id(img_bytes))
+        if hit is not None and hit[0] is img_bytes:
+            return hit[1]
+        digest = hashlib.sha1(img_bytes).hexdigest()
+        self._digests[id(img_bytes)] = (img_bytes, digest)
+        return digest
+
+    def name(self, img_bytes):
+        """Return the fpdf2 image-cache name for these bytes, loading them on first use."""
+        digest = self._digest(img_bytes)
+        name = self._names.get(digest)
+        if name is None:
+            name = self._names[digest] = self._load(img_bytes, digest)
+        return name
+
+    def _load(self, img_bytes, digest):
+        from fpdf.image_parsing import preload_image
+
+        name, _, info = preload_image(self._pdf.image_cache, io.BytesIO(img_bytes))
+        if "w" not in info or "h" not in info:
+            raise ImageDecodeError(f"fpdf2 returned no size for image {digest[:12]}")
+        self._sizes[digest] = (info["w"], info["h"])
+        self.embedded_bytes += len(info.get("data") or b"") + len(info.get("smask") or b"")
+        return name
+
+    def size_px(self, img_bytes):
+        self.name(img_bytes)
+        return self._sizes[self._digest(img_bytes)]
+
+    def _key(self, img_bytes, w_mm, h_mm, fit):
+        return self._digest(img_bytes), round(w_mm, 2), round(h_mm, 2), fit
+
+    def _shared_key(self, key):
+        return key + (self._dpi, self._quality, self._max_pixels)
+
+    def _admit(self, key, img_bytes, w_mm, h_mm, fit):
+        """Charge the job against the document pixel budget; False if refused."""
+        try:
+            if self._decoded is None:
+                pixels = _decoded_pixels(img_bytes, w_mm, h_mm, fit, self._dpi)
+            else:
+                pixels = _decoded_pixels(img_bytes, w_mm, h_mm, fit, self._decoded.dpi, passthrough=False)
+        except Exception as e:
+            self._failed[key] = ImageDecodeError(f"unreadable image: {e}")
+            return False
+        if pixels > self._max_pixels:
+            self._failed[key] = ImageDecodeError(f"image exceeds the {self._max_pixels:,} pixel limit")
+            return False
+        if self._pixels_used + pixels > self._pixel_budget:
+            self._failed[key] = ImageDecodeError("document image pixel budget exhausted")
+            return False
+        self._pixels_used += pixels
+        self._last_pixels = pixels
+        return True
+
+    def preload(self, jobs, workers=IMAGE_WORKERS):
+        """
+        Prepare every (img_bytes, w_mm, h_mm, fit) job before layout starts so
+        the layout pass only places ready buffers.  Jobs are admitted against
+        the pixel budgets in order, then decoded on the shared pool of
+        rlimited worker processes when isolation is on (except a single
+        image under IMAGE_INLINE_DECODE_PIXELS), or else on a thread pool
+        (Pillow releases the GIL while decoding, resampling and encoding).
+        workers <= 1 runs them serially, in order.
+
+        With a DecodedImages store, decoded sources are kept there (decoded
+        at the store's dpi) and later documents sharing the store only
+        resample and re-encode them.
+        """
+        store = self._decoded
+        pending = {}
+        pixels = []          # decoded size of each admitted job, for the memory accounting
+        for img_bytes, w_mm, h_mm, fit in jobs:
+            if not isinstance(img_bytes, bytes):
+                continue
+            key = self._key(img_bytes, w_mm, h_mm, fit)
+            if key in self._prepared or key in self._failed or key in self._placed or key in pending:
+                continue
+            shared = _PREPARED.get(self._shared_key(key))
+            if shared is not None:
+                self._prepared[key] = shared
+                continue
+            if store is not None and key in store.failed:
+                self._failed[key] = store.failed[key]
+            elif store is not None and store.get(key) is not None:
+                pending[key] = (img_bytes, w_mm, h_mm, fit)
+            elif self._admit(key, img_bytes, w_mm, h_mm, fit):
+                pending[key] = (img_bytes, w_mm, h_mm, fit)
+                pixels.append(self._last_pixels)
+        if not pending:
+            return
+        # Shipping one small image to a worker costs more than decoding it;
+        # it has already passed the pixel limit, so it is decoded here.
+        isolate = self._isolate and not (len(pending) == 1 and sum(pixels) <= IMAGE_INLINE_DECODE_PIXELS)
+        trace = self._pdf.trace
+        if trace is not None:
+            trace.count("decoded", len(pending))
+            # Decoded pixels live in this process unless isolated workers
+            # decode (and only send back the encoded result); up to `workers`
+            # images are decoded at once, taken as RGBA.
+            decoding = 0
+            if store is not None or not isolate:
+                decoding = 4 * sum(sorted(pixels, reverse=True)[:max(1, workers)])
+            trace.hold_native(decoding, "image decode")
+
+        if store is None:
+            results = self._run(prepare_image, [job + (self._dpi, self._quality, self._max_pixels)
+                                                for job in pending.values()], workers, isolate)
+        else:
+            decode = [key for key in pending if store.get(key) is None]
+            decoded = self._run(decode_image, [pending[key] + (store.dpi, self._max_pixels)
+                                               for key in decode], workers, isolate)
+            failed = {}
+            for key, out in zip(decode, decoded):
+                if isinstance(out, tuple):
+                    store.put(key, out)
+                else:
+                    failed[key] = out
+                    if isinstance(out, ImageDecodeError):
+                        store.failed[key] = out
+            encode = [key for key in pending if key not in failed]
+            encoded = self._run(_encode_stored, [(store, key) + pending[key] + (self._dpi, self._quality)
+                                                 for key in encode], workers, False)
+            results = [failed[key] if key in failed else encoded[encode.index(key)] for key in pending]
+        for key, out in zip(pending, results):
+            if isinstance(out, bytes):
+                self._prepared[key] = out
+                _PREPARED.put(self._shared_key(key), out)
+            elif isinstance(out, ImageDecodeError):
+                self._failed[key] = out
+            else:
+                self._failed[key] = ImageDecodeError(f"could not decode image: {out}")
+        if trace is not None:
+            trace.hold_native(0, "image decode")       # decoded by now: part of the resident size
+
+    @staticmethod
+    def _run(fn, args_list, workers, isolate):
+        """fn(*args) for each args, as a list of results or the exceptions raised."""
+        if not args_list:
+            return []
+
+        def _call(args):
+            try:
+                return fn(*args)
+            except Exception as e:
+                return e
+
+        if isolate:
+            return _run_isolated(args_list, fn)
+        if workers <= 1 or len(args_list) == 1:
+            return [_call(args) for args in args_list]
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=min(workers, len(args_list))) as pool:
+            return list(pool.map(_call, args_list))
+
+    def prepared(self, img_bytes, w_mm, h_mm, fit=True):
+        """Return the bytes resampled for a w_mm x h_mm slot (see prepare_image)."""
+        key = self._key(img_bytes, w_mm, h_mm, fit)
+        if key not in self._prepared and key not in self._failed:
+            self.preload([(img_bytes, w_mm, h_mm, fit)], workers=1)
+        if key in self._failed:
+            raise self._failed[key]
+        return self._prepared[key]
+
+    def place(self, img_bytes, x, y, w, h):
+        self._pdf.image(self.name(img_bytes), x=x, y=y, w=w, h=h)
+        if self._pdf.trace is not None:
+            self._pdf.trace.count("images")
+
+    def place_prepared(self, img_bytes, x, y, w, h, fit=True):
+        """
+        Place img_bytes resampled for its w x h slot.  Once fpdf2 has loaded
+        the prepared variant the registry drops its own buffer and keeps only
+        the name, so a long run of table images is not held twice until
+        output().  Raises ImageDecodeError like prepared().
+        """
+        key = self._key(img_bytes, w, h, fit)
+        name = self._placed.get(key)
+        if name is None:
+            prepared = self.prepared(img_bytes, w, h, fit)
+            name = self._placed[key] = self.name(prepared)
+            del self._prepared[key]
+            self._digests.pop(id(prepared), None)
+        self._pdf.image(name, x=x, y=y, w=w, h=h)
+        if self._pdf.trace is not None:
+            self._pdf.trace.count("images")
+
+
+def draw_image_placeholder(pdf, x, y, w, h, label="Image unavailable"):
+    """Grey box drawn in place of an image that could not be embedded."""
+    if pdf.trace is not None:
+        pdf.trace.count("placeholders")
+    with pdf.local_context(fill_color=(242, 242, 242), draw_color=(170, 170, 170),
+                           text_color=(120, 120, 120)):
+        pdf.rect(x, y, w, h, 'FD')
+        pdf.set_font('Arial', 'I', 7 if h < 30 else 9)
+        pdf.set_xy(x + 1, y + h / 2 - 2)
+        pdf.multi_cell(w - 2, 4, label, border=0, align='C')
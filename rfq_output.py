@@ -0,0 +1,137 @@
+"""
+Finished PDFs on disk, for download.
+
+The app writes each generated document into OutputStore's directory
+instead of keeping its bytes in the Streamlit session: the render goes to
+a .part file that is renamed into place once complete, and the download
+button opens the file only when it is clicked.  Files older than the
+store's TTL are deleted by a sweep that runs now and then as new files
+are written, so the directory never holds more than about one TTL's worth
+of output.
+
+Like the rest of the engine this has no Streamlit dependency.
+"""
+import os
+import re
+import secrets
+import tempfile
+import threading
+import time
+
+OUTPUT_DIR = os.environ.get("RFQ_OUTPUT_DIR") or os.path.join(tempfile.gettempdir(), "rfq-output")
+OUTPUT_TTL_SECONDS = int(os.environ.get("RFQ_OUTPUT_TTL_SECONDS") or 3600)
+
+_UNSAFE_RE = re.compile(r"[^\w.-]+")
+
+
+class OutputExpired(FileNotFoundError):
+    """A finished file was swept (or removed) before it was read."""
+
+
+class OutputStore:
+    """
+    Directory of finished files, each under a fresh random prefix so that
+    sessions generating the same file name never collide.  Safe to share
+    between threads.
+    """
+
+    def __init__(self, directory=OUTPUT_DIR, ttl=OUTPUT_TTL_SECONDS):
+        self.directory = directory
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._next_sweep = 0.0
+
+    def write(self, name, produce):
+        """
+        Call produce(path) to write a new file called `name` and return
+        (final path, what produce returned).  produce writes to a temporary
+        path that only becomes the final one once it returns; if it raises,
+        the partial file is removed.
+        """
+        self.sweep_due()
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{secrets.token_hex(8)}-{_safe_name(name)}")
+        tmp = path + ".part"
+        try:
+            result = produce(tmp)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+        return path, result
+
+    def open(self, path):
+        """An open binary handle on a file this store wrote; OutputExpired once it has been swept."""
+        if os.path.dirname(os.path.abspath(path)) != os.path.abspath(self.directory):
+            raise ValueError(f"{path} is not in the output directory")
+        try:
+            return open(path, "rb")
+        except FileNotFoundError:
+            raise OutputExpired(
+                f"This file has expired ({self.ttl // 60} minutes after it was generated); "
+                f"generate it again.") from None
+
+    def read(self, path):
+        """The bytes of a file this store wrote (see open())."""
+        with self.open(path) as f:
+            return f.read()
+
+    def reader(self, path):
+        """
+        A no-argument callable opening the file, for st.download_button's
+        data: Streamlit calls it when the button is clicked and reads the
+        handle it returns, which is closed once Streamlit drops it.
+        """
+        return lambda: self.open(path)
+
+    # ── Expiry ───────────────────────────────────────────────────────────────
+    def sweep_due(self):
+        """Sweep if a quarter of the TTL has passed since the last sweep."""
+        now = time.time()
+        with self._lock:
+            if now < self._next_sweep:
+                return 0
+            self._next_sweep = now + max(self.ttl / 4, 1)
+        return self.sweep(now)
+
+    def sweep(self, now=None):
+        """Delete the files (finished or partial) last modified more than the TTL ago; returns how many."""
+        cutoff = (time.time() if now is None else now) - self.ttl
+        removed = 0
+        try:
+            entries = list(os.scandir(self.directory))
+        except OSError:
+            return 0
+        for e in entries:
+            try:
+                if e.is_file(follow_symlinks=False) and e.stat().st_mtime < cutoff:
+                    os.remove(e.path)
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def stats(self):
+        """Number and total bytes of the files in the store."""
+        files, size = 0, 0
+        try:
+            with os.scandir(self.directory) as it:
+                for e in it:
+                    try:
+                        size += e.stat().st_size
+                        files += 1
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+        return {"files": files, "bytes": size}
+
+
+def _safe_name(name):
+    return _UNSAFE_RE.sub("_", os.path.basename(name)) or "output"
+
+
+OUTPUT_STORE = OutputStore()
@@ -0,0 +1,260 @@
+"""
+Columnar table engine behind every table in the RFQ.
+
+A table is a list of Column specs plus one list of cells per column:
+ready-to-draw strings (rfq_engine._format_columns) or, for an image
+column, image bytes.  Table.render() wraps every cell once with the
+document's TextMeasurer, sizes all rows, places page breaks group by group
+(repeating the header on each new page) and then draws each row as plain
+rect + text operations.  Nothing goes through multi_cell(), whose per-call
+line breaking was most of the cost of the old hand-written loops.
+"""
+from rfq_images import draw_image_placeholder
+
+HEADER_FILL = (220, 230, 241)
+
+
+class Column:
+    """
+    One table column.  `span` columns are drawn once per row group as a
+    single merged cell; `image` is the (w, h) box for an image column,
+    centred in its cell.
+    """
+
+    def __init__(self, label, width, align="L", valign=None, fill=None, span=False, image=None):
+        self.label = label
+        self.width = width
+        self.align = align
+        self.valign = valign
+        self.fill = fill
+        self.span = span
+        self.image = image
+
+
+class CellStyle:
+    """
+    Font and vertical metrics for a table's header or body rows.  A row is
+    max(min_h, lines * line_h + pad) tall; text starts `top` below the row
+    top (valign "top") or is centred (valign "middle"), inset from the cell
+    sides by `inset`.
+    """
+
+    def __init__(self, size, style="", line_h=5, min_h=8, pad=3, top=1, inset=1,
+                 valign="top", family="Arial"):
+        self.family = family
+        self.style = style
+        self.size = size
+        self.line_h = line_h
+        self.min_h = min_h
+        self.pad = pad
+        self.top = top
+        self.inset = inset
+        self.valign = valign
+
+    def use(self, pdf):
+        pdf.set_font(self.family, self.style, self.size)
+
+
+class TableLayout:
+    """
+    A table measured for drawing: the wrapped header, then one
+    (data, groups, cells, row_h) piece per chunk.  It depends only on the
+    cell values and the table's fonts, never on where it lands, so a frozen
+    layout can be drawn into any number of documents; page breaks are
+    placed when it is drawn.
+    """
+
+    def __init__(self, head_lines, head_h, pieces):
+        self.head_lines = head_lines
+        self.head_h = head_h
+        self.pieces = pieces
+
+    def frozen(self):
+        """A copy whose pieces are measured now and can be drawn repeatedly."""
+        return TableLayout(self.head_lines, self.head_h, [p for p in self.pieces if p])
+
+
+class Table:
+    def __init__(self, columns, header, body, header_fill=HEADER_FILL):
+        self.columns = columns
+        self.header = header
+        self.body = body
+        self.header_fill = header_fill
+
+    # ── Measuring ────────────────────────────────────────────────────────────
+    def _header_lines(self, pdf):
+        hs = self.header
+        hs.use(pdf)
+        lines = [pdf._text.lines(pdf, c.label, c.width - 2 * hs.inset) for c in self.columns]
+        height = max(hs.min_h, max(len(ls) for ls in lines) * hs.line_h + hs.pad)
+        return lines, height
+
+    def _body_lines(self, pdf, data, groups, remember):
+        """Wrapped lines for every text cell, and the height of every row."""
+        bs = self.body
+        bs.use(pdf)
+        n_rows = len(data[0]) if data else 0
+        cells = [None if c.image else pdf._text.column_lines(pdf, col, c.width - 2 * bs.inset, remember)
+                 for c, col in zip(self.columns, data)]
+
+        row_h = [bs.min_h] * n_rows
+        for c, lines in zip(self.columns, cells):
+            if lines is None or c.span:
+                continue
+            for i, ls in enumerate(lines):
+                h = len(ls) * bs.line_h + bs.pad
+                if h > row_h[i]:
+                    row_h[i] = h
+
+        # A spanned cell taller than its group's rows grows the group's last row.
+        span_cols = [j for j, c in enumerate(self.columns) if c.span]
+        if span_cols:
+            start = 0
+            for size in groups:
+                need = max(len(cells[j][start]) * bs.line_h + bs.pad for j in span_cols)
+                have = sum(row_h[start:start + size])
+                if need > have:
+                    row_h[start + size - 1] += need - have
+                start += size
+        return cells, row_h
+
+    # ── Drawing ──────────────────────────────────────────────────────────────
+    def _text(self, pdf, lines, x, y, w, h, style, align, valign):
+        line_h = style.line_h
+        if valign == "middle":
+            y += max(style.top, (h - len(lines) * line_h) / 2)
+        else:
+            y += style.top
+        x += style.inset
+        w -= 2 * style.inset
+        # Baseline placement matches fpdf2's cell(): 0.5 * h + 0.3 * font size.
+        y += 0.5 * line_h + 0.3 * pdf.font_size
+        for line in lines:
+            if line:
+                if align == "L":
+                    dx = pdf.c_margin
+                else:
+                    sw = pdf._text.string_width(pdf, line)
+                    dx = (w - sw) / 2 if align == "C" else w - pdf.c_margin - sw
+                pdf.text(x + dx, y, line)
+            y += line_h
+
+    def _image(self, pdf, img_bytes, x, y, w, h, col):
+        if not isinstance(img_bytes, bytes):
+            return
+        iw, ih = col.image
+        ix = x + (w - iw) / 2
+        iy = y + (h - ih) / 2
+        if pdf.draft:
+            draw_image_placeholder(pdf, ix, iy, iw, ih, label="Image")
+            return
+        try:
+            pdf._images.place_prepared(img_bytes, ix, iy, iw, ih, fit=False)
+        except Exception:
+            draw_image_placeholder(pdf, ix, iy, iw, ih)
+
+    def _draw_header(self, pdf, lines, height):
+        hs = self.header
+        hs.use(pdf)
+        pdf.set_fill_color(*self.header_fill)
+        y = pdf.get_y()
+        x = pdf.l_margin
+        for c, ls in zip(self.columns, lines):
+            pdf.rect(x, y, c.width, height, 'FD')
+            self._text(pdf, ls, x, y, c.width, height, hs, "C", hs.valign)
+            x += c.width
+        pdf.set_y(y + height)
+
+    def _draw_group(self, pdf, data, cells, row_h, start, size):
+        bs = self.body
+        y0 = pdf.get_y()
+        group_h = sum(row_h[start:start + size])
+        x = pdf.l_margin
+        for j, c in enumerate(self.columns):
+            if c.span:
+                pdf.rect(x, y0, c.width, group_h)
+                self._text(pdf, cells[j][start], x, y0, c.width, group_h, bs,
+                           c.align, c.valign or bs.valign)
+            x += c.width
+
+        y = y0
+        for i in range(start, start + size):
+            h = row_h[i]
+            x = pdf.l_margin
+            for j, c in enumerate(self.columns):
+                if not c.span:
+                    if c.fill:
+                        pdf.set_fill_color(*c.fill)
+                        pdf.rect(x, y, c.width, h, 'FD')
+                    else:
+                        pdf.rect(x, y, c.width, h)
+                    if c.image:
+                        self._image(pdf, data[j][i], x, y, c.width, h, c)
+                    else:
+                        self._text(pdf, cells[j][i], x, y, c.width, h, bs,
+                                   c.align, c.valign or bs.valign)
+                x += c.width
+            y += h
+        pdf.set_y(y0 + group_h)
+
+    def _piece(self, pdf, data, groups, remember):
+        n_rows = len(data[0]) if data else 0
+        if not n_rows:
+            return None
+        groups = groups or [1] * n_rows
+        cells, row_h = self._body_lines(pdf, data, groups, remember)
+        return data, groups, cells, row_h
+
+    def layout(self, pdf, chunks, remember=False):
+        """
+        Measure an iterable of (data, groups) pieces of this table.  The
+        pieces are measured lazily, as draw() reaches them; call .frozen()
+        on the result to keep it.
+        """
+        head_lines, head_h = self._header_lines(pdf)
+        return TableLayout(head_lines, head_h,
+                           (self._piece(pdf, data, groups, remember) for data, groups in chunks))
+
+    def draw(self, pdf, layout):
+        """
+        Draw a layout at the current position: the header, then every row
+        group, starting a new page (and repeating the header) wherever the
+        next group does not fit.
+        """
+        self._draw_header(pdf, layout.head_lines, layout.head_h)
+        for piece in layout.pieces:
+            if piece is None:
+                continue
+            data, groups, cells, row_h = piece
+            if pdf.trace is not None:
+                pdf.trace.count("rows", len(row_h))
+                pdf.trace.checkpoint("table rows")
+            self.body.use(pdf)
+            start = 0
+            for size in groups:
+                if pdf.get_y() + sum(row_h[start:start + size]) > pdf.page_break_trigger:
+                    pdf.add_page()
+                    self._draw_header(pdf, layout.head_lines, layout.head_h)
+                    self.body.use(pdf)
+                self._draw_group(pdf, data, cells, row_h, start, size)
+                start += size
+
+    def render(self, pdf, data, groups=None):
+        """
+        Draw the header and then every row.  `data` holds one list per
+        column; `groups` lists consecutive row-group sizes for span columns
+        (default: every row on its own).  A group never splits across pages.
+        """
+        self.render_chunks(pdf, [(data, groups)], remember=True)
+
+    def render_chunks(self, pdf, chunks, remember=False):
+        """
+        render() over an iterable of (data, groups) pieces of one table, e.g.
+        successive slices of a large DataFrame.  Only the current piece's
+        wrapped lines are held, so a generator of pieces keeps a 20k-row table
+        to one slice in memory at a time; unless `remember` is set, its cells
+        are not added to the shared TextMeasurer cache either.  The header is
+        drawn once and again on every new page; groups never cross a piece
+        boundary.
+        """
+        self.draw(pdf, self.layout(pdf, chunks, remember))
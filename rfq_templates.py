@@ -0,0 +1,119 @@
+"""
+Precompiled static pages.
+
+The cover page and the sign-off page are almost entirely fixed text, rules
+and logos.  PageTemplate.compile() runs a page's draw function once against
+a recorder standing in for the document: every drawing call is executed on
+a scratch document (so positions and wrapping come out as they would) and
+kept as a (method, args) list.  Measurements (get_x / get_y /
+get_string_width) and multi_cell()'s line wrapping are done at compile time,
+so stamp() only replays cell() / line() / set_*() calls on the real
+document, through fpdf2's public API.  The few values that vary per RFQ
+are Slot placeholders, filled in from the document's data when stamped.
+"""
+
+
+class Slot:
+    """Placeholder for a per-RFQ value: the key it is looked up by when a template is stamped."""
+
+    def __init__(self, key):
+        self.key = key
+
+    def __repr__(self):
+        return f"Slot({self.key!r})"
+
+
+# Calls that draw or change drawing state; these are recorded and replayed.
+_REPLAYED = ("set_font", "set_text_color", "set_fill_color", "set_draw_color", "set_line_width",
+             "cell", "line", "ln", "set_x", "set_y", "set_xy")
+
+
+def _blank(args):
+    # Slots stand for single-line text or a logo, neither of which moves the
+    # cursor differently with other contents, so the scratch page draws "".
+    return tuple("" if isinstance(a, Slot) else a for a in args)
+
+
+class _Recorder:
+    """
+    The `pdf` a draw function sees while a template is compiled.  Drawing
+    calls are recorded and run on the scratch document; plain attributes
+    (w, l_margin, ...) are read from it.  Any other method is refused, so a
+    draw function cannot do something a stamp would silently leave out.
+    """
+
+    def __init__(self, scratch):
+        self._pdf = scratch
+        self.ops = []
+
+    def __getattr__(self, name):
+        value = getattr(self._pdf, name)
+        if callable(value):
+            raise AttributeError(f"{name}() cannot be recorded in a page template")
+        return value
+
+    def get_x(self):
+        return self._pdf.get_x()
+
+    def get_y(self):
+        return self._pdf.get_y()
+
+    def get_string_width(self, s):
+        return self._pdf.get_string_width(s)
+
+    def place_logo(self, logo_data, x, y, w, h):
+        self.ops.append(("place_logo", (logo_data, x, y, w, h), {}))
+
+    def multi_cell(self, w, h, text, border=0, align='L'):
+        # Wrapped here, once; each line is replayed as the cell multi_cell()
+        # would have drawn for it, ending where multi_cell() leaves the cursor.
+        if border:
+            raise ValueError("bordered multi_cell() cannot be recorded in a page template")
+        lines = self._pdf.multi_cell(w, h, text, border, align, dry_run=True, output="LINES")
+        for i, line in enumerate(lines):
+            last = i == len(lines) - 1
+            self._record("cell", w, h, line, 0, align=align,
+                         new_x="RIGHT" if last else "LEFT", new_y="NEXT")
+
+    def _record(self, name, *args, **kwargs):
+        self.ops.append((name, args, kwargs))
+        return getattr(self._pdf, name)(*_blank(args), **kwargs)
+
+
+def _replayed(name):
+    def method(self, *args, **kwargs):
+        return self._record(name, *args, **kwargs)
+    method.__name__ = name
+    return method
+
+
+for _name in _REPLAYED:
+    setattr(_Recorder, _name, _replayed(_name))
+
+
+class PageTemplate:
+    def __init__(self, ops):
+        self.ops = ops            # [(method name, args, kwargs)], Slot placeholders in args
+
+    @classmethod
+    def compile(cls, draw, scratch, start_y=None):
+        """
+        Record draw(pdf) on `scratch`, a fresh document of the same kind
+        (data, page size, font mode) as the ones the template is stamped
+        on, from `start_y` on its first page.  Returns None when the page
+        would not fit on one page; callers then draw it directly.
+        """
+        scratch.add_page()
+        if start_y is not None:
+            scratch.set_y(start_y)
+        recorder = _Recorder(scratch)
+        draw(recorder)
+        if scratch.page != 1:
+            return None
+        return cls(recorder.ops)
+
+    def stamp(self, pdf, values):
+        """Replay the page on `pdf`, with each Slot replaced by values[slot.key]."""
+        for name, args, kwargs in self.ops:
+            args = tuple(values[a.key] if isinstance(a, Slot) else a for a in args)
+            getattr(pdf, name)(*args, **kwargs)
@@ -0,0 +1,148 @@
+"""
+Text measurement from the current font's glyph-width table.
+
+lines() reproduces the word wrapping fpdf2's multi_cell() applies
+(WORD wrap, no markdown), so table row heights can be sized exactly before
+anything is drawn instead of guessed from characters-per-mm or found with a
+dry-run multi_cell per cell.  Glyph widths are cached per (font, style,
+size) and wrapped lines per (font, size, width, text); one measurer is
+shared by every document in the process.
+"""
+from fpdf.line_break import BREAKING_SPACE_SYMBOLS_STR, NBSP, SOFT_HYPHEN
+
+LINE_CACHE_MAX = 200_000
+
+_HARD_BREAKS = "\n\f"
+_TOLERANCE = 1e-9        # fpdf.util.FloatTolerance
+
+
+class _GlyphWidths(dict):
+    """char -> advance width in document units for one font at one size."""
+
+    def __init__(self, font, size_pt, k):
+        super().__init__()
+        self._font = font
+        self._size_pt = size_pt
+        self._k = k
+
+    def __missing__(self, ch):
+        # Same expression fpdf2's Fragment.get_width() uses per character,
+        # so summed widths match its line-fitting comparisons exactly.
+        w = self._font.get_text_width(ch, self._size_pt, None)[1] / self._k
+        self[ch] = w
+        return w
+
+
+class TextMeasurer:
+    def __init__(self, max_cached_lines=LINE_CACHE_MAX):
+        self._glyphs = {}
+        self._lines = {}
+        self._max_cached_lines = max_cached_lines
+
+    def _font_key(self, pdf):
+        font = pdf.current_font
+        return font.fontkey, getattr(font, "name", ""), pdf.font_size_pt, pdf.k
+
+    def _widths(self, pdf, key):
+        widths = self._glyphs.get(key)
+        if widths is None:
+            widths = self._glyphs[key] = _GlyphWidths(pdf.current_font, pdf.font_size_pt, pdf.k)
+        return widths
+
+    def string_width(self, pdf, text):
+        """Width of `text` in the current font, in document units."""
+        widths = self._widths(pdf, self._font_key(pdf))
+        return sum(widths[ch] for ch in pdf.normalize_text(text))
+
+    def lines(self, pdf, text, w):
+        """The lines pdf.multi_cell(w, h, text) prints in the current font, as a tuple of strings."""
+        key = self._font_key(pdf)
+        memo = (key, w, pdf.c_margin, text)
+        lines = self._lines.get(memo)
+        if lines is None:
+            lines = self._remember(memo, self._wrap_text(pdf, key, text, w))
+        return lines
+
+    def line_count(self, pdf, text, w):
+        """Number of lines pdf.multi_cell(w, h, text) prints in the current font."""
+        return len(self.lines(pdf, text, w))
+
+    def column_lines(self, pdf, values, w, remember=True):
+        """
+        lines() for a whole column of cells drawn at the same width and font.
+        With remember=False new results are only shared within this column
+        and not added to the process-wide cache, for one-off bulk tables that
+        would otherwise fill it with rows nobody asks about again.
+        """
+        key = self._font_key(pdf)
+        cache = self._lines
+        local = {}
+        out = []
+        for text in values:
+            lines = cache.get((key, w, pdf.c_margin, text)) or local.get(text)
+            if lines is None:
+                lines = self._wrap_text(pdf, key, text, w)
+                if remember:
+                    self._remember((key, w, pdf.c_margin, text), lines)
+                else:
+                    local[text] = lines
+            out.append(lines)
+        return out
+
+    def _wrap_text(self, pdf, key, text, w):
+        if pdf.text_shaping or pdf.char_spacing or pdf.font_stretching != 100 or SOFT_HYPHEN in text:
+            # Features the glyph-table path does not model; ask fpdf2.
+            return tuple(pdf.multi_cell(w, 5, text, dry_run=True, output="LINES"))
+        max_w = w
+        max_w -= pdf.c_margin
+        max_w -= pdf.c_margin
+        return _wrap(pdf.normalize_text(text).replace("\r", ""), self._widths(pdf, key), max_w)
+
+    def _remember(self, memo, lines):
+        if len(self._lines) >= self._max_cached_lines:
+            self._lines.clear()
+        self._lines[memo] = lines
+        return lines
+
+
+def _wrap(text, widths, max_w):
+    """multi_cell()'s greedy word wrap over a glyph-width table."""
+    lines = []
+    i, n = 0, len(text)
+    start = 0
+    line_w = 0.0
+    last_space = -1
+    while i < n:
+        ch = text[i]
+        if ch in _HARD_BREAKS:
+            lines.append(text[start:i])
+            i += 1
+            start, line_w, last_space = i, 0.0, -1
+            continue
+        cw = widths[ch]
+        if line_w + cw - max_w > _TOLERANCE:
+            if ch in BREAKING_SPACE_SYMBOLS_STR:
+                lines.append(text[start:i])
+                i += 1                      # the overflowing space is dropped
+            elif last_space >= 0:
+                lines.append(text[start:last_space])
+                i = last_space + 1          # break at the last space, dropping it
+            else:
+                lines.append(text[start:i])
+                if line_w == 0:
+                    i += 1                  # glyph wider than the cell: fpdf2 gives up here
+            start, line_w, last_space = i, 0.0, -1
+            continue
+        if ch in BREAKING_SPACE_SYMBOLS_STR:
+            last_space = i
+        line_w += cw
+        i += 1
+    if line_w:
+        lines.append(text[start:])
+    if NBSP in text:
+        # multi_cell() measures NBSP as itself but prints a plain space.
+        lines = [line.replace(NBSP, " ") for line in lines]
+    return tuple(lines) or ("",)       # multi_cell() always prints at least one line
+
+
+TEXT_MEASURER = TextMeasurer()
@@ -0,0 +1,318 @@
+"""
+Opt-in render instrumentation.
+
+A RenderTrace passed to RFQRenderer.render() records, for every section
+of the document (cover, model details, each navy table, image preload,
+output, ...), its wall time, the pages and content-stream bytes it added
+(for output: the file size) and what it drew: table rows, images placed,
+placeholders, images decoded.  Sections nest; times and counters are
+inclusive of the sections inside them.
+
+With a MemoryMeter attached the trace also accounts for memory: the peak
+of each section, the overall peak and (optionally) its top allocation
+sites, and a per-generation budget that stops the render with
+MemoryBudgetExceeded as soon as it is crossed.
+
+Tracing is off unless a trace is passed in.  Then the section wrappers
+are a single `pdf.trace is None` test and nothing else is recorded.
+"""
+import functools
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+_UNTRACED = nullcontext()
+
+# Per-generation memory budget (bytes); None for none.  A pdf_data_dict can
+# set its own with 'memory_budget_bytes'.
+MEMORY_BUDGET_BYTES = (int(os.environ.get("RFQ_MEMORY_BUDGET_MB") or 0) << 20) or None
+MEMORY_TOP_SITES = 8
+
+
+class RenderTrace:
+    """Timings and counters of one render, section by section."""
+
+    COUNTERS = ("rows", "images", "placeholders", "decoded")
+
+    def __init__(self, memory=None):
+        self.sections = []      # one dict per section, in the order they started
+        self.totals = dict.fromkeys(self.COUNTERS, 0)
+        self.totals.update(seconds=0.0, pages=0, bytes=0)
+        self.memory = memory    # MemoryMeter, or None
+        self._open = []
+        self._t0 = time.perf_counter()
+        if memory is not None:
+            memory.start()
+
+    def span(self, pdf, name):
+        """Context manager recording one section; pdf may be None for a section spanning documents."""
+        return _Span(self, pdf, name)
+
+    def checkpoint(self, where):
+        """Sample memory (with a MemoryMeter); raises MemoryBudgetExceeded over budget."""
+        if self.memory is not None:
+            used = self.memory.check(where)
+            for rec in self._open:
+                if used > rec["peak_bytes"]:
+                    rec["peak_bytes"] = used
+
+    def hold_native(self, nbytes, where):
+        """
+        Count `nbytes` about to be allocated (decoded image pixels) as in use
+        until the next call, checking the budget before they are allocated.
+        """
+        if self.memory is not None:
+            self.memory.native = nbytes
+            self.checkpoint(where)
+
+    def count(self, key, n=1):
+        """Add n to counter `key` of every open section and of the totals."""
+        for rec in self._open:
+            rec[key] += n
+        self.totals[key] += n
+
+    def finish(self, pages, size):
+        """Close the trace once the file is written: its page count and size in bytes."""
+        self.totals.update(seconds=time.perf_counter() - self._t0, pages=pages, bytes=size)
+        self.close()
+        return self
+
+    def close(self):
+        """Stop memory tracking (also on a failed render); idempotent."""
+        if self.memory is not None:
+            self.memory.stop()
+            self.totals["peak_bytes"] = self.memory.peak
+
+    def table(self):
+        """The sections as rows for display, names indented by nesting depth."""
+        rows = []
+        for rec in self.sections:
+            row = {"section": "  " * rec["depth"] + rec["section"], "ms": round(rec["seconds"] * 1000, 1),
+                   **{k: rec[k] for k in ("pages", "bytes") + self.COUNTERS}}
+            if self.memory is not None:
+                row["peak MB"] = round(rec["peak_bytes"] / 1e6, 1)
+            rows.append(row)
+        return rows
+
+
+def _content_bytes(pdf):
+    return sum(len(page.contents) for page in pdf.pages.values())
+
+
+class _Span:
+    __slots__ = ("_trace", "_pdf", "_rec", "_t0", "_pages", "_bytes")
+
+    def __init__(self, trace, pdf, name):
+        self._trace = trace
+        self._pdf = pdf
+        self._rec = dict(section=name, depth=len(trace._open), seconds=0.0, pages=0, bytes=0,
+                         peak_bytes=0, **dict.fromkeys(trace.COUNTERS, 0))
+
+    def __enter__(self):
+        self._trace.sections.append(self._rec)
+        self._trace._open.append(self._rec)
+        self._trace.checkpoint(self._rec["section"])
+        if self._pdf is not None:
+            self._pages = self._pdf.pages_count
+            self._bytes = _content_bytes(self._pdf)
+        self._t0 = time.perf_counter()
+        return self._rec
+
+    def __exit__(self, *exc):
+        rec = self._rec
+        rec["seconds"] = time.perf_counter() - self._t0
+        if self._pdf is not None:
+            rec["pages"] = self._pdf.pages_count - self._pages
+            if not rec["bytes"]:        # unless the section set it (output: the file size)
+                rec["bytes"] = _content_bytes(self._pdf) - self._bytes
+        try:
+            if exc[0] is None:
+                self._trace.checkpoint(rec["section"])
+        finally:
+            self._trace._open.pop()
+        return False
+
+
+# ==============================================================
+# MEMORY ACCOUNTING
+# ==============================================================
+
+class MemoryBudgetExceeded(MemoryError):
+    """A generation needed more memory than its budget allows."""
+
+
+# tracemalloc is process-wide; it runs while any meter needs it and is
+# stopped by the last one, unless something else had started it.
+_tm_lock = threading.Lock()
+_tm_users = 0
+_tm_ours = False
+
+# Where an allocation happened, by source path, as shown in the report.
+_SITE_LABELS = (
+    ("/PIL/", "image decode / resample"),
+    ("/fpdf/output.py", "PDF output buffer"),
+    ("/fpdf/", "PDF document"),
+    ("/fontTools/", "font subsetting"),
+    ("/pandas/", "DataFrame"),
+    ("/numpy/", "arrays"),
+)
+
+
+def _site_label(filename):
+    path = filename.replace(os.sep, "/")
+    for part, label in _SITE_LABELS:
+        if part in path:
+            return label
+    name = os.path.basename(path)
+    return name[:-3] if name.startswith("rfq") and name.endswith(".py") else "other"
+
+
+def _rss():
+    """Resident set size of this process in bytes (its peak where the current size is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class MemoryMeter:
+    """
+    Memory used by one generation, sampled at every section boundary,
+    table slice and image batch: the growth of the process's resident size
+    since the generation started, plus, ahead of each image batch, the
+    decoded pixels the image registry is about to allocate, so a batch that
+    would cross the budget is refused before it is decoded.  Whenever a
+    sample sets a new high it is checked against `budget`.
+
+    allocations=True also traces Python allocations with tracemalloc and
+    snapshots the top allocation sites at marked increases, for the report.
+    That slows rendering several times over, so it is for diagnostics only;
+    the budget check alone costs a /proc read per sample.
+
+    Samples are taken at those points only, so this is not a hard limit:
+    memory allocated and released between two samples goes unseen, and a
+    single step that allocates a lot can overshoot the budget before the
+    next sample refuses it.  The big single steps are covered by checking
+    an estimate before they run: decoded pixels ahead of each image batch,
+    and the file buffer ahead of output().  Table slices keep the rest of
+    the render's steps small.
+
+    Both figures are process-wide, so generations running at the same time
+    count against each other: under load a generation hits its budget
+    sooner, which is the point, since it is the process that must not run
+    out of memory.
+    """
+
+    def __init__(self, budget=None, allocations=False, top=MEMORY_TOP_SITES):
+        self.budget = budget
+        self.allocations = allocations
+        self.top = top
+        self.peak = 0             # bytes above the starting point, at the highest sample
+        self.peak_where = None
+        self.native = 0           # decoded image pixels about to be allocated
+        self.native_peak = 0
+        self.sites = []           # [(label, "file:line", bytes)] at the last snapshot
+        self._rss_base = 0
+        self._traced_base = 0
+        self._snapped = 0
+        self._active = False
+
+    def start(self):
+        global _tm_users, _tm_ours
+        if self.allocations:
+            import tracemalloc      # not at module level: it pulls in linecache / tokenize
+
+            with _tm_lock:
+                if _tm_users == 0 and not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    _tm_ours = True
+                _tm_users += 1
+                tracemalloc.reset_peak()
+            self._traced_base = tracemalloc.get_traced_memory()[0]
+        self._active = True
+        self._rss_base = _rss()
+
+    def stop(self):
+        global _tm_users, _tm_ours
+        if not self._active:
+            return
+        self._active = False
+        if self.allocations:
+            import tracemalloc
+
+            with _tm_lock:
+                _tm_users -= 1
+                if _tm_users == 0 and _tm_ours:
+                    tracemalloc.stop()
+                    _tm_ours = False
+
+    def check(self, where):
+        """Take a sample; returns the bytes in use, raises MemoryBudgetExceeded over budget."""
+        if not self._active:
+            return 0
+        used = _rss() - self._rss_base
+        if self.allocations:
+            import tracemalloc
+
+            # tracemalloc's own high-water mark also catches peaks between samples.
+            used = max(used, tracemalloc.get_traced_memory()[1] - self._traced_base)
+        used = max(0, used) + self.native
+        self.native_peak = max(self.native_peak, self.native)
+        if used > self.peak:
+            self.peak, self.peak_where = used, where
+            if self.allocations and self.top and used > 1.25 * self._snapped and used > (64 << 10):
+                self._snapshot(used)
+        if self.budget and used > self.budget:
+            raise MemoryBudgetExceeded(
+                f"Generating this document needs more than its {self.budget / 1e6:.0f} MB memory budget "
+                f"({used / 1e6:.0f} MB in use at '{where}'). Use fewer or smaller images or fewer "
+                f"rows, or raise the budget.")
+        return used
+
+    def _snapshot(self, used):
+        import tracemalloc
+
+        snap = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ])
+        sites = [(_site_label(st.traceback[0].filename),
+                  f"{os.path.basename(st.traceback[0].filename)}:{st.traceback[0].lineno}", st.size)
+                 for st in snap.statistics("lineno")[:self.top]]
+        if self.native:
+            sites.append(("decoded image pixels (not traced)", "rfq_images.ImageRegistry", self.native))
+        self.sites = sorted(sites, key=lambda s: -s[2])[:self.top]
+        self._snapped = used
+
+    def report(self):
+        """Peak bytes, where it was reached, the budget and the top allocation sites."""
+        return {"peak_bytes": self.peak, "peak_where": self.peak_where, "budget_bytes": self.budget,
+                "image_pixels_peak_bytes": self.native_peak,
+                "top_sites": [{"kind": label, "site": site, "bytes": size} for label, site, size in self.sites]}
+
+
+def span(pdf, name):
+    """Context manager recording a section of pdf's render, if it is traced (else yields None)."""
+    return _UNTRACED if pdf.trace is None else pdf.trace.span(pdf, name)
+
+
+def traced(name, label_arg=None):
+    """
+    Decorator for RFQRenderer methods taking (self, pdf, ...): records the
+    call as a section named `name` (followed by its positional argument
+    number `label_arg`, e.g. a table title) when the document is traced.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(self, pdf, *args, **kwargs):
+            trace = pdf.trace
+            if trace is None:
+                return fn(self, pdf, *args, **kwargs)
+            label = name if label_arg is None else f"{name}: {args[label_arg]}"
+            with trace.span(pdf, label):
+                return fn(self, pdf, *args, **kwargs)
+        return wrapper
+    return decorate
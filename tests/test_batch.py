@@ -0,0 +1,61 @@
+import json
+import os
+
+import pytest
+
+import rfq_batch
+
+# The engine still uses fpdf2's older cell(ln=...) calls and 'Arial' core font name.
+pytestmark = pytest.mark.filterwarnings("ignore::DeprecationWarning")
+
+
+@pytest.fixture
+def manifests(tmp_path):
+    d = tmp_path / "manifests"
+    d.mkdir()
+
+    def add(name, content):
+        (d / name).write_text(content if isinstance(content, str) else json.dumps(content), encoding="utf-8")
+    add("good.json", {"Type_of_items": "Bins", "date_release": "2026-03-01",
+                      "items_df": [{"Item Name": "Bin", "Quantity": 4}]})
+    add("broken.json", "{not json")
+    add("list.json", [1, 2])
+    add("bad_date.json", {"date_release": "first of March"})
+    add("missing_image.json", {"layout_images": ["nowhere.png"]})
+    add("notes.txt", "ignored")
+    return d
+
+
+def test_failed_manifests_are_recorded_and_the_batch_carries_on(manifests, tmp_path):
+    out = tmp_path / "out"
+    results = rfq_batch.run_batch(rfq_batch.manifest_jobs(str(manifests)), str(out), workers=1)
+    by_id = {r["rfq_id"]: r for r in results}
+    assert sorted(by_id) == ["bad_date", "broken", "good", "list", "missing_image"]
+    assert by_id["good"]["ok"] and os.path.isfile(by_id["good"]["output"])
+    assert by_id["broken"]["error"].startswith("JSONDecodeError")
+    assert by_id["list"]["error"] == "ValueError: manifest must be a JSON object"
+    assert by_id["bad_date"]["error"].startswith("ValueError")
+    assert by_id["missing_image"]["error"].startswith("FileNotFoundError")
+    assert sorted(os.listdir(out)) == ["good.pdf"]
+
+
+def test_render_failure_removes_the_partial_file(monkeypatch, tmp_path):
+    import rfq_engine
+
+    def fail(data, out):
+        with open(out, "wb") as f:
+            f.write(b"%PDF half")
+        raise MemoryError("out of memory")
+    monkeypatch.setattr(rfq_engine, "write_rfq_pdf", fail)
+    job = {"rfq_id": "x", "manifest": {"rfq_id": "x"}, "base_dir": str(tmp_path)}
+    rec = rfq_batch.render_job(job, str(tmp_path))
+    assert not rec["ok"] and rec["error"] == "MemoryError: out of memory"
+    assert os.listdir(tmp_path) == []
+
+
+def test_main_writes_a_summary_and_fails_the_exit_status(manifests, tmp_path, capsys):
+    out = tmp_path / "out"
+    assert rfq_batch.main([str(manifests), "-o", str(out), "-j", "1"]) == 1
+    summary = json.loads((out / "summary.json").read_text(encoding="utf-8"))
+    assert (summary["total"], summary["succeeded"], summary["failed"]) == (5, 1, 4)
+    assert "FAILED broken" in capsys.readouterr().err
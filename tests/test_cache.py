@@ -0,0 +1,114 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from rfq_cache import PDFCache, SectionCache, pdf_cache_key, section_key
+
+pytestmark = pytest.mark.filterwarnings("ignore::DeprecationWarning")
+
+
+def _data(**extra):
+    d = {"Type_of_items": "Bins", "date_release": date(2026, 1, 1), "layout_images": [b"\x89PNG" * 2000],
+         "items_df": pd.DataFrame({"Item Name": ["a", "b"], "Quantity": [1, 2]})}
+    d.update(extra)
+    return d
+
+
+def test_key_ignores_dict_order_and_execution_settings():
+    a = _data()
+    b = dict(reversed(list(_data().items())))
+    assert pdf_cache_key(a) == pdf_cache_key(b)
+    assert pdf_cache_key(a) == pdf_cache_key(_data(image_workers=8, memory_budget_bytes=1 << 20))
+
+
+def test_key_follows_equal_content_not_identity():
+    assert pdf_cache_key(_data()) == pdf_cache_key(_data(layout_images=[bytes(b"\x89PNG" * 2000)]))
+
+
+@pytest.mark.parametrize("change", [
+    {"Type_of_items": "Racks"},
+    {"date_release": date(2026, 1, 2)},
+    {"layout_images": [b"\x89PNG" * 2001]},
+    {"items_df": pd.DataFrame({"Item Name": ["a", "c"], "Quantity": [1, 2]})},
+    {"items_df": pd.DataFrame({"Item Name": ["a", "b"], "Quantity": [1.0, 2.0]})},     # dtype
+    {"items_df": pd.DataFrame({"Item Name": ["a", "b"], "Qty": [1, 2]})},             # column name
+    {"draft": True},
+])
+def test_key_changes_with_content(change):
+    assert pdf_cache_key(_data(**change)) != pdf_cache_key(_data())
+
+
+@pytest.mark.parametrize("a, b", [
+    (1, "1"), (1, 1.0), (True, 1), (None, ""), (b"x", "x"), ([1, 2], (1, 2, 0)),
+    (pd.DataFrame({"c": [1, "1"]}), pd.DataFrame({"c": ["1", "1"]})),
+])
+def test_values_that_print_alike_hash_apart(a, b):
+    assert section_key("s", a) != section_key("s", b)
+
+
+def test_frame_index_is_part_of_the_key():
+    df = pd.DataFrame({"c": ["x", "y"]})
+    assert section_key("s", df) != section_key("s", df.set_axis([5, 6]))
+
+
+def test_disk_hit_keeps_page_count(tmp_path):
+    cache = PDFCache(disk_dir=str(tmp_path))
+    cache.put("k", b"%PDF-1.4 body", pages=3)
+    fresh = PDFCache(disk_dir=str(tmp_path))
+    out = tmp_path / "copy.pdf"
+    assert fresh.copy_to("k", str(out)) == (13, 3)
+    assert out.read_bytes() == b"%PDF-1.4 body"
+    assert fresh.copy_to("missing", str(out)) is None
+    fresh.clear()
+    assert list(tmp_path.glob("k.*")) == []
+
+
+def test_section_cache_keeps_to_its_byte_budget():
+    cache = SectionCache(max_bytes=3000)
+    for i in range(5):
+        cache.get("s", i, lambda: "x" * 1000)
+    assert cache.stats()["entries"] == 2 and cache.stats()["bytes"] <= 3000
+    cache.get("s", "big", lambda: "x" * 5000)                 # built, not kept
+    assert cache.stats()["entries"] == 2
+    cache.get("s", 4, lambda: pytest.fail("evicted the most recent section"))
+
+
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+def test_cached_container_layouts_hold_no_image_bytes():
+    import io
+    import os
+
+    from PIL import Image
+
+    from rfq_engine import RFQRenderer
+
+    def png():
+        buf = io.BytesIO()
+        Image.frombytes("RGB", (200, 150), os.urandom(200 * 150 * 3)).save(buf, "PNG")
+        return buf.getvalue()
+
+    images = [png() for _ in range(4)]
+    df = pd.DataFrame({"Description": [f"Bin {i}" for i in range(4)], "Qty": [1, 2, 3, 4],
+                       "image_data_bytes": images})
+    cache = SectionCache()
+    data = {"rfq_category": "Warehouse Equipment", "wh_sub": "Storage Container",
+            "storage_containers_df": df, "storage_containers_images": {}}
+    first = RFQRenderer(cache).render(data)
+    assert cache.stats()["bytes"] < sum(map(len, images))
+    assert RFQRenderer(cache).render(data).count(b"/Subtype /Image") == first.count(b"/Subtype /Image") > 4
+
+
+def test_each_call_reports_its_own_cache_hit(tmp_path):
+    from rfq_engine import create_advanced_rfq_pdf, write_rfq_pdf
+
+    cache = PDFCache(disk_dir=str(tmp_path / "c"))
+    data = {"Type_of_items": "Bins", "company_name": "ACME", "rfq_category": "Furniture"}
+    size, hit = write_rfq_pdf(data, str(tmp_path / "a.pdf"), cache=cache)
+    assert not hit and size == (tmp_path / "a.pdf").stat().st_size
+    cache.get("unrelated")                           # another session's miss in between
+    size, hit, tr = write_rfq_pdf(data, str(tmp_path / "b.pdf"), cache=cache, trace=True)
+    assert hit and tr.totals["bytes"] == size
+    pdf_bytes, hit = create_advanced_rfq_pdf(dict(data, company_name="Globex"), cache=cache)
+    assert not hit and pdf_bytes.startswith(b"%PDF")
+    assert isinstance(write_rfq_pdf(data, str(tmp_path / "c.pdf")), int)
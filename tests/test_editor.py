@@ -0,0 +1,90 @@
+import math
+
+import pandas as pd
+import pytest
+
+from rfq_editor import EditorTable, apply_delta
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({"Description": ["a", "b", "c"], "Qty": [1, 2, 3]})
+
+
+def test_edits_adds_and_deletes_in_one_pass(frame):
+    delta = {"edited_rows": {"0": {"Description": "A"}, "2": {"Qty": 30}},
+             "added_rows": [{"Description": "d"}],
+             "deleted_rows": [1]}
+    df, added, deleted = apply_delta(frame, delta, next_id=3)
+    assert (added, deleted) == (1, [1])
+    assert df.index.tolist() == [0, 2, 3]
+    assert df["Description"].tolist() == ["A", "c", "d"]
+    assert df["Qty"].tolist()[:2] == [1, 30]
+    assert df["Qty"].tolist()[2] == ""          # missing cells of added rows default to ""
+
+
+def test_frozen_frame_is_never_modified(frame):
+    before = frame.copy()
+    apply_delta(frame, {"edited_rows": {"0": {"Description": "x", "Qty": None}}}, 3)
+    pd.testing.assert_frame_equal(frame, before)
+
+
+def test_out_of_range_positions_are_ignored(frame):
+    df, _, deleted = apply_delta(frame, {"edited_rows": {"7": {"Qty": 9}}, "deleted_rows": [5]}, 3)
+    assert deleted == []
+    pd.testing.assert_frame_equal(df, frame)
+
+
+@pytest.mark.parametrize("edits", [
+    {"0": {"Qty": None}},
+    {"0": {"Qty": None}, "1": {"Qty": 3.5}},
+    {"1": {"Qty": 3.5}, "0": {"Qty": None}, "2": {"Qty": 7}},
+])
+def test_multi_row_edits_mixing_none_and_float_widen_int_column(frame, edits):
+    df = apply_delta(frame, {"edited_rows": edits}, 3)[0]
+    assert df["Qty"].dtype.kind == "f"
+    for pos, change in edits.items():
+        got, want = df["Qty"].iloc[int(pos)], change["Qty"]
+        assert math.isnan(got) if want is None else got == want
+
+
+def test_edits_that_fit_keep_the_dtype(frame):
+    df = apply_delta(frame, {"edited_rows": {"0": {"Qty": 4}, "1": {"Qty": 5}}}, 3)[0]
+    assert df["Qty"].dtype == frame["Qty"].dtype
+    assert df["Qty"].tolist() == [4, 5, 3]
+
+
+def test_text_in_number_column_and_number_in_text_column(frame):
+    df = apply_delta(frame, {"edited_rows": {"0": {"Qty": "ten", "Description": 5},
+                                             "1": {"Qty": 2, "Description": None}}}, 3)[0]
+    assert df["Qty"].tolist() == ["ten", 2, 3]
+    assert df["Description"].tolist()[0] == 5
+    assert df["Description"].tolist()[2] == "c"
+
+
+def test_row_ids_survive_deletes_and_rebase_the_widget(frame):
+    table = EditorTable(frame, "w")
+    table.mark({"deleted_rows": [0]})
+    assert table.dirty and table.sync() == [0]
+    assert table.data.index.tolist() == [1, 2]
+    key = table.widget_key
+    assert key != "w_v0"
+
+    table.mark({"added_rows": [{"Description": "d"}]})
+    table.sync()
+    assert table.data.index.tolist() == [1, 2, 3]
+    assert table.widget_key != key
+
+    # Cell edits leave the widget (and its key) as it is.
+    key = table.widget_key
+    table.mark({"edited_rows": {"2": {"Description": "D"}}})
+    table.sync()
+    assert table.widget_key == key and not table.dirty
+    assert table.data.loc[3, "Description"] == "D"
+    assert table.version == 3
+
+
+def test_sync_without_a_change_is_a_no_op(frame):
+    table = EditorTable(frame, "w")
+    data = table.data
+    assert table.sync() == [] and table.data is data
@@ -0,0 +1,72 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.bench_filters import (
+    _same_model_details, legacy_filter_model_details, legacy_filter_rows, spec_table,
+)
+from rfq_engine import _filter_model_details, _filter_navy_df, nonblank_rows
+
+VALUE_COLS = ["Requirement", "Status", "Vendor Scope (Yes/No)"]
+
+FRAMES = {
+    "no rows": pd.DataFrame(columns=["Sr.no", "Category", "Description", "UNIT", "Requirement", "Status"]),
+    "no columns": pd.DataFrame(index=range(3)),
+    "all NaN": pd.DataFrame({"Sr.no": [np.nan] * 3, "Category": [np.nan] * 3,
+                             "Requirement": [np.nan, None, "nan"], "Status": [np.nan] * 3}),
+    "mixed types": pd.DataFrame({
+        "Sr.no": [1, None, 2.0, "3", None],
+        "Category": ["Frame", None, 7, "", "Paint"],
+        "Description": [4.5, "Width", None, True, "Load"],
+        "Unit": ["mm", np.nan, 1, "kg", None],
+        "Requirement": [12, 0.5, True, "Yes", np.nan],
+        "Status": [None, 0, False, np.nan, "ok"],
+    }),
+    "whitespace": pd.DataFrame({
+        "Sr.no": ["  ", "1 ", "\t", " ", "2"],
+        "Category": [" ", " Base ", "", "\n", " Top"],
+        "Description": ["  Width  ", " ", "Height\t", "", " Load "],
+        "UNIT": [" mm", " ", "kg ", "\t", " "],
+        "Requirement": ["  ", " NaN ", " 40 ", " None", "x "],
+        "Status": ["\t", " ", " NONE ", "  y ", ""],
+    }),
+    "groups split by blanks": pd.DataFrame({
+        "Sr.no": ["1", "", "2", "", "1"],
+        "Category": ["A", "", "B", "", "A"],
+        "Requirement": ["", "kept", "", "", "again"],
+    }),
+}
+
+
+@pytest.mark.parametrize("name", FRAMES)
+def test_model_details_filter_matches_row_wise(name):
+    df = FRAMES[name]
+    got, want = _filter_model_details(df), legacy_filter_model_details(df)
+    if df.empty:
+        assert got is df and want is df
+    else:
+        _same_model_details(got, want)
+
+
+@pytest.mark.parametrize("name", FRAMES)
+@pytest.mark.parametrize("cols", [VALUE_COLS, ["Status"], ["Absent"], []])
+def test_row_filters_match_row_wise(name, cols):
+    df = FRAMES[name]
+    want = legacy_filter_rows(df, cols)
+    got = _filter_navy_df(df, cols)
+    if df.empty:
+        assert got is df and want is df
+        return
+    pd.testing.assert_frame_equal(got, want)
+    pd.testing.assert_frame_equal(df[nonblank_rows(df, cols)].reset_index(drop=True), want)
+
+
+def test_filters_match_row_wise_on_random_tables():
+    rng = random.Random(11)
+    for _ in range(100):
+        df = spec_table(rng.randint(1, 20), rng)
+        df = df[[c for c in df.columns if rng.random() < 0.8]]
+        _same_model_details(_filter_model_details(df), legacy_filter_model_details(df))
+        pd.testing.assert_frame_equal(_filter_navy_df(df, VALUE_COLS), legacy_filter_rows(df, VALUE_COLS))
@@ -0,0 +1,73 @@
+import logging
+
+import pytest
+
+import rfq_fonts
+
+DEJAVU = "/usr/share/fonts/truetype/dejavu"
+needs_dejavu = pytest.mark.skipif(not rfq_fonts.os.path.isfile(f"{DEJAVU}/DejaVuSans.ttf"), reason="needs DejaVu")
+
+pytestmark = pytest.mark.filterwarnings("ignore::DeprecationWarning")
+
+
+@pytest.fixture
+def fonts(monkeypatch):
+    """Point the font lookup at `dirs` / `files` for one test."""
+    def configure(dirs, files=None):
+        monkeypatch.setattr(rfq_fonts, "UNICODE_FONT_DIRS", dirs)
+        if files is not None:
+            monkeypatch.setattr(rfq_fonts, "UNICODE_FONT_FILES", files)
+        monkeypatch.setattr(rfq_fonts, "_warned", set())
+        rfq_fonts._font_file.cache_clear()
+    yield configure
+    rfq_fonts._font_file.cache_clear()
+
+
+def test_latin1_documents_stay_on_the_core_font(fonts):
+    fonts([DEJAVU])
+    assert rfq_fonts.font_mode({"company_name": "Café Ltd"}) == "core"
+
+
+@pytest.mark.skipif(not rfq_fonts.os.path.isfile(f"{DEJAVU}/DejaVuSansMono.ttf"), reason="needs DejaVu")
+def test_first_typeface_covering_the_text_wins(fonts):
+    fonts([DEJAVU], {"mono": {"": ("DejaVuSansMono.ttf",)}, "sans": {"": ("DejaVuSans.ttf",)}})
+    assert rfq_fonts.installed_typefaces() == ["mono", "sans"]
+    assert rfq_fonts.font_mode({"a": "Ω"}) == "mono"
+    assert rfq_fonts.font_mode({"a": "Ǆ"}) == "sans"      # in DejaVu Sans, not in Sans Mono
+
+
+def test_missing_fonts_fall_back_to_core_with_a_warning(fonts, tmp_path, caplog):
+    fonts([str(tmp_path)])
+    with caplog.at_level(logging.WARNING, logger="rfq_fonts"):
+        assert rfq_fonts.font_mode({"supplier": "प्रदाता"}) == "core"
+        assert rfq_fonts.font_mode({"supplier": "₹ 100"}) == "core"
+    assert len(caplog.records) == 1
+    assert "No Unicode font found" in caplog.records[0].getMessage()
+
+
+@needs_dejavu
+def test_unicode_documents_embed_cached_subsets(fonts, tmp_path, monkeypatch):
+    from rfq_engine import RFQRenderer
+
+    fonts([DEJAVU])
+    monkeypatch.setattr(rfq_fonts, "FONT_CACHE_DIR", str(tmp_path))
+    data = {"company_name": "Ωmega ₹", "rfq_category": "Furniture"}
+    RFQRenderer(None).render(data)
+    made = sorted(p.name for p in tmp_path.iterdir())
+    assert made and all(p.stat().st_size < 100_000 for p in tmp_path.iterdir())   # DejaVuSans.ttf is ~750 kB
+    RFQRenderer(None).render(dict(data, company_name="₹ Ωmega"))                  # same characters
+    assert sorted(p.name for p in tmp_path.iterdir()) == made
+
+    path, cmap = rfq_fonts.subset_file("dejavu", "", rfq_fonts.document_chars(data))
+    assert ord("Ω") in cmap and ord("Ж") not in cmap
+    assert rfq_fonts.normalize("Ω Ж", cmap) == "Ω �"
+
+
+@needs_dejavu
+def test_unwritable_cache_embeds_the_whole_font(fonts, tmp_path, monkeypatch):
+    fonts([DEJAVU])
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    monkeypatch.setattr(rfq_fonts, "FONT_CACHE_DIR", str(blocker / "fonts"))
+    path, cmap = rfq_fonts.subset_file("dejavu", "", rfq_fonts.document_chars({"a": "Ω"}))
+    assert path == f"{DEJAVU}/DejaVuSans.ttf" and ord("Ж") in cmap
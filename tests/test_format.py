@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.bench_filters import legacy_format_rows
+from rfq_engine import _clean, _format_column, _format_columns
+
+COLUMNS = {
+    "floats with NaN": pd.Series([1.5, np.nan, -0.25, 3.0, np.inf, -np.inf, -0.0]),
+    "ints stored as floats": pd.Series([1.0, 2.0, np.nan, 1e15, -7.0, 0.0]),
+    "ints": pd.Series([0, -3, 12, 2 ** 40], dtype="int64"),
+    "unsigned ints": pd.Series([0, 7, 255], dtype="uint8"),
+    "nullable ints": pd.Series([1, None, 3], dtype="Int64"),
+    "nullable floats": pd.Series([1.0, None, 2.5], dtype="Float64"),
+    "bools": pd.Series([True, False, True]),
+    "nullable bools": pd.Series([True, None, False], dtype="boolean"),
+    "strings": pd.Series(["Width", " 12 ", "1.50", "x y", "", "  ", "NaN", "none", "None ", "N/A"]),
+    "number-like strings": pd.Series(["1e3", "+4", "-.5", "1_000", "0x10", "inf", "nan", "12abc", "3."]),
+    "string dtype": pd.Series(["Width", None, " 4.0 ", ""], dtype="string"),
+    "mixed objects": pd.Series([None, np.nan, 3, 4.5, True, "7", " Load ", 2.0, False], dtype=object),
+    "categorical": pd.Series(["a", "2.0", None, "a"], dtype="category"),
+    "all NaN": pd.Series([np.nan, np.nan]),
+    "empty": pd.Series([], dtype=object),
+}
+
+
+@pytest.mark.parametrize("name", COLUMNS)
+def test_column_formatting_matches_per_cell_clean(name):
+    df = pd.DataFrame({"c": COLUMNS[name]})
+    assert _format_column(df, "c") == [_clean(v) for v in df["c"].tolist()]
+
+
+def test_absent_columns_format_blank_and_rows_zip_back():
+    df = pd.DataFrame({"Description": ["Width", None], "Qty": [2.0, np.nan]})
+    cols = _format_columns(df, ["Description", "Absent", "Qty"])
+    assert [list(r) for r in zip(*cols)] == [["Width", "", "2"], ["", "", ""]]
+
+
+def test_table_formatting_matches_the_row_wise_version():
+    # iterrows() upcasts each row to a common dtype (ints to floats beside
+    # a float column); the column-wise output must not depend on that.
+    df = pd.DataFrame({
+        "Sr.no": [1, 2, 3],
+        "Qty": [2.0, np.nan, 4.5],
+        "Description": ["Width", None, " 12 "],
+        "Flag": [True, False, True],
+    })
+    for cols in (["Sr.no", "Qty"], list(df.columns), ["Qty", "Absent"]):
+        assert [list(r) for r in zip(*_format_columns(df, cols))] == legacy_format_rows(df, cols)
@@ -0,0 +1,175 @@
+import io
+import os
+
+import pytest
+from PIL import Image
+
+from rfq_document import RFQDocument
+import rfq_images
+from rfq_images import ImageDecodeError, ImageRegistry
+from rfq_trace import RenderTrace
+
+pytestmark = pytest.mark.filterwarnings("ignore::DeprecationWarning")
+
+
+def _png(w, h, color=(200, 30, 30)):
+    buf = io.BytesIO()
+    Image.new("RGB", (w, h), color).save(buf, "PNG")
+    return buf.getvalue()
+
+
+def _doc(**kw):
+    pdf = RFQDocument({}, None, 'P', 'mm', 'A4', trace=RenderTrace())
+    pdf.add_page()
+    kw.setdefault("isolate", False)
+    return pdf, ImageRegistry(pdf, **kw)
+
+
+def _embedded_images(pdf):
+    return bytes(pdf.output()).count(b"/Subtype /Image")
+
+
+def test_each_distinct_image_is_embedded_once():
+    pdf, reg = _doc()
+    logo = _png(40, 20)
+    for y in (10, 60, 110):
+        reg.place(logo, 10, y, 40, 20)
+        reg.place(bytes(bytearray(logo)), 60, y, 40, 20)      # equal bytes, another object
+    reg.place(_png(40, 20, (0, 0, 255)), 10, 160, 40, 20)
+    assert reg.name(logo) == reg.name(bytes(bytearray(logo)))
+    assert pdf.trace.totals["images"] == 7
+    assert _embedded_images(pdf) == 2
+
+
+def test_prepared_variants_are_placed_once_per_slot():
+    pdf, reg = _doc()
+    img = _png(1200, 600)
+    for y in (10, 80):
+        reg.place_prepared(img, 10, y, 50.8, 25.4)
+    reg.place_prepared(img, 10, 150, 101.6, 50.8)           # another slot size: another variant
+    assert _embedded_images(pdf) == 2
+
+
+@pytest.mark.parametrize("dpi, expected", [(150, (300, 150)), (300, (600, 300))])
+def test_images_are_resampled_to_the_slot_at_the_dpi(dpi, expected):
+    _, reg = _doc(dpi=dpi)
+    out = reg.prepared(_png(2000, 1000), 50.8, 25.4)         # 2 x 1 inches
+    assert Image.open(io.BytesIO(out)).size == expected
+
+
+def test_images_are_never_upscaled():
+    _, reg = _doc()
+    assert Image.open(io.BytesIO(reg.prepared(_png(60, 30), 50.8, 25.4))).size == (60, 30)
+
+
+def test_garbage_bytes_raise_once_and_are_not_retried():
+    _, reg = _doc()
+    with pytest.raises(ImageDecodeError):
+        reg.prepared(b"definitely not an image", 20, 20)
+    first = reg._failed[reg._key(b"definitely not an image", 20, 20, True)]
+    with pytest.raises(ImageDecodeError) as again:
+        reg.place_prepared(b"definitely not an image", 0, 0, 20, 20)
+    assert again.value is first
+
+
+def test_images_over_the_pixel_limit_are_refused_before_decoding():
+    _, reg = _doc(max_pixels=10_000)
+    with pytest.raises(ImageDecodeError, match="pixel limit"):
+        reg.prepared(_png(400, 400), 200, 200)
+
+
+def test_unusable_logo_becomes_a_placeholder():
+    pdf, _ = _doc()
+    pdf.place_logo(b"\x89PNG but truncated", 10, 10, 40, 20)
+    pdf.place_logo(_png(80, 40), 60, 10, 40, 20)
+    assert pdf.trace.totals["placeholders"] == 1
+    assert pdf.trace.totals["images"] == 1
+
+
+needs_isolation = pytest.mark.skipif(not rfq_images.IMAGE_DECODE_ISOLATION, reason="no resource limits here")
+
+
+@needs_isolation
+def test_isolated_decodes_share_one_persistent_pool():
+    first = rfq_images._run_isolated([()], fn=os.getpid)
+    pool = rfq_images._decode_pool
+    again = rfq_images._run_isolated([(), ()], fn=os.getpid)
+    assert rfq_images._decode_pool is pool and os.getpid() not in first + again
+    rfq_images.shutdown_decode_pool()
+    assert rfq_images._decode_pool is None
+
+
+@needs_isolation
+def test_decode_workers_are_not_forks_of_the_app(monkeypatch):
+    rfq_images.shutdown_decode_pool()            # started after the marker is set, below
+    monkeypatch.setattr(rfq_images, "_test_marker", "set in the parent", raising=False)
+    assert rfq_images._run_isolated([()], fn=_marker) == [None]
+
+
+@needs_isolation
+def test_starting_workers_does_not_rerun_the_main_script(tmp_path, monkeypatch):
+    # Streamlit runs the app as a stand-in __main__ module with the script's __file__.
+    import sys
+    import types
+
+    ran = tmp_path / "ran"
+    script = tmp_path / "app.py"
+    script.write_text(f"open({str(ran)!r}, 'w').close()\n")
+    app = types.ModuleType("__main__")
+    app.__file__ = str(script)
+    rfq_images.shutdown_decode_pool()
+    monkeypatch.setitem(sys.modules, "__main__", app)
+    assert rfq_images._run_isolated([("x",)], fn=_exit_on_int) == ["x"]
+    rfq_images.shutdown_decode_pool()
+    assert not ran.exists()
+
+
+def _marker():
+    return getattr(rfq_images, "_test_marker", None)
+
+
+@needs_isolation
+def test_killed_decode_worker_loses_only_its_job():
+    out = rfq_images._run_isolated([("x",), (3,), ("y",)], fn=_exit_on_int)
+    assert out[0] == "x" and out[2] == "y"
+    assert isinstance(out[1], ImageDecodeError)
+
+
+def _exit_on_int(v):
+    if isinstance(v, int):
+        os._exit(v)
+    return v
+
+
+@needs_isolation
+def test_only_a_lone_small_image_skips_the_workers(monkeypatch):
+    calls = []
+
+    def run_isolated(jobs, fn):
+        calls.append(len(jobs))
+        return [fn(*args) for args in jobs]
+
+    monkeypatch.setattr(rfq_images, "_run_isolated", run_isolated)
+    _, reg = _doc(isolate=True)
+    reg.prepared(_png(800, 600), 20, 20)
+    assert calls == []
+    reg.preload([(_png(800, 600, (0, 0, 255)), 20, 20, True), (_png(600, 800), 20, 20, True)], workers=2)
+    assert calls == [2]
+
+
+@needs_isolation
+def test_large_uploads_are_previewed_on_the_decode_workers(monkeypatch):
+    big = _png(2500, 2000)
+    expected = rfq_images.make_thumbnail(big, 120)
+    jobs = []
+    real = rfq_images._run_isolated
+
+    def run_isolated(batch, fn):
+        jobs.extend(batch)
+        return real(batch, fn=fn)
+
+    monkeypatch.setattr(rfq_images, "_run_isolated", run_isolated)
+    cache = rfq_images.ThumbnailCache()
+    assert cache.get(_png(800, 600), 120) is not None and jobs == []
+    assert cache.get(big, 120) == expected and len(jobs) == 1
+    assert cache.get(b"not an image", 120) is None and len(jobs) == 1
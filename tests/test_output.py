@@ -0,0 +1,64 @@
+import os
+import time
+
+import pytest
+
+from rfq_output import OutputExpired, OutputStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return OutputStore(str(tmp_path / "out"), ttl=60)
+
+
+def _write(store, name="RFQ 1.pdf", data=b"%PDF"):
+    def produce(path):
+        with open(path, "wb") as f:
+            f.write(data)
+        return len(data)
+    return store.write(name, produce)
+
+
+def test_write_renames_into_place(store):
+    path, size = _write(store)
+    assert size == 4
+    assert os.path.basename(path).endswith("-RFQ_1.pdf")
+    assert os.listdir(store.directory) == [os.path.basename(path)]
+    with store.reader(path)() as f:
+        assert f.read() == b"%PDF"
+
+
+def test_failed_write_leaves_nothing(store):
+    def produce(path):
+        open(path, "wb").write(b"half")
+        raise RuntimeError("render failed")
+    with pytest.raises(RuntimeError):
+        store.write("x.pdf", produce)
+    assert os.listdir(store.directory) == []
+
+
+def test_sweep_removes_files_older_than_the_ttl(store):
+    old, _ = _write(store, "old.pdf")
+    new, _ = _write(store, "new.pdf")
+    now = time.time()
+    os.utime(old, (now - 61, now - 61))
+    assert store.sweep(now) == 1
+    assert os.path.exists(new) and not os.path.exists(old)
+    with pytest.raises(OutputExpired):
+        store.read(old)
+
+
+def test_sweep_due_is_throttled(store):
+    path, _ = _write(store)                # write() sweeps first
+    now = time.time()
+    os.utime(path, (now - 61, now - 61))
+    assert store.sweep_due() == 0          # within a quarter TTL of that sweep
+    store._next_sweep = 0
+    assert store.sweep_due() == 1
+
+
+def test_paths_outside_the_store_are_refused(store, tmp_path):
+    other = tmp_path / "elsewhere.pdf"
+    other.write_bytes(b"x")
+    with pytest.raises(ValueError):
+        store.open(str(other))
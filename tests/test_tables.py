@@ -0,0 +1,135 @@
+import re
+
+import pytest
+
+from rfq_document import RFQDocument
+from rfq_engine import _GENERIC_ITEMS_TABLE
+from rfq_tables import CellStyle, Column, Table
+
+pytestmark = pytest.mark.filterwarnings("ignore::DeprecationWarning")
+
+LONG = "Powder coated steel rack with four adjustable shelves and a load capacity of 150 kg per level"
+
+
+def _pdf():
+    pdf = RFQDocument({"pdf_compress": False}, None, 'P', 'mm', 'A4')
+    pdf.add_page()
+    return pdf
+
+
+def _pages(pdf):
+    """Each page's rectangles and (x, y, string) placements, as written to its content stream."""
+    out = bytes(pdf.output()).decode("latin-1")
+    streams = re.findall(r"stream\n(.*?)endstream", out, re.S)[:pdf.page]
+    return [[m[0] or (m[1], m[2], m[3])
+             for m in re.findall(r"^([\d. -]+ re [SBf])$|([\d.]+) ([\d.]+) Td (?:[\d.]+ g )?\((.*?)\) Tj", s, re.M)]
+            for s in streams]
+
+
+def _texts(marks):
+    return [m[2] for m in marks if isinstance(m, tuple)]
+
+
+def _rows(n, text="Bins"):
+    return [[str(i + 1) for i in range(n)], [text] * n, [LONG if i % 3 == 0 else "Short" for i in range(n)],
+            ["x4"] * n, ["Nos"] * n, [""] * n]
+
+
+def _multi_cell_table(pdf, table, data):
+    """The pre-Table way of drawing a table: a rect and a multi_cell() per cell."""
+    widths = [c.width for c in table.columns]
+
+    def height(style, texts):
+        style.use(pdf)
+        n = max(len(pdf.multi_cell(w - 2 * style.inset, style.line_h, t, dry_run=True, output="LINES"))
+                for w, t in zip(widths, texts))
+        return max(style.min_h, n * style.line_h + style.pad)
+
+    def row(style, texts, h, aligns, fill):
+        style.use(pdf)
+        y = pdf.get_y()
+        x = pdf.l_margin
+        for w, t, align in zip(widths, texts, aligns):
+            pdf.rect(x, y, w, h, fill)
+            pdf.set_xy(x + style.inset, y + style.top)
+            pdf.multi_cell(w - 2 * style.inset, style.line_h, t, border=0, align=align)
+            x += w
+        pdf.set_y(y + h)
+
+    labels = [c.label for c in table.columns]
+    head_h = height(table.header, labels)
+
+    def header():
+        pdf.set_fill_color(*table.header_fill)
+        row(table.header, labels, head_h, ["C"] * len(labels), "FD")
+
+    header()
+    for texts in zip(*data):
+        h = height(table.body, texts)
+        if pdf.get_y() + h > pdf.page_break_trigger:
+            pdf.add_page()
+            header()
+        row(table.body, texts, h, [c.align for c in table.columns], "")
+
+
+def test_small_table_matches_the_multi_cell_path():
+    data = _rows(6)
+    new, old = _pdf(), _pdf()
+    _GENERIC_ITEMS_TABLE.render(new, data)
+    _multi_cell_table(old, _GENERIC_ITEMS_TABLE, data)
+    assert _pages(new) == _pages(old)
+    assert new.get_y() == pytest.approx(old.get_y())
+
+
+def test_wrapped_cells_set_the_row_height():
+    pdf = _pdf()
+    table = Table([Column("Name", 30), Column("Text", 40)], header=CellStyle(11, "B"), body=CellStyle(9))
+    data = [["a", "b", "c"], ["one line", LONG, LONG + "\n" + LONG]]
+    layout = table.layout(pdf, [(data, None)]).frozen()
+    _, _, cells, row_h = layout.pieces[0]
+    pdf.set_font("Arial", "", 9)
+    wrapped = [len(pdf.multi_cell(38, 5, t, dry_run=True, output="LINES")) for t in data[1]]
+    assert [len(ls) for ls in cells[1]] == wrapped and wrapped[1] > 1
+    assert row_h == [max(8, n * 5 + 3) for n in wrapped]
+
+
+def test_spanned_cell_taller_than_its_group_grows_the_last_row():
+    pdf = _pdf()
+    table = Table([Column("Group", 20, span=True), Column("Value", 40)],
+                  header=CellStyle(11, "B"), body=CellStyle(9))
+    layout = table.layout(pdf, [([[LONG, "", "x"], ["1", "2", "3"]], [2, 1])]).frozen()
+    _, _, cells, row_h = layout.pieces[0]
+    need = len(cells[0][0]) * 5 + 3
+    assert row_h[0] == 8 and row_h[1] == need - 8 and row_h[2] == 8
+
+
+def test_page_breaks_repeat_the_header_across_chunks():
+    pdf = _pdf()
+    n = 150
+    data = _rows(n)
+    chunks = [([col[s:s + 40] for col in data], None) for s in range(0, n, 40)]
+    _GENERIC_ITEMS_TABLE.render_chunks(pdf, iter(chunks))
+    pages = _pages(pdf)
+    assert len(pages) > 2
+    for marks in pages:
+        assert _texts(marks).count("Item Name") == 1
+    numbers = [t for marks in pages for t in _texts(marks) if t.isdigit()]
+    assert numbers == [str(i + 1) for i in range(n)]
+
+
+def test_page_breaks_never_split_a_group():
+    pdf = _pdf()
+    table = Table([Column("Group", 30, span=True), Column("Value", 60)],
+                  header=CellStyle(11, "B"), body=CellStyle(9))
+    groups = [7] * 12
+    n = sum(groups)
+    labels = [f"G{g}" if i % 7 == 0 else "" for g in range(12) for i in range(7)]
+    table.render(pdf, [labels, [f"v{i}" for i in range(n)]], groups)
+    pages = _pages(pdf)
+    assert len(pages) > 1
+    for marks in pages:
+        texts = _texts(marks)
+        assert texts.count("Group") == 1
+        values = [t for t in texts if re.fullmatch(r"v\d+", t)]
+        assert values and len(values) % 7 == 0
+        assert sum(bool(re.fullmatch(r"G\d+", t)) for t in texts) == len(values) // 7
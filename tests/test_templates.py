@@ -0,0 +1,60 @@
+import re
+
+import pytest
+
+from rfq_cache import SectionCache
+from rfq_engine import RFQRenderer
+from rfq_templates import PageTemplate, _Recorder
+
+pytestmark = pytest.mark.filterwarnings("ignore::DeprecationWarning")
+
+
+def _data(**extra):
+    d = {"Type_of_items": "Bins", "Storage": "Material Storage", "company_name": "ACME Components",
+         "company_address": "Plot 4, Pune", "rfq_category": "Furniture", "pdf_compress": False}
+    d.update(extra)
+    return d
+
+
+def _render(renderer, data):
+    return re.sub(rb"/CreationDate \(D:[^)]*\)", b"", renderer.render(data))
+
+
+def test_stamped_slots_change_per_document():
+    cache = SectionCache()
+    renderer = RFQRenderer(cache)
+    first = _render(renderer, _data())
+    second = _render(renderer, _data(company_name="Globex Storage", Type_of_items="Racks"))
+    assert cache.stats()["hits"] >= 2                    # cover and sign-off were stamped
+    assert b"(ACME Components)" in first and b"(Bins)" in first
+    assert b"(Globex Storage)" in second and b"(Racks)" in second
+    assert b"ACME Components" not in second and b"(Bins)" not in second
+
+
+def test_stamped_pages_match_directly_drawn_ones():
+    renderer = RFQRenderer(SectionCache())
+    _render(renderer, _data(company_name="warm-up"))
+    assert _render(renderer, _data()) == _render(RFQRenderer(None), _data())
+
+
+def test_drafts_stamp_the_templates_of_full_renders():
+    cache = SectionCache()
+    renderer = RFQRenderer(cache)
+    renderer.render(_data())
+    before = cache.stats()
+    draft = renderer.render(_data(output_profile="draft", company_name="Globex Storage"))
+    after = cache.stats()
+    assert after["misses"] == before["misses"] and after["hits"] >= before["hits"] + 2
+    assert b"(Globex Storage)" in draft and b"DRAFT" in draft
+
+
+def test_unrecordable_calls_are_refused():
+    from rfq_document import RFQDocument
+
+    def draw(pdf):
+        pdf.rect(10, 10, 20, 20)
+
+    with pytest.raises(AttributeError, match="rect"):
+        PageTemplate.compile(draw, RFQDocument(_data(), None, 'P', 'mm', 'A4'))
+    scratch = RFQDocument(_data(), None)
+    assert _Recorder(scratch).l_margin == scratch.l_margin
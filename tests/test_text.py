@@ -0,0 +1,43 @@
+import pytest
+from fpdf import FPDF
+
+from rfq_text import TextMeasurer
+
+TEXTS = [
+    "",
+    "short",
+    "Powder coated steel rack with four adjustable shelves and a load capacity of 150 kg per level",
+    "Supercalifragilisticexpialidocious-and-then-some-without-any-spaces-at-all-anywhere",
+    "line one\nline two that is quite a bit longer than the cell is wide, so it wraps\n\nafter a blank",
+    "trailing spaces     ",
+    "  leading and   repeated   spaces between words that wrap around the cell edge",
+    "Prices quoted should include all applicable taxes and duties.",
+]
+
+
+@pytest.fixture
+def pdf():
+    pdf = FPDF()
+    pdf.add_page()
+    return pdf
+
+
+@pytest.mark.parametrize("text", TEXTS)
+@pytest.mark.parametrize("width", [12, 30, 47.5, 120])
+@pytest.mark.parametrize("font", [("Helvetica", "", 9), ("Helvetica", "B", 11)])
+def test_lines_match_multi_cell(pdf, text, width, font):
+    pdf.set_font(*font)
+    expected = pdf.multi_cell(width, 5, text, dry_run=True, output="LINES")
+    assert list(TextMeasurer().lines(pdf, text, width)) == expected
+
+
+def test_column_lines_match_lines(pdf):
+    pdf.set_font("Helvetica", "", 9)
+    m = TextMeasurer()
+    assert m.column_lines(pdf, TEXTS, 30, remember=False) == [m.lines(pdf, t, 30) for t in TEXTS]
+
+
+def test_string_width_matches_fpdf(pdf):
+    pdf.set_font("Helvetica", "", 10)
+    text = "Delivery timeline must be clearly mentioned."
+    assert TextMeasurer().string_width(pdf, text) == pytest.approx(pdf.get_string_width(text))
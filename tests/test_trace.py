@@ -0,0 +1,37 @@
+import tracemalloc
+
+import pytest
+
+from rfq_engine import write_rfq_pdf
+
+pytestmark = pytest.mark.filterwarnings("ignore::DeprecationWarning")
+
+
+def _data(**extra):
+    d = {"Type_of_items": "Bins", "company_name": "ACME Components", "rfq_category": "Furniture",
+         "memory_budget_bytes": None}
+    d.update(extra)
+    return d
+
+
+def test_timings_need_no_memory_tracing(tmp_path):
+    size, tr = write_rfq_pdf(_data(), str(tmp_path / "a.pdf"), trace=True)
+    assert not tracemalloc.is_tracing()
+    assert tr.memory is None and "peak_bytes" not in tr.totals
+    assert size == tr.totals["bytes"] == (tmp_path / "a.pdf").stat().st_size
+    rows = {r["section"].strip(): r for r in tr.table()}
+    assert {"cover page", "sign-off", "output"} <= rows.keys()
+    assert all("peak MB" not in r for r in rows.values())
+
+
+def test_memory_budget_alone_samples_rss_without_tracemalloc(tmp_path):
+    _, tr = write_rfq_pdf(_data(memory_budget_bytes=1 << 30), str(tmp_path / "a.pdf"), trace=True)
+    assert tr.memory is not None and not tr.memory.allocations
+    assert not tracemalloc.is_tracing() and "peak_bytes" in tr.totals
+    assert tr.memory.report()["top_sites"] == []
+
+
+def test_allocation_tracking_is_its_own_opt_in(tmp_path):
+    _, tr = write_rfq_pdf(_data(), str(tmp_path / "a.pdf"), memory=True)
+    assert tr.memory.allocations and tr.memory.report()["top_sites"]
+    assert not tracemalloc.is_tracing()        # stopped again once the render is done